@@ -15,16 +15,22 @@ import json
 import shutil
 import time
 from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
+from lazy_imports import lazy_call, lazy_import
 from dotenv import load_dotenv
 import base64
 from io import BytesIO
 
-# Import blockchain MRV system
-from blockchain_mrv import blockchain_mrv, BlueCarbonProject, VerificationRecord, CarbonCredit
+# Heavy modules load when a page first uses them: plotly on the first chart,
+# the blockchain registry (and its WAL recovery) on the first blockchain page
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
+blockchain_mrv = lazy_call('blockchain_mrv', 'started_registry')
 from company_manager import company_manager
+from csv_ingest import INGEST_CHUNK_ROWS, ingest_csv
+from emissions_store import DASHBOARD_COLUMNS, EMISSIONS_COLUMNS
 from emission_factors import calculate_blue_carbon_sequestration, get_blue_carbon_rate_info
+from resources import resources
+from serialization import dump_file
 
 # Load environment variables
 load_dotenv()
@@ -32,6 +38,9 @@ load_dotenv()
 # Ensure data directory exists
 os.makedirs('data', exist_ok=True)
 
+# Rows of an uploaded CSV shown in the preview
+CSV_PREVIEW_ROWS = 1000
+
 # Initialize company manager in session state
 if 'company_manager' not in st.session_state:
     st.session_state.company_manager = company_manager
@@ -208,14 +217,8 @@ def save_emissions_data():
                     # Continue even if backup fails
                     pass
             
-            # Save data to JSON file with proper formatting
-            with open('data/emissions.json', 'w') as f:
-                if len(st.session_state.emissions_data) > 0:
-                    json.dump(st.session_state.emissions_data.to_dict('records'), f, indent=2)
-                else:
-                    # Write empty array if no data
-                    f.write('[]')
-                    
+            # Save data to JSON file (an empty array if there is no data)
+            dump_file(st.session_state.emissions_data.to_dict('records'), 'data/emissions.json')
             return True
     except Exception as e:
         st.error(f"Error saving data: {str(e)}")
@@ -250,12 +253,8 @@ def add_emission_entry(date, business_unit, project, scope, category, activity,
         
         # If company is logged in, save to company-specific data
         if st.session_state.get('company_logged_in', False) and st.session_state.get('current_company'):
-            # Get company emissions data
-            company_emissions = company_manager.get_company_emissions_data(st.session_state.current_company)
-            company_emissions.append(new_entry)
-            
-            # Save company-specific data
-            company_manager.save_company_emissions_data(st.session_state.current_company, company_emissions)
+            # Append the entry to company-specific storage
+            company_manager.append_company_emissions_data(st.session_state.current_company, [new_entry])
             
             # Update company total emissions
             company_manager.update_company_emissions(st.session_state.current_company, emissions_kgCO2e)
@@ -266,6 +265,9 @@ def add_emission_entry(date, business_unit, project, scope, category, activity,
                 st.session_state.emissions_data = new_entry_df.copy()
             else:
                 st.session_state.emissions_data = pd.concat([st.session_state.emissions_data, new_entry_df], ignore_index=True)
+            
+            # Storage already holds the new entry, no full rewrite needed
+            return True
         else:
             # Fallback to global data (for backward compatibility)
             new_entry_df = pd.DataFrame([new_entry])
@@ -298,89 +300,12 @@ def delete_emission_entry(index):
 
 # Function to process uploaded CSV with enhanced date handling
 def process_csv(uploaded_file, start_date=None, end_date=None):
-    """Process uploaded CSV file and add to emissions data with flexible date handling."""
+    """Process uploaded CSV file chunk by chunk and add it to emissions data with flexible date handling."""
     try:
         # Reset file pointer to beginning
         uploaded_file.seek(0)
         
-        # Read CSV file with better error handling
-        try:
-            df = pd.read_csv(uploaded_file)
-        except pd.errors.EmptyDataError:
-            st.error("The uploaded file appears to be empty. Please upload a valid CSV file.")
-            return False
-        except pd.errors.ParserError as e:
-            st.error(f"Error parsing CSV file: {str(e)}. Please check the file format.")
-            return False
-        except Exception as e:
-            st.error(f"Error reading CSV file: {str(e)}")
-            return False
-        
-        # Check if dataframe is empty
-        if df.empty:
-            st.error("The uploaded CSV file contains no data.")
-            return False
-            
-        required_columns = ['scope', 'category', 'activity', 'quantity', 'unit', 'emission_factor']
-        
-        # Check if all required columns exist (date/reporting_period is now optional)
-        missing_required = [col for col in required_columns if col not in df.columns]
-        if missing_required:
-            st.error(f"CSV must contain all required columns: {', '.join(missing_required)}")
-            return False
-        
-        # Handle date column - now optional (support both 'date' and 'reporting_period')
-        has_dates = 'date' in df.columns
-        has_reporting_period = 'reporting_period' in df.columns
-        
-        if has_dates:
-            st.info("✅ Date column found - using specific dates from your file")
-            try:
-                # Validate existing dates
-                df['date'] = pd.to_datetime(df['date'], errors='coerce')
-                
-                # Check for invalid dates
-                invalid_dates = df['date'].isnull().sum()
-                if invalid_dates > 0:
-                    st.warning(f"⚠️ Found {invalid_dates} invalid dates - these will be auto-assigned to assessment period")
-                
-                # Convert valid dates to string format
-                df['date'] = df['date'].dt.strftime('%Y-%m-%d')
-                
-            except Exception as e:
-                st.warning(f"Date processing issue: {str(e)} - will auto-assign dates")
-                has_dates = False
-        elif has_reporting_period:
-            st.info("📊 Reporting period found - using period-based data")
-            # Use current date for reporting period data
-            df['date'] = datetime.now().strftime('%Y-%m-%d')
-            st.info("📅 Using current date for reporting period data")
-        
-        if not has_dates and not has_reporting_period:
-            # Auto-assign current date for all entries
-            st.info("📊 No date column - using current date for all entries")
-            df['date'] = datetime.now().strftime('%Y-%m-%d')
-            st.info("📅 Using current date for all entries")
-        
-        # Validate data types
-        try:
-            # Convert quantity and emission_factor to float
-            df['quantity'] = df['quantity'].astype(float)
-            df['emission_factor'] = df['emission_factor'].astype(float)
-        except Exception as e:
-            st.error(f"Data validation error: {str(e)}")
-            return False
-        
-        # Calculate emissions if not provided, or use pre-calculated if available
-        if 'emissions_kgCO2e' not in df.columns:
-            df['emissions_kgCO2e'] = df['quantity'] * df['emission_factor']
-            st.info("✅ Calculated emissions from quantity × emission factor")
-        else:
-            # Use pre-calculated emissions but validate
-            df['emissions_kgCO2e'] = pd.to_numeric(df['emissions_kgCO2e'], errors='coerce')
-            st.info("✅ Using pre-calculated emissions from your file")
-        
-        # Add enterprise fields if not present
+        # Enterprise fields for columns the file does not have
         enterprise_fields = {
             'business_unit': 'Corporate',
             'project': 'Not Applicable',
@@ -392,19 +317,68 @@ def process_csv(uploaded_file, start_date=None, end_date=None):
             'notes': ''
         }
         
-        # Add missing columns with default values
-        for field, default_value in enterprise_fields.items():
-            if field not in df.columns:
-                df[field] = default_value
+        logged_in = st.session_state.get('company_logged_in', False) and st.session_state.get('current_company')
+        imported_chunks = []
+        
+        def append_chunk(chunk):
+            if logged_in:
+                # Each chunk is appended to company storage as it is parsed
+                company_manager.append_company_emissions_data(st.session_state.current_company, chunk.to_dict('records'))
+            else:
+                imported_chunks.append(chunk)
+        
+        progress_bar = st.progress(0.0, text="Reading CSV...")
+        
+        def show_progress(rows, fraction):
+            progress_bar.progress(fraction or 0.0, text=f"Processed {rows:,} rows")
+        
+        # Rows without a usable date (including reporting_period files) get the current date
+        try:
+            report = ingest_csv(
+                uploaded_file,
+                append_chunk,
+                defaults=enterprise_fields,
+                default_date=datetime.now().strftime('%Y-%m-%d'),
+                progress=show_progress
+            )
+        except ValueError as e:
+            st.error(f"{str(e)}. Please check the file format.")
+            return False
+        except pd.errors.ParserError as e:
+            st.error(f"Error parsing CSV file: {str(e)}. Please check the file format.")
+            return False
+        finally:
+            progress_bar.empty()
+        
+        if report.dates_defaulted:
+            st.info(f"📅 Used the current date for {report.dates_defaulted:,} entries without a valid date")
+        if report.factors_filled:
+            st.info(f"✅ Filled {report.factors_filled:,} missing emission factors from the emission factor database")
+        
+        # Keep the rejected rows so the upload tab can show them after the rerun
+        st.session_state.csv_import_rejects = report.rejected_frame() if report.rows_rejected else None
+        st.session_state.csv_import_rejected_count = report.rows_rejected
+        if report.rows_rejected:
+            st.warning(f"⚠️ Skipped {report.rows_rejected:,} invalid rows")
+        if report.error:
+            # Rows before the malformed part are already stored; totals below include them
+            st.warning(f"⚠️ Import incomplete: {report.error}. "
+                       f"{report.rows_accepted:,} rows before that point were imported; "
+                       f"fix the file and upload the remaining rows.")
+        
+        if report.rows_accepted == 0:
+            st.error("The uploaded CSV file contains no valid rows.")
+            return False
         
-        # Clean up reporting_period column if it exists (not needed in final data)
-        if 'reporting_period' in df.columns:
-            df = df.drop('reporting_period', axis=1)
-            st.info("ℹ️ Converted reporting period to date format for storage")
+        if logged_in:
+            company_manager.update_company_emissions(st.session_state.current_company, report.emissions_kgCO2e)
+            st.success(f"Successfully added {report.rows_accepted:,} entries to your emissions database")
+            return True
         
-        # Append to existing data (handle empty DataFrame case)
+        # Fallback to global data (for backward compatibility)
+        df = pd.concat(imported_chunks, ignore_index=True)
         if st.session_state.emissions_data.empty:
-            st.session_state.emissions_data = df.copy()
+            st.session_state.emissions_data = df
         else:
             st.session_state.emissions_data = pd.concat([st.session_state.emissions_data, df], ignore_index=True)
         
@@ -419,6 +393,58 @@ def process_csv(uploaded_file, start_date=None, end_date=None):
         st.error(f"Error processing CSV: {str(e)}")
         return False
 
+# Cached data layer: company data is cached per (company_id, version), and the
+# version is read from the emissions store, so a rerun after a write by any
+# process reloads while page switches and widget changes reuse the cached results
+@st.cache_data(show_spinner=False, max_entries=32)
+def load_company_emissions(company_id, version):
+    """Company's full emissions data as a DataFrame"""
+    records = company_manager.get_company_emissions_data(company_id)
+    if records:
+        return pd.DataFrame(records)
+    return pd.DataFrame(columns=EMISSIONS_COLUMNS)
+
+def compute_dashboard_aggregates(dashboard_data):
+    """Metrics and chart data for the Dashboard page"""
+    dashboard_data = dashboard_data.copy()
+    dashboard_data['emissions_kgCO2e'] = pd.to_numeric(dashboard_data['emissions_kgCO2e'], errors='coerce')
+    dashboard_data = dashboard_data.fillna({'emissions_kgCO2e': 0})
+    
+    aggregates = {
+        'total_emissions': dashboard_data['emissions_kgCO2e'].sum(),
+        'total_entries': len(dashboard_data),
+        'scopes_covered': dashboard_data['scope'].nunique(),
+        'latest_date': "No date data",
+        'scope_data': dashboard_data.groupby('scope')['emissions_kgCO2e'].sum().reset_index(),
+        'category_data': dashboard_data.groupby('category')['emissions_kgCO2e'].sum().reset_index()
+            .sort_values('emissions_kgCO2e', ascending=False).head(10),
+        'time_data': None  # None without a date column; empty without valid dates
+    }
+    
+    if 'date' in dashboard_data.columns:
+        dates = pd.to_datetime(dashboard_data['date'], errors='coerce')
+        if not dates.isnull().all():
+            aggregates['latest_date'] = format_date_nice(dates.max())
+        time_data = dashboard_data.assign(date=dates).dropna(subset=['date'])
+        if not time_data.empty:
+            time_data['month'] = time_data['date'].dt.strftime('%Y-%m')
+            time_data = time_data.groupby(['month', 'scope'])['emissions_kgCO2e'].sum().reset_index()
+        aggregates['time_data'] = time_data
+    return aggregates
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def load_dashboard_aggregates(company_id, version):
+    """Dashboard aggregates for a company, loading only the columns the charts need"""
+    return compute_dashboard_aggregates(
+        company_manager.get_company_emissions_frame(company_id, columns=DASHBOARD_COLUMNS)
+    )
+
+def load_ai_agents():
+    """Point this session at the shared CarbonFootprintAgents, built once per process"""
+    st.session_state.ai_agents = resources.get('ai_agents')
+    st.session_state.ai_agents_available = st.session_state.ai_agents.available
+    st.session_state.ai_agents_initialized = True
+
 # Function to generate PDF report
 def generate_report():
     # Create a BytesIO object
@@ -2690,18 +2716,11 @@ if not st.session_state.company_logged_in:
 
 # If company is logged in, show the main application
 if st.session_state.company_logged_in:
-    # Load company-specific emissions data
-    company_emissions = company_manager.get_company_emissions_data(st.session_state.current_company)
-    if company_emissions:
-        st.session_state.emissions_data = pd.DataFrame(company_emissions)
-    else:
-        # Initialize empty dataframe for new companies
-        st.session_state.emissions_data = pd.DataFrame(columns=[
-            'date', 'business_unit', 'project', 'scope', 'category', 'activity', 
-            'country', 'facility', 'responsible_person', 'quantity', 'unit', 
-            'emission_factor', 'emissions_kgCO2e', 'data_quality', 
-            'verification_status', 'notes'
-        ])
+    # Load company-specific emissions data (empty frame for new companies)
+    st.session_state.emissions_data = load_company_emissions(
+        st.session_state.current_company,
+        company_manager.get_emissions_version(st.session_state.current_company)
+    )
     
     # Show company info in sidebar
     with st.sidebar:
@@ -2882,35 +2901,29 @@ elif st.session_state.active_page == "Dashboard":
                 st.session_state.active_page = "Data Entry"
                 st.rerun()
     else:
-        # Calculate metrics - Fix pandas warning by creating a copy first
-        emissions_data_copy = st.session_state.emissions_data.copy()
-        emissions_data_copy['emissions_kgCO2e'] = pd.to_numeric(emissions_data_copy['emissions_kgCO2e'], errors='coerce')
-        st.session_state.emissions_data = emissions_data_copy.fillna({'emissions_kgCO2e': 0})
+        # Logged-in companies reuse cached aggregates until their data changes
+        if st.session_state.company_logged_in:
+            aggregates = load_dashboard_aggregates(
+                st.session_state.current_company,
+                company_manager.get_emissions_version(st.session_state.current_company)
+            )
+        else:
+            aggregates = compute_dashboard_aggregates(st.session_state.emissions_data)
         
-        total_emissions = st.session_state.emissions_data['emissions_kgCO2e'].sum()
-        total_entries = len(st.session_state.emissions_data)
+        total_emissions = aggregates['total_emissions']
+        total_entries = aggregates['total_entries']
         
         # Clean metrics display
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            total_emissions = st.session_state.emissions_data['emissions_kgCO2e'].sum()
             st.metric("Total Emissions (kgCO2e)", f"{total_emissions:,.2f}")
         
         with col2:
-            if 'date' in st.session_state.emissions_data.columns:
-                st.session_state.emissions_data['date'] = pd.to_datetime(st.session_state.emissions_data['date'], errors='coerce')
-                if not st.session_state.emissions_data['date'].isnull().all():
-                    latest_date = format_date_nice(st.session_state.emissions_data['date'].max())
-                else:
-                    latest_date = "No date data"
-            else:
-                latest_date = "No date data"
-            
-            st.metric("Latest Entry", latest_date, help="Most recent data entry")
+            st.metric("Latest Entry", aggregates['latest_date'], help="Most recent data entry")
         
         with col3:
-            scopes_covered = st.session_state.emissions_data['scope'].nunique()
+            scopes_covered = aggregates['scopes_covered']
             st.metric("Scopes Covered", f"{scopes_covered}/3", help="Emission scope coverage")
         
         with col4:
@@ -2921,7 +2934,7 @@ elif st.session_state.active_page == "Dashboard":
             st.markdown("<h2 style='text-align: center; margin: 3rem 0 2rem 0;'>📈 Your Analytics 📈</h2>", unsafe_allow_html=True)
             
             # Emissions by scope with vibrant colors
-            scope_data = st.session_state.emissions_data.groupby('scope')['emissions_kgCO2e'].sum().reset_index()
+            scope_data = aggregates['scope_data']
             
             if not scope_data.empty:
                 # Create a more colorful pie chart
@@ -2970,8 +2983,7 @@ elif st.session_state.active_page == "Dashboard":
             
             with col1:
                 # Category breakdown with vibrant colors
-                category_data = st.session_state.emissions_data.groupby('category')['emissions_kgCO2e'].sum().reset_index()
-                category_data = category_data.sort_values('emissions_kgCO2e', ascending=False).head(10)
+                category_data = aggregates['category_data']
                 
                 if not category_data.empty:
                     fig2 = px.bar(
@@ -3001,15 +3013,9 @@ elif st.session_state.active_page == "Dashboard":
             
             with col2:
                 # Time series with vibrant colors
-                if 'date' in st.session_state.emissions_data.columns:
-                    time_data = st.session_state.emissions_data.copy()
-                    time_data['date'] = pd.to_datetime(time_data['date'], errors='coerce')
-                    time_data = time_data.dropna(subset=['date'])
-                    
+                time_data = aggregates['time_data']
+                if time_data is not None:
                     if not time_data.empty:
-                        time_data['month'] = time_data['date'].dt.strftime('%Y-%m')
-                        time_data = time_data.groupby(['month', 'scope'])['emissions_kgCO2e'].sum().reset_index()
-                        
                         if len(time_data['month'].unique()) > 0:
                             fig3 = px.line(
                                 time_data, 
@@ -3404,6 +3410,21 @@ elif st.session_state.active_page == "Data Entry":
         - **CSV without dates**: We'll assign current date to all entries
         """)
         
+        # Rows skipped by the last upload, kept across the rerun that follows it
+        if st.session_state.get('csv_import_rejects') is not None:
+            rejects = st.session_state.csv_import_rejects
+            st.warning(f"⚠️ The last upload skipped {st.session_state.csv_import_rejected_count:,} invalid rows")
+            with st.expander("Rejected rows", expanded=False):
+                st.dataframe(rejects, use_container_width=True)
+                if st.session_state.csv_import_rejected_count > len(rejects):
+                    st.caption(f"Showing the first {len(rejects):,} rejected rows")
+                st.download_button(
+                    "📥 Download Rejected Rows",
+                    rejects.to_csv(index=False),
+                    file_name="rejected_rows.csv",
+                    mime="text/csv"
+                )
+        
         uploaded_file = st.file_uploader(
             "Choose CSV file", 
             type='csv',
@@ -3413,24 +3434,35 @@ elif st.session_state.active_page == "Data Entry":
         if uploaded_file is not None:
             # Preview the uploaded file
             try:
-                preview_df = pd.read_csv(uploaded_file)
+                # Only the head of the file is loaded for the preview
+                preview_df = pd.read_csv(uploaded_file, nrows=CSV_PREVIEW_ROWS)
                 
                 st.markdown("#### 📋 File Preview")
                 st.dataframe(preview_df, use_container_width=True)
                 
+                # Count rows and scopes in chunks, reading just the columns needed
+                uploaded_file.seek(0)
+                summary_columns = {preview_df.columns[0], 'scope'}
+                data_rows = 0
+                scope_counts = pd.Series(dtype='int64')
+                for chunk in pd.read_csv(uploaded_file, usecols=lambda c: c in summary_columns, dtype=str, chunksize=INGEST_CHUNK_ROWS):
+                    # Count only non-empty data rows (excluding header)
+                    data_rows += len(chunk.dropna(how='all'))
+                    if 'scope' in chunk.columns:
+                        scope_counts = scope_counts.add(chunk['scope'].value_counts(), fill_value=0)
+                uploaded_file.seek(0)
+                
                 # Show file info
                 col1, col2 = st.columns(2)
                 with col1:
-                    # Count only non-empty data rows (excluding header)
-                    data_rows = len(preview_df.dropna(how='all'))
                     st.metric("Data Rows", data_rows)
                 with col2:
                     st.metric("Columns", len(preview_df.columns))
                 
                 # Show scope breakdown if available
-                if 'scope' in preview_df.columns:
+                if len(scope_counts):
                     st.markdown("**📊 Scope Breakdown:**")
-                    scope_counts = preview_df['scope'].value_counts()
+                    scope_counts = scope_counts.astype(int).sort_values(ascending=False)
                     cols = st.columns(len(scope_counts))
                     for i, (scope, count) in enumerate(scope_counts.items()):
                         with cols[i]:
@@ -3763,13 +3795,10 @@ elif st.session_state.active_page == "Data Entry":
         st.markdown("<h3>🤖 Data Entry Assistant</h3>", unsafe_allow_html=True)
         st.markdown("Get AI-powered help with classifying emissions and mapping them to the correct scope and category.")
         
-        # Import AI agents inside the tab to avoid loading issues
+        # AI agents are shared by all sessions and built on first use
         try:
-            from ai_agents import CarbonFootprintAgents
-            
-            # Initialize AI agents
             if 'ai_agents' not in st.session_state:
-                st.session_state.ai_agents = CarbonFootprintAgents()
+                load_ai_agents()
             
             # Check if AI is available
             if not st.session_state.ai_agents.available:
@@ -3915,11 +3944,11 @@ elif st.session_state.active_page == "Compliance":
     st.markdown(f"<h1>⚖️ {t('compliance')}</h1>", unsafe_allow_html=True)
     
     # Import compliance framework
-    from carbon_compliance import CarbonComplianceFramework, ComplianceStatus
+    from carbon_compliance import ComplianceStatus
     
-    # Initialize compliance framework
+    # Shared compliance framework, built once per process
     if 'compliance_framework' not in st.session_state:
-        st.session_state.compliance_framework = CarbonComplianceFramework()
+        st.session_state.compliance_framework = resources.get('compliance_framework')
     
     # Check if we have emissions data
     if len(st.session_state.emissions_data) == 0:
@@ -4450,6 +4479,9 @@ elif st.session_state.active_page == "Data Insights":
         st.session_state.ai_agents_initialized = False
         st.session_state.ai_agents_available = False
     
+    # Build the shared agents in the background while the user picks a tab
+    resources.warm('ai_agents')
+    
     # Create tabs for different Analytics features
     ai_tabs = st.tabs(["Report Summary", "Offset Advisor", "Regulation Radar", "Emission Optimizer"])
     
@@ -4465,10 +4497,7 @@ elif st.session_state.active_page == "Data Insights":
                 if not st.session_state.ai_agents_initialized:
                     with st.spinner("Initializing AI features..."):
                         try:
-                            from ai_agents import CarbonFootprintAgents
-                            st.session_state.ai_agents = CarbonFootprintAgents()
-                            st.session_state.ai_agents_available = st.session_state.ai_agents.available
-                            st.session_state.ai_agents_initialized = True
+                            load_ai_agents()
                         except Exception as e:
                             st.session_state.ai_agents_available = False
                             st.session_state.ai_agents_initialized = True
@@ -4524,10 +4553,7 @@ elif st.session_state.active_page == "Data Insights":
                     if not st.session_state.ai_agents_initialized:
                         with st.spinner("Initializing AI features..."):
                             try:
-                                from ai_agents import CarbonFootprintAgents
-                                st.session_state.ai_agents = CarbonFootprintAgents()
-                                st.session_state.ai_agents_available = st.session_state.ai_agents.available
-                                st.session_state.ai_agents_initialized = True
+                                load_ai_agents()
                             except Exception as e:
                                 st.session_state.ai_agents_available = False
                                 st.session_state.ai_agents_initialized = True
@@ -4576,10 +4602,7 @@ elif st.session_state.active_page == "Data Insights":
                 if not st.session_state.ai_agents_initialized:
                     with st.spinner("Initializing AI features..."):
                         try:
-                            from ai_agents import CarbonFootprintAgents
-                            st.session_state.ai_agents = CarbonFootprintAgents()
-                            st.session_state.ai_agents_available = st.session_state.ai_agents.available
-                            st.session_state.ai_agents_initialized = True
+                            load_ai_agents()
                         except Exception as e:
                             st.session_state.ai_agents_available = False
                             st.session_state.ai_agents_initialized = True
@@ -4628,10 +4651,7 @@ elif st.session_state.active_page == "Data Insights":
                 if not st.session_state.ai_agents_initialized:
                     with st.spinner("Initializing AI features..."):
                         try:
-                            from ai_agents import CarbonFootprintAgents
-                            st.session_state.ai_agents = CarbonFootprintAgents()
-                            st.session_state.ai_agents_available = st.session_state.ai_agents.available
-                            st.session_state.ai_agents_initialized = True
+                            load_ai_agents()
                         except Exception as e:
                             st.session_state.ai_agents_available = False
                             st.session_state.ai_agents_initialized = True
@@ -4818,8 +4838,7 @@ elif st.session_state.active_page == "Carbon Credits":
                 # Update company emissions
                 company_manager.update_company_emissions(st.session_state.current_company, emissions_amount)
                 
-                # Add to emissions data
-                emissions_data = company_manager.get_company_emissions_data(st.session_state.current_company)
+                # Append to emissions data without rewriting existing records
                 new_emission = {
                     'date': datetime.now().strftime('%Y-%m-%d'),
                     'business_unit': 'Operations',
@@ -4838,8 +4857,7 @@ elif st.session_state.active_page == "Carbon Credits":
                     'verification_status': 'Unverified',
                     'notes': 'Quick entry from Carbon Credits dashboard'
                 }
-                emissions_data.append(new_emission)
-                company_manager.save_company_emissions_data(st.session_state.current_company, emissions_data)
+                company_manager.append_company_emissions_data(st.session_state.current_company, [new_emission])
                 
                 st.success(f"✅ Added {emissions_amount} kg CO2 emissions")
                 st.rerun()
@@ -4863,14 +4881,15 @@ elif st.session_state.active_page == "Carbon Credits":
     # Recent activity
     st.subheader("📋 Recent Activity")
     
-    # Get recent emissions data
-    emissions_data = company_manager.get_company_emissions_data(st.session_state.current_company)
+    # Get recent emissions data (cached until the company's data changes)
+    emissions_frame = load_company_emissions(
+        st.session_state.current_company,
+        company_manager.get_emissions_version(st.session_state.current_company)
+    )
     
-    if emissions_data:
+    if not emissions_frame.empty:
         # Show last 5 emissions entries
-        recent_emissions = emissions_data[-5:] if len(emissions_data) > 5 else emissions_data
-        
-        df_recent = pd.DataFrame(recent_emissions)
+        df_recent = emissions_frame.tail(5)
         if not df_recent.empty:
             # Select key columns for display
             display_columns = ['date', 'activity', 'emissions_kgCO2e', 'scope', 'verification_status']
@@ -4,18 +4,43 @@ This provides REST API endpoints for the blockchain MRV system
 Run with: uvicorn backend_api:app --reload --host 0.0.0.0 --port 8000
 """
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from typing import Any, Callable, Iterator, List, Dict, Optional, Tuple
+import base64
+import csv
+import io
 import json
-from datetime import datetime
-import uvicorn
+from contextlib import asynccontextmanager
+from datetime import date, datetime
 
 from blockchain_mrv import blockchain_mrv, BlueCarbonProject, VerificationRecord, CarbonCredit
+from registry_events import EventBus
+from registry_executor import RegistryExecutor
+from resources import resources
+from response_cache import ResponseCache, etag_matches, make_etag
+from merkle import hash_payload, verify_proof
+from serialization import compile_encoder, dataclass_encoder, dumps
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by the shared serializer (orjson when installed)"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
 
 # Initialize FastAPI app
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Recover the registry before serving, and stop its background work on shutdown"""
+    blockchain_mrv.start()
+    yield
+    blockchain_mrv.close()
+
 app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
     title="Blue Carbon Registry API",
     description="Blockchain-based Blue Carbon Registry and MRV System for SIH 2025",
     version="1.0.0"
@@ -30,6 +55,149 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Registry calls block (hashing, logging, WAL writes, lock waits); run them off the event loop
+registry = RegistryExecutor()
+
+# Encoded read responses, keyed by URL and registry version
+response_cache = ResponseCache()
+
+# Registry change events pushed to /api/events subscribers
+events = EventBus()
+blockchain_mrv.add_listener(events.publish)
+
+# Idle event streams send a comment this often so proxies keep them open
+EVENT_HEARTBEAT_SECONDS = 15
+
+# Largest batch accepted by the bulk ingest endpoints
+MAX_BULK_ITEMS = 10000
+
+# Page size limits for list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+PROJECT_FIELDS = [
+    "id", "name", "location", "area", "ecosystem_type", "owner",
+    "estimated_carbon_sequestration", "created_at", "status", "ipfs_hash"
+]
+LISTING_FIELDS = [
+    "credit_id", "seller", "project_id", "amount", "price_per_ton", "total_price", "created_at"
+]
+VERIFICATION_FIELDS = [
+    "id", "project_id", "verified_amount", "verifier", "verification_date", "is_approved", "comments"
+]
+CREDIT_FIELDS = [
+    "credit_id", "seller", "project_id", "amount", "price_per_ton", "is_active", "created_at"
+]
+
+# Export responses are flushed in chunks of about this many bytes
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def _encode_cursor(value) -> Optional[str]:
+    """Opaque page cursor for a registry position"""
+    if value is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+def _decode_cursor(cursor: Optional[str]):
+    if cursor is None:
+        return None
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _parse_fields(fields: Optional[str], allowed: List[str]) -> Optional[List[str]]:
+    """Parse a comma-separated fields= projection"""
+    if not fields:
+        return None
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return selected
+
+# Precompiled encoders for the registry dataclasses
+_verification_to_dict = compile_encoder({
+    "id": "id",
+    "project_id": "project_id",
+    "verified_amount": "verified_carbon_amount",
+    "verifier": "verifier",
+    "verification_date": "verification_date",
+    "is_approved": "is_approved",
+    "comments": "comments"
+}, datetime_keys=["verification_date"])
+
+_credit_to_dict = compile_encoder({
+    "credit_id": "id",
+    "seller": "seller",
+    "project_id": "project_id",
+    "amount": "amount",
+    "price_per_ton": "price_per_ton",
+    "is_active": "is_active",
+    "created_at": "created_at"
+}, datetime_keys=["created_at"])
+
+_encode_project = dataclass_encoder(BlueCarbonProject)
+
+def _encode_rows(rows: Iterator[Dict], fmt: str, columns: List[str]) -> Iterator[bytes]:
+    """Serialize rows as NDJSON or CSV, yielding chunks of about EXPORT_CHUNK_BYTES"""
+    buffer = io.StringIO()
+    writer = None
+    if fmt == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+    for row in rows:
+        if writer is not None:
+            writer.writerow(row)
+        else:
+            buffer.write(dumps({c: row.get(c) for c in columns}).decode())
+            buffer.write("\n")
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def _export_response(rows: Iterator[Dict], fmt: str, columns: List[str], filename: str) -> StreamingResponse:
+    # A sync iterator: Starlette pulls it from a worker thread, off the event loop
+    return StreamingResponse(
+        _encode_rows(rows, fmt, columns),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+async def _cached_response(request: Request, version: int, build: Callable[[], Any]) -> Response:
+    """
+    Serve a read endpoint with ETag revalidation and the version-keyed response cache.
+    
+    Args:
+        request: Incoming request; its URL is the cache key
+        version: Registry version the payload depends on, read before building it
+        build: Coroutine function producing the JSON payload, called only on a cache miss
+    
+    Returns:
+        304 when the client's ETag is current, else the (possibly cached) JSON body
+    """
+    etag = make_etag(blockchain_mrv.epoch, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    key = str(request.url)
+    body = response_cache.get(key, version)
+    if body is None:
+        body = dumps(await build())
+        response_cache.put(key, version, body)
+    return Response(body, media_type="application/json", headers=headers)
+
+def _project_to_dict(p: BlueCarbonProject, fields: Optional[List[str]] = None) -> Dict:
+    data = _encode_project(p)
+    if fields:
+        return {f: data[f] for f in fields}
+    return data
+
 # Pydantic models for request/response
 class ProjectCreate(BaseModel):
     name: str
@@ -51,12 +219,93 @@ class EmissionRecord(BaseModel):
     company_address: str
     emissions: float
 
+EMISSION_BATCH = TypeAdapter(List[EmissionRecord])
+VERIFICATION_BATCH = TypeAdapter(List[VerificationCreate])
+
 class CreditPurchase(BaseModel):
     buyer: str
-    seller: str
     amount: float
+    # With a seller, buy directly from that seller at price_per_ton. Without
+    # one, match against the order book, with price_per_ton as the limit price.
+    seller: Optional[str] = None
+    price_per_ton: Optional[float] = None
+    project_id: Optional[int] = None
+    ecosystem_type: Optional[str] = None
+    allow_partial: bool = False
+
+class ListingUpdate(BaseModel):
     price_per_ton: float
 
+class MerkleProofCheck(BaseModel):
+    root: str
+    proof: List[Dict[str, str]]
+    # Either the payload hash, or the payload itself to hash canonically
+    payload_hash: Optional[str] = None
+    payload: Optional[Dict[str, Any]] = None
+
+def _parse_bulk_line(line: bytes, items: List[Any]):
+    if line.strip():
+        if len(items) >= MAX_BULK_ITEMS:
+            raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} items per request")
+        items.append(json.loads(line))
+
+async def _read_bulk_items(request: Request) -> List[Any]:
+    """
+    Parse a bulk request body: a JSON array, or NDJSON with one object per line.
+
+    NDJSON is parsed line by line as the body arrives, and stops at the item
+    limit without reading the rest; a JSON array is parsed on the executor.
+    """
+    content_type = request.headers.get("content-type", "")
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            items = []
+            pending = b""
+            async for chunk in request.stream():
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                for line in lines:
+                    _parse_bulk_line(line, items)
+            _parse_bulk_line(pending, items)
+        else:
+            items = await registry.read(json.loads, await request.body())
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed request body: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON stream")
+    if len(items) > MAX_BULK_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_ITEMS} items per request")
+    return items
+
+def _validate_batch(adapter: TypeAdapter, items: List[Any]) -> Tuple[List[Tuple[int, Any]], Dict[int, str]]:
+    """
+    Validate a whole batch in one call to the list adapter. Endpoints run this
+    on the executor, since a full batch keeps the CPU busy for a while.
+
+    Returns:
+        Tuple of ([(index, model)] for valid items, {index: error} for invalid ones)
+    """
+    try:
+        return list(enumerate(adapter.validate_python(items))), {}
+    except ValidationError as e:
+        errors = {}
+        for error in e.errors():
+            index = error['loc'][0]
+            field = ".".join(str(part) for part in error['loc'][1:])
+            errors.setdefault(index, f"{field}: {error['msg']}" if field else error['msg'])
+        valid = [i for i in range(len(items)) if i not in errors]
+        return list(zip(valid, adapter.validate_python([items[i] for i in valid]))), errors
+
+def _bulk_response(count: int, errors: Dict[int, str], results: Dict[int, Dict]) -> Dict:
+    return {
+        "accepted": len(results),
+        "rejected": count - len(results),
+        "results": [
+            results[i] if i in results else {"index": i, "success": False, "error": errors.get(i, "Rejected")}
+            for i in range(count)
+        ]
+    }
+
 # API Endpoints
 
 @app.get("/")
@@ -70,32 +319,45 @@ async def root():
     }
 
 @app.get("/api/projects")
-async def get_all_projects():
-    """Get all registered blue carbon projects"""
-    projects = blockchain_mrv.get_all_projects()
-    return {
-        "projects": [
-            {
-                "id": p.id,
-                "name": p.name,
-                "location": p.location,
-                "area": p.area,
-                "ecosystem_type": p.ecosystem_type,
-                "owner": p.owner,
-                "estimated_carbon_sequestration": p.estimated_carbon_sequestration,
-                "created_at": p.created_at.isoformat(),
-                "status": p.status,
-                "ipfs_hash": p.ipfs_hash
-            } for p in projects
-        ],
-        "total": len(projects)
-    }
+async def get_all_projects(request: Request,
+                           ecosystem_type: Optional[str] = None,
+                           status: Optional[str] = None,
+                           owner: Optional[str] = None,
+                           location: Optional[str] = None,
+                           fields: Optional[str] = None,
+                           cursor: Optional[str] = None,
+                           limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    """Get registered blue carbon projects, one page at a time in id order"""
+    selected = _parse_fields(fields, PROJECT_FIELDS)
+    after_id = _decode_cursor(cursor)
+    if after_id is not None and not isinstance(after_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    async def build():
+        projects, next_id = await registry.read(
+            blockchain_mrv.query_projects,
+            owner=owner,
+            ecosystem_type=ecosystem_type,
+            status=status,
+            location=location,
+            after_id=after_id,
+            limit=limit
+        )
+        return {
+            "projects": [_project_to_dict(p, selected) for p in projects],
+            "count": len(projects),
+            "next_cursor": _encode_cursor(next_id)
+        }
+    
+    version = blockchain_mrv.get_version(owner)
+    return await _cached_response(request, version, build)
 
 @app.post("/api/projects")
 async def create_project(project: ProjectCreate):
     """Register a new blue carbon project"""
     try:
-        project_id = blockchain_mrv.register_blue_carbon_project(
+        project_id = await registry.write(
+            blockchain_mrv.register_blue_carbon_project,
             name=project.name,
             location=project.location,
             area=project.area,
@@ -112,45 +374,35 @@ async def create_project(project: ProjectCreate):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.get("/api/projects/{project_id}")
-async def get_project(project_id: int):
-    """Get details of a specific project"""
+def _project_with_verifications(project_id: int) -> Optional[Dict]:
     project = blockchain_mrv.get_project_details(project_id)
     if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+        return None
     
     verifications = blockchain_mrv.get_verification_records(project_id)
     
     return {
-        "project": {
-            "id": project.id,
-            "name": project.name,
-            "location": project.location,
-            "area": project.area,
-            "ecosystem_type": project.ecosystem_type,
-            "owner": project.owner,
-            "estimated_carbon_sequestration": project.estimated_carbon_sequestration,
-            "created_at": project.created_at.isoformat(),
-            "status": project.status,
-            "ipfs_hash": project.ipfs_hash
-        },
-        "verifications": [
-            {
-                "id": v.id,
-                "verified_amount": v.verified_carbon_amount,
-                "verifier": v.verifier,
-                "verification_date": v.verification_date.isoformat(),
-                "is_approved": v.is_approved,
-                "comments": v.comments
-            } for v in verifications
-        ]
+        "project": _project_to_dict(project),
+        "verifications": [_verification_to_dict(v) for v in verifications]
     }
 
+@app.get("/api/projects/{project_id}")
+async def get_project(request: Request, project_id: int):
+    """Get details of a specific project"""
+    async def build():
+        result = await registry.read(_project_with_verifications, project_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+        return result
+    
+    return await _cached_response(request, blockchain_mrv.get_version(), build)
+
 @app.post("/api/verifications")
 async def submit_verification(verification: VerificationCreate):
     """Submit verification for a project"""
     try:
-        verification_id = blockchain_mrv.submit_verification(
+        verification_id = await registry.write(
+            blockchain_mrv.submit_verification,
             project_id=verification.project_id,
             verified_amount=verification.verified_amount,
             verifier=verification.verifier,
@@ -165,11 +417,29 @@ async def submit_verification(verification: VerificationCreate):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/verifications/bulk")
+async def submit_verifications_bulk(request: Request):
+    """Submit many verifications from a JSON array or an NDJSON stream"""
+    items = await _read_bulk_items(request)
+    valid, errors = await registry.read(_validate_batch, VERIFICATION_BATCH, items)
+    verification_ids = await registry.write(
+        blockchain_mrv.submit_verifications_bulk,
+        [model.model_dump() for _, model in valid]
+    )
+    
+    results = {}
+    for (index, model), verification_id in zip(valid, verification_ids):
+        if verification_id is None:
+            errors[index] = f"Project {model.project_id} does not exist"
+        else:
+            results[index] = {"index": index, "success": True, "verification_id": verification_id}
+    return FastJSONResponse(_bulk_response(len(items), errors, results))
+
 @app.post("/api/verifications/{verification_id}/approve")
 async def approve_verification(verification_id: int):
     """Approve verification and issue carbon credits"""
     try:
-        result = blockchain_mrv.approve_verification_and_issue_credits(verification_id)
+        result = await registry.write(blockchain_mrv.approve_verification_and_issue_credits, verification_id)
         if result:
             return {
                 "success": True,
@@ -184,7 +454,8 @@ async def approve_verification(verification_id: int):
 async def record_emissions(emission: EmissionRecord):
     """Record company emissions"""
     try:
-        blockchain_mrv.record_company_emissions(
+        await registry.write(
+            blockchain_mrv.record_company_emissions,
             emission.company_address,
             emission.emissions
         )
@@ -195,32 +466,96 @@ async def record_emissions(emission: EmissionRecord):
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/api/emissions/bulk")
+async def record_emissions_bulk(request: Request):
+    """Record many emissions entries from a JSON array or an NDJSON stream"""
+    items = await _read_bulk_items(request)
+    valid, errors = await registry.read(_validate_batch, EMISSION_BATCH, items)
+    await registry.write(
+        blockchain_mrv.record_company_emissions_bulk,
+        [(model.company_address, model.emissions) for _, model in valid]
+    )
+    results = {index: {"index": index, "success": True} for index, _ in valid}
+    return FastJSONResponse(_bulk_response(len(items), errors, results))
+
 @app.get("/api/companies/{company_address}/dashboard")
-async def get_company_dashboard(company_address: str):
+async def get_company_dashboard(request: Request, company_address: str):
     """Get comprehensive dashboard data for a company"""
-    try:
-        dashboard_data = blockchain_mrv.get_company_dashboard_data(company_address)
-        return dashboard_data
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    async def build():
+        try:
+            return await registry.read(blockchain_mrv.get_company_dashboard_data, company_address)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    return await _cached_response(request, blockchain_mrv.get_version(company_address), build)
 
 @app.get("/api/marketplace")
-async def get_marketplace_listings():
-    """Get available carbon credits in marketplace"""
-    try:
-        listings = blockchain_mrv.get_marketplace_listings()
+async def get_marketplace_listings(request: Request,
+                                   project_id: Optional[int] = None,
+                                   ecosystem_type: Optional[str] = None,
+                                   seller: Optional[str] = None,
+                                   min_price: Optional[float] = None,
+                                   max_price: Optional[float] = None,
+                                   fields: Optional[str] = None,
+                                   cursor: Optional[str] = None,
+                                   limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    """Get available carbon credits in marketplace, best price first, one page at a time"""
+    selected = _parse_fields(fields, LISTING_FIELDS)
+    after = _decode_cursor(cursor)
+    if after is not None:
+        if not (isinstance(after, list) and len(after) == 3):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        after = (float(after[0]), int(after[1]), int(after[2]))
+    
+    async def build():
+        try:
+            listings, next_key = await registry.read(
+                blockchain_mrv.query_marketplace_listings,
+                seller=seller,
+                project_id=project_id,
+                ecosystem_type=ecosystem_type,
+                min_price=min_price,
+                max_price=max_price,
+                after=after,
+                limit=limit
+            )
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if selected:
+            listings = [{f: listing[f] for f in selected} for listing in listings]
         return {
             "listings": listings,
-            "total": len(listings)
+            "count": len(listings),
+            "next_cursor": _encode_cursor(next_key)
         }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    
+    # A seller's listings only change with that seller's version
+    return await _cached_response(request, blockchain_mrv.get_version(seller), build)
 
 @app.post("/api/marketplace/purchase")
 async def purchase_credits(purchase: CreditPurchase):
     """Purchase carbon credits from marketplace"""
     try:
-        result = blockchain_mrv.purchase_carbon_credits(
+        if purchase.seller is None:
+            order = await registry.write(
+                blockchain_mrv.buy_carbon_credits,
+                buyer=purchase.buyer,
+                amount=purchase.amount,
+                max_price=purchase.price_per_ton,
+                project_id=purchase.project_id,
+                ecosystem_type=purchase.ecosystem_type,
+                allow_partial=purchase.allow_partial
+            )
+            return {
+                "success": True,
+                "message": f"Successfully purchased {order['filled_amount']} credits from {len(order['fills'])} listings",
+                "order": order
+            }
+        
+        if purchase.price_per_ton is None:
+            raise HTTPException(status_code=400, detail="price_per_ton is required when buying from a seller")
+        result = await registry.write(
+            blockchain_mrv.purchase_carbon_credits,
             buyer=purchase.buyer,
             seller=purchase.seller,
             amount=purchase.amount,
@@ -233,32 +568,168 @@ async def purchase_credits(purchase: CreditPurchase):
             }
         else:
             raise HTTPException(status_code=400, detail="Purchase failed")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.put("/api/marketplace/listings/{credit_id}")
+async def update_listing(credit_id: int, listing: ListingUpdate):
+    """List an active credit for sale or change its asking price"""
+    try:
+        await registry.write(blockchain_mrv.list_credit, credit_id, listing.price_per_ton)
+        return {
+            "success": True,
+            "message": f"Credit {credit_id} listed at ${listing.price_per_ton}/ton"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.delete("/api/marketplace/listings/{credit_id}")
+async def cancel_listing(credit_id: int):
+    """Withdraw a credit from the marketplace"""
+    if not await registry.write(blockchain_mrv.cancel_listing, credit_id):
+        raise HTTPException(status_code=404, detail="Listing not found")
+    return {
+        "success": True,
+        "message": f"Credit {credit_id} withdrawn from the marketplace"
+    }
+
 @app.get("/api/stats")
-async def get_system_stats():
+async def get_system_stats(request: Request):
     """Get overall system statistics"""
-    projects = blockchain_mrv.get_all_projects()
-    verifications = list(blockchain_mrv.verifications.values())
-    pending_verifications = [v for v in verifications if not v.is_approved]
-    total_credits = sum(blockchain_mrv.get_company_carbon_balance(addr) for addr in blockchain_mrv.carbon_credits.keys())
-    total_emissions = sum(blockchain_mrv.company_emissions.values())
-    
-    return {
-        "total_projects": len(projects),
-        "total_verifications": len(verifications),
-        "pending_verifications": len(pending_verifications),
-        "total_credits_issued": total_credits,
-        "total_emissions_recorded": total_emissions,
-        "active_companies": len(blockchain_mrv.carbon_credits.keys()),
-        "ecosystem_distribution": {
-            "mangrove": len([p for p in projects if p.ecosystem_type == "mangrove"]),
-            "seagrass": len([p for p in projects if p.ecosystem_type == "seagrass"]),
-            "salt_marsh": len([p for p in projects if p.ecosystem_type == "salt_marsh"]),
-            "coastal_wetland": len([p for p in projects if p.ecosystem_type == "coastal_wetland"])
+    async def build():
+        stats = await registry.read(blockchain_mrv.get_system_stats)
+        return {
+            "total_projects": stats['total_projects'],
+            "total_verifications": stats['total_verifications'],
+            "pending_verifications": stats['pending_verifications'],
+            "total_credits_issued": stats['total_credits_issued'],
+            "total_emissions_recorded": stats['total_emissions'],
+            "active_companies": stats['active_companies'],
+            "ecosystem_distribution": stats['projects_by_ecosystem'],
+            "status_distribution": stats['projects_by_status']
         }
-    }
+    
+    return await _cached_response(request, blockchain_mrv.get_version(), build)
+
+EXPORT_DATASETS = {
+    "projects": (PROJECT_FIELDS, blockchain_mrv.iter_projects, _project_to_dict),
+    "verifications": (VERIFICATION_FIELDS, blockchain_mrv.iter_verifications, _verification_to_dict),
+    "credits": (CREDIT_FIELDS, blockchain_mrv.iter_credits, _credit_to_dict),
+}
+
+def _get_company_manager():
+    """CompanyManager for company-scoped exports, created on first use"""
+    return resources.get('company_manager')
+
+@app.get("/api/export/{dataset}.{fmt}")
+async def export_registry(dataset: str,
+                          fmt: str,
+                          start_date: Optional[date] = None,
+                          end_date: Optional[date] = None,
+                          columns: Optional[str] = None):
+    """Stream projects, verifications or credits as NDJSON or CSV"""
+    if dataset not in EXPORT_DATASETS or fmt not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    allowed, iterate, to_dict = EXPORT_DATASETS[dataset]
+    selected = _parse_fields(columns, allowed) or allowed
+    rows = (to_dict(item) for item in iterate(start_date=start_date, end_date=end_date))
+    return _export_response(rows, fmt, selected, f"{dataset}.{fmt}")
+
+@app.get("/api/companies/{company_id}/emissions.{fmt}")
+async def export_company_emissions(company_id: str,
+                                   fmt: str,
+                                   start_date: Optional[date] = None,
+                                   end_date: Optional[date] = None,
+                                   columns: Optional[str] = None):
+    """Stream a company's emissions as NDJSON or CSV"""
+    from emissions_store import EMISSIONS_COLUMNS
+    
+    if fmt not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    selected = _parse_fields(columns, EMISSIONS_COLUMNS) or EMISSIONS_COLUMNS
+    manager = await registry.read(_get_company_manager)
+    if not await registry.read(manager.authenticate_company, company_id):
+        raise HTTPException(status_code=404, detail="Company not found")
+    rows = manager.iter_company_emissions(company_id, columns=selected, start_date=start_date, end_date=end_date)
+    return _export_response(rows, fmt, selected, f"{company_id}_emissions.{fmt}")
+
+@app.get("/api/chain/status")
+async def get_chain_status():
+    """Blockchain connection status, queried with the async Web3 client"""
+    return await blockchain_mrv.get_chain_status()
+
+@app.post("/api/merkle/seal")
+async def seal_merkle_batch():
+    """Seal pending project and verification hashes into a Merkle batch now"""
+    batch = await registry.write(blockchain_mrv.seal_merkle_batch)
+    if batch is None:
+        return {"success": False, "message": "No pending records"}
+    return {"success": True, **batch}
+
+@app.get("/api/merkle/proofs/{record_type}/{record_id}")
+async def get_merkle_proof(record_type: str, record_id: int):
+    """Inclusion proof of a project or verification in its anchored Merkle batch"""
+    try:
+        proof = await registry.read(blockchain_mrv.get_merkle_proof, record_type, record_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if proof is None:
+        raise HTTPException(status_code=404, detail="Record not found")
+    if proof["status"] == "pending":
+        return JSONResponse(status_code=202, content=proof)
+    return proof
+
+@app.post("/api/merkle/verify")
+async def verify_merkle_proof(check: MerkleProofCheck):
+    """Check an inclusion proof against a Merkle root"""
+    if check.payload_hash is None and check.payload is None:
+        raise HTTPException(status_code=400, detail="payload_hash or payload is required")
+    payload_hash = check.payload_hash or hash_payload(check.payload)
+    return {"valid": verify_proof(payload_hash, check.proof, check.root), "payload_hash": payload_hash}
+
+def _sse_message(event_type: str, data: Any, event_id: Optional[int] = None) -> bytes:
+    """Encode one Server-Sent Events message"""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\n".encode() + b"data: " + dumps(data) + b"\n\n"
+
+@app.get("/api/events")
+async def stream_events(request: Request,
+                        company: Optional[List[str]] = Query(None),
+                        types: Optional[str] = None):
+    """
+    Server-Sent Events feed of registry changes.
+    
+    Filter with repeated company= addresses and a comma-separated types= list
+    (project_registered, verification_submitted, verification_approved,
+    credits_issued, credits_purchased, listing_updated, listing_cancelled,
+    emissions_recorded, merkle_root_sealed). Event ids are registry versions. A client that falls
+    behind gets a 'lagged' event with the number of events it missed.
+    """
+    event_types = [t.strip() for t in types.split(",") if t.strip()] if types else None
+    subscription = events.subscribe(companies=company, event_types=event_types)
+    
+    async def stream():
+        try:
+            yield _sse_message("connected", {"version": blockchain_mrv.get_version()})
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=EVENT_HEARTBEAT_SECONDS)
+                dropped = subscription.take_dropped()
+                if dropped:
+                    yield _sse_message("lagged", {"dropped": dropped})
+                if event is None:
+                    yield b": keepalive\n\n"
+                else:
+                    yield _sse_message(event["type"], event, event["version"])
+        finally:
+            events.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Background task to populate demo data
 @app.post("/api/admin/populate-demo")
@@ -284,13 +755,16 @@ if __name__ == "__main__":
     print("📊 API Documentation: http://localhost:8000/docs")
     print("🌊 Blockchain MRV System: http://localhost:8000/api/stats")
     
-    # Auto-populate demo data on startup
-    try:
-        from demo_populate import populate_demo_data
-        populate_demo_data()
-    except Exception as e:
-        print(f"Warning: Could not populate demo data: {e}")
+    # Auto-populate demo data on first startup; later runs recover the persisted registry
+    blockchain_mrv.start()
+    if not blockchain_mrv.projects:
+        try:
+            from demo_populate import populate_demo_data
+            populate_demo_data()
+        except Exception as e:
+            print(f"Warning: Could not populate demo data: {e}")
     
+    import uvicorn
     uvicorn.run(
         "backend_api:app",
         host="0.0.0.0",
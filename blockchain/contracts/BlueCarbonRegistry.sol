@@ -6,12 +6,17 @@ import "@openzeppelin/contracts/token/ERC20/ERC20.sol";
 import "@openzeppelin/contracts/access/Ownable.sol";
 import "@openzeppelin/contracts/security/ReentrancyGuard.sol";
 import "@openzeppelin/contracts/utils/Counters.sol";
+import "@openzeppelin/contracts/utils/Multicall.sol";
 
 /**
  * @title BlueCarbonRegistry
  * @dev Blockchain-based registry for blue carbon ecosystem restoration and MRV
+ * Multicall lets the off-chain registry batch many calls into one transaction.
+ * The off-chain registry relays its records through the owner-only *For
+ * functions, which take the acting company or verifier address explicitly
+ * and map registry ids to the ids assigned here.
  */
-contract BlueCarbonRegistry is Ownable, ReentrancyGuard {
+contract BlueCarbonRegistry is Ownable, ReentrancyGuard, Multicall {
     using Counters for Counters.Counter;
 
     // Project counter
@@ -19,7 +24,7 @@ contract BlueCarbonRegistry is Ownable, ReentrancyGuard {
     Counters.Counter private _verificationIds;
 
     // Structs
-    struct BlueCarbon Project {
+    struct BlueCarbonProject {
         uint256 id;
         string name;
         string location;
@@ -67,6 +72,9 @@ contract BlueCarbonRegistry is Ownable, ReentrancyGuard {
     mapping(address => bool) public authorized_verifiers;
     mapping(address => uint256) public company_carbon_balance; // Company's carbon credits
     mapping(address => uint256) public company_emissions; // Company's total emissions
+    mapping(bytes32 => uint256) public merkle_anchors; // Merkle root -> anchoring timestamp
+    mapping(uint256 => uint256) public registry_project_ids; // off-chain registry project id -> project id
+    mapping(uint256 => uint256) public registry_verification_ids; // off-chain registry verification id -> verification id
 
     // Events
     event ProjectRegistered(uint256 indexed project_id, address indexed owner, string name);
@@ -74,6 +82,7 @@ contract BlueCarbonRegistry is Ownable, ReentrancyGuard {
     event CarbonCreditIssued(uint256 indexed project_id, uint256 amount, address indexed recipient);
     event CarbonCreditPurchased(address indexed buyer, address indexed seller, uint256 amount, uint256 price);
     event EmissionsRecorded(address indexed company, uint256 emissions, uint256 timestamp);
+    event MerkleRootAnchored(bytes32 indexed root, uint256 batch_id, uint256 leaf_count, uint256 timestamp);
 
     constructor() {}
 
@@ -101,23 +110,55 @@ contract BlueCarbonRegistry is Ownable, ReentrancyGuard {
         uint256 estimated_sequestration,
         string memory ipfs_hash
     ) external returns (uint256) {
+        uint256 project_id = _createProject(msg.sender);
+        BlueCarbonProject storage project = projects[project_id];
+        project.name = name;
+        project.location = location;
+        project.area = area;
+        project.ecosystem_type = ecosystem_type;
+        project.estimated_carbon_sequestration = estimated_sequestration;
+        project.ipfs_hash = ipfs_hash;
+
+        emit ProjectRegistered(project_id, msg.sender, name);
+        return project_id;
+    }
+
+    // Register a project recorded off-chain, owned by owner; relayed by the registry
+    function registerProjectFor(
+        uint256 registry_id,
+        address owner,
+        string memory name,
+        string memory location,
+        uint256 area,
+        string memory ecosystem_type,
+        uint256 estimated_sequestration,
+        string memory ipfs_hash
+    ) external onlyOwner returns (uint256) {
+        require(registry_project_ids[registry_id] == 0, "Registry project already recorded");
+        uint256 project_id = _createProject(owner);
+        registry_project_ids[registry_id] = project_id;
+        BlueCarbonProject storage project = projects[project_id];
+        project.name = name;
+        project.location = location;
+        project.area = area;
+        project.ecosystem_type = ecosystem_type;
+        project.estimated_carbon_sequestration = estimated_sequestration;
+        project.ipfs_hash = ipfs_hash;
+
+        emit ProjectRegistered(project_id, owner, name);
+        return project_id;
+    }
+
+    // Fields are set one by one by the callers, which keeps their stacks shallow
+    function _createProject(address owner) internal returns (uint256) {
         _projectIds.increment();
         uint256 project_id = _projectIds.current();
 
-        projects[project_id] = BlueCarbonProject({
-            id: project_id,
-            name: name,
-            location: location,
-            area: area,
-            ecosystem_type: ecosystem_type,
-            owner: msg.sender,
-            estimated_carbon_sequestration: estimated_sequestration,
-            created_at: block.timestamp,
-            status: ProjectStatus.PROPOSED,
-            ipfs_hash: ipfs_hash
-        });
-
-        emit ProjectRegistered(project_id, msg.sender, name);
+        BlueCarbonProject storage project = projects[project_id];
+        project.id = project_id;
+        project.owner = owner;
+        project.created_at = block.timestamp;
+        project.status = ProjectStatus.PROPOSED;
         return project_id;
     }
 
@@ -127,7 +168,35 @@ contract BlueCarbonRegistry is Ownable, ReentrancyGuard {
         uint256 verified_amount,
         string memory data_hash,
         string memory comments
-    ) external onlyVerifier {
+    ) external onlyVerifier returns (uint256) {
+        return _submitVerification(project_id, msg.sender, verified_amount, data_hash, comments);
+    }
+
+    // Record a verification made off-chain by verifier; relayed by the registry
+    function submitVerificationFor(
+        uint256 registry_id,
+        uint256 registry_project_id,
+        address verifier,
+        uint256 verified_amount,
+        string memory data_hash,
+        string memory comments
+    ) external onlyOwner returns (uint256) {
+        require(authorized_verifiers[verifier], "Not an authorized verifier");
+        require(registry_verification_ids[registry_id] == 0, "Registry verification already recorded");
+        uint256 project_id = registry_project_ids[registry_project_id];
+        require(project_id != 0, "Project does not exist");
+        uint256 verification_id = _submitVerification(project_id, verifier, verified_amount, data_hash, comments);
+        registry_verification_ids[registry_id] = verification_id;
+        return verification_id;
+    }
+
+    function _submitVerification(
+        uint256 project_id,
+        address verifier,
+        uint256 verified_amount,
+        string memory data_hash,
+        string memory comments
+    ) internal returns (uint256) {
         require(projects[project_id].id != 0, "Project does not exist");
 
         _verificationIds.increment();
@@ -136,7 +205,7 @@ contract BlueCarbonRegistry is Ownable, ReentrancyGuard {
         verifications[verification_id] = VerificationRecord({
             id: verification_id,
             project_id: project_id,
-            verifier: msg.sender,
+            verifier: verifier,
             verified_carbon_amount: verified_amount,
             verification_date: block.timestamp,
             verification_data_hash: data_hash,
@@ -144,7 +213,8 @@ contract BlueCarbonRegistry is Ownable, ReentrancyGuard {
             comments: comments
         });
 
-        emit ProjectVerified(project_id, verified_amount, msg.sender);
+        emit ProjectVerified(project_id, verified_amount, verifier);
+        return verification_id;
     }
 
     // Approve verification and issue carbon credits
@@ -167,8 +237,17 @@ contract BlueCarbonRegistry is Ownable, ReentrancyGuard {
 
     // Record company emissions
     function recordEmissions(uint256 emissions) external {
-        company_emissions[msg.sender] += emissions;
-        emit EmissionsRecorded(msg.sender, emissions, block.timestamp);
+        _recordEmissions(msg.sender, emissions);
+    }
+
+    // Record emissions reported off-chain by company; relayed by the registry
+    function recordEmissionsFor(address company, uint256 emissions) external onlyOwner {
+        _recordEmissions(company, emissions);
+    }
+
+    function _recordEmissions(address company, uint256 emissions) internal {
+        company_emissions[company] += emissions;
+        emit EmissionsRecorded(company, emissions, block.timestamp);
     }
 
     // Carbon credit marketplace
@@ -200,6 +279,13 @@ contract BlueCarbonRegistry is Ownable, ReentrancyGuard {
         emit CarbonCreditPurchased(msg.sender, seller, amount, total_price);
     }
 
+    // Anchor the Merkle root of a batch of off-chain project and verification hashes
+    function anchorMerkleRoot(bytes32 root, uint256 batch_id, uint256 leaf_count) external onlyOwner {
+        require(merkle_anchors[root] == 0, "Root already anchored");
+        merkle_anchors[root] = block.timestamp;
+        emit MerkleRootAnchored(root, batch_id, leaf_count, block.timestamp);
+    }
+
     // View functions
     function getProjectDetails(uint256 project_id) external view returns (BlueCarbonProject memory) {
         return projects[project_id];
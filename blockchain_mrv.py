@@ -4,19 +4,33 @@ Integrates with existing Carbon Accounting application for SIH 2025
 """
 
 import json
+import asyncio
+import functools
+import hashlib
+import importlib.util
+import math
 import os
+import re
+import threading
+import time
+from bisect import bisect_right
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
-import hashlib
-import requests
-from dataclasses import dataclass, asdict
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, asdict, field, fields
+
+from merkle import MerkleAccumulator, hash_payload
+from order_book import OrderBook
+from registry_locks import LockStripes, SharedExclusiveLock
+from registry_wal import RegistryJournal
+from serialization import dataclass_encoder, load_file
+from tx_pipeline import TransactionPipeline, Web3ChainClient
 
-try:
-    from web3 import Web3
-    from eth_account import Account
-    WEB3_AVAILABLE = True
-except ImportError:
-    WEB3_AVAILABLE = False
+# web3 takes about a second to import, so it is only imported when
+# blockchain_enabled is set (see _initialize_blockchain)
+WEB3_AVAILABLE = (importlib.util.find_spec("web3") is not None
+                  and importlib.util.find_spec("eth_account") is not None)
+if not WEB3_AVAILABLE:
     print("Web3 not available. Install with: pip install web3 eth-account")
 
 @dataclass
@@ -51,26 +65,192 @@ class CarbonCredit:
     project_id: int
     amount: float  # tons CO2
     price_per_ton: float  # USD
-    seller: str
+    seller: str  # current holder of the credit
     is_active: bool
     created_at: datetime
+    id: int = 0
+
+# Ecosystems always reported in the stats distribution, even with no projects
+ECOSYSTEM_TYPES = ["mangrove", "seagrass", "salt_marsh", "coastal_wetland"]
+
+@dataclass
+class RegistryStats:
+    """Registry-wide aggregates, updated on every mutation instead of recomputed per read"""
+    total_projects: int = 0
+    projects_by_status: Dict[str, int] = field(default_factory=dict)
+    projects_by_ecosystem: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(ECOSYSTEM_TYPES, 0))
+    total_verifications: int = 0
+    pending_verifications: int = 0
+    total_credits_issued: float = 0.0
+    total_emissions: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    
+    def project_added(self, project: BlueCarbonProject):
+        with self.lock:
+            self.total_projects += 1
+            self.projects_by_status[project.status] = self.projects_by_status.get(project.status, 0) + 1
+            self.projects_by_ecosystem[project.ecosystem_type] = self.projects_by_ecosystem.get(project.ecosystem_type, 0) + 1
+    
+    def verification_added(self):
+        with self.lock:
+            self.total_verifications += 1
+            self.pending_verifications += 1
+    
+    def verification_approved(self, verified_amount: float):
+        with self.lock:
+            self.pending_verifications -= 1
+            self.total_credits_issued += verified_amount
+    
+    def emissions_recorded(self, emissions: float):
+        with self.lock:
+            self.total_emissions += emissions
+    
+    def snapshot(self) -> Dict:
+        """Consistent copy of the aggregates"""
+        with self.lock:
+            return {
+                'total_projects': self.total_projects,
+                'projects_by_status': dict(self.projects_by_status),
+                'projects_by_ecosystem': dict(self.projects_by_ecosystem),
+                'total_verifications': self.total_verifications,
+                'pending_verifications': self.pending_verifications,
+                'total_credits_issued': self.total_credits_issued,
+                'total_emissions': self.total_emissions
+            }
+
+def _within(value: datetime, start_date=None, end_date=None) -> bool:
+    """Whether value falls in the inclusive [start_date, end_date] day range"""
+    day = value.date()
+    if start_date is not None and day < start_date:
+        return False
+    if end_date is not None and day > end_date:
+        return False
+    return True
+
+_RECORD_ENCODERS = {}
+
+def _to_record(obj) -> Dict:
+    """Convert a registry dataclass to a JSON-ready dict"""
+    encoder = _RECORD_ENCODERS.get(type(obj))
+    if encoder is None:
+        encoder = _RECORD_ENCODERS[type(obj)] = dataclass_encoder(type(obj))
+    return encoder(obj)
+
+def _from_record(cls, record: Dict):
+    """Rebuild a registry dataclass from a dict produced by _to_record"""
+    values = {}
+    for field in fields(cls):
+        if field.name in record:
+            value = record[field.name]
+            if field.type is datetime and isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            values[field.name] = value
+    return cls(**values)
+
+def _mutation(method):
+    """
+    Run a public registry mutation under the shared side of the snapshot gate,
+    then write a snapshot if one is due once all locks are released.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if getattr(self._local, 'in_mutation', False):
+            return method(self, *args, **kwargs)
+        self._local.in_mutation = True
+        try:
+            with self._snapshot_gate.shared():
+                result = method(self, *args, **kwargs)
+        finally:
+            self._local.in_mutation = False
+        if self.journal is not None and self.journal.snapshot_due():
+            self._snapshot_if_due()
+        return result
+    return wrapper
 
 class BlockchainMRVSystem:
     """Blockchain-based Monitoring, Reporting, and Verification System"""
     
-    def __init__(self, config_file: str = "blockchain_config.json"):
+    def __init__(self, config_file: str = "blockchain_config.json", start: bool = False):
+        """
+        Args:
+            config_file: JSON configuration overriding the defaults
+            start: Recover the persisted registry and start background work
+                now (see start); off by default so library use stays in memory
+        """
         self.config = self._load_config(config_file)
         self.web3 = None
+        self.async_web3 = None  # used from async request handlers
         self.contract = None
         self.account = None
+        self.tx_pipeline = None  # mirrors registry changes on chain (see attach_tx_pipeline)
         
         # In-memory storage for demo (replace with actual blockchain in production)
         self.projects: Dict[int, BlueCarbonProject] = {}
         self.verifications: Dict[int, VerificationRecord] = {}
         self.carbon_credits: Dict[str, List[CarbonCredit]] = {}  # company_address -> credits
         self.company_emissions: Dict[str, float] = {}
+        self.credits: Dict[int, CarbonCredit] = {}  # credit id -> credit
         self.next_project_id = 1
         self.next_verification_id = 1
+        self.next_credit_id = 1
+        
+        # Concurrency: writers lock in the order snapshot gate -> registry ->
+        # account stripes -> order book (see registry_locks). A credit only
+        # changes under its holder's stripe; the order book lock covers the
+        # book alone. Readers take no locks: index lists are append-only and
+        # per-seller credit sets are replaced rather than mutated, so a reader
+        # always sees a whole version.
+        self._local = threading.local()
+        self._snapshot_gate = SharedExclusiveLock()
+        self._snapshot_lock = threading.Lock()  # one snapshot writer at a time
+        self._registry_lock = threading.RLock()  # projects and verifications
+        self._book_lock = threading.RLock()  # order book structure only
+        self._account_locks = LockStripes()  # per-address credits, balances and emissions
+        self._id_lock = threading.Lock()
+        
+        # Change versions for conditional reads. Every logged change bumps the
+        # global version; an address's version is set to the global version of
+        # its latest change. epoch tells versions from different runs apart.
+        self.epoch = os.urandom(4).hex()
+        self.version = 0
+        self.company_versions: Dict[str, int] = {}
+        self._version_lock = threading.Lock()
+        
+        # Secondary indexes, maintained by every mutating method
+        self.verifications_by_project: Dict[int, List[int]] = {}
+        self.projects_by_owner: Dict[str, List[int]] = {}
+        self.projects_by_ecosystem: Dict[str, List[int]] = {}
+        # seller -> active credit ids, in issue order (dict used as an ordered set,
+        # copied on write)
+        self.active_credits_by_seller: Dict[str, Dict[int, None]] = {}
+        # Running sum of active credit amounts per address
+        self.active_balances: Dict[str, float] = {}
+        # Active credits offered for sale, in price-time priority
+        self.order_book = OrderBook()
+        
+        # Aggregates served by get_system_stats
+        self.stats = RegistryStats()
+        
+        # Change event callbacks (see add_listener)
+        self._listeners: List[Callable[[Dict], None]] = []
+        
+        # Project and verification payload hashes, batched under Merkle roots
+        self.merkle = MerkleAccumulator(
+            batch_size=self.config['merkle_batch_size'],
+            max_age_seconds=self.config['merkle_batch_seconds']
+        )
+        
+        # Durable write-ahead log and snapshots of the registry, opened by start()
+        self.journal = None
+        
+        # Seals a partial Merkle batch once it is merkle_batch_seconds old,
+        # even when no further records arrive to trigger it from add()
+        self._merkle_sealer = None
+        self._merkle_sealer_stopping = False
+        self._started = False
+        self._start_lock = threading.Lock()
+        if start:
+            self.start()
         
         if WEB3_AVAILABLE and self.config.get('blockchain_enabled', False):
             self._initialize_blockchain()
@@ -84,7 +264,20 @@ class BlockchainMRVSystem:
             "contract_address": "",
             "private_key": "",
             "ipfs_gateway": "https://ipfs.io/ipfs/",
-            "verification_threshold": 2  # Number of verifiers required
+            "verification_threshold": 2,  # Number of verifiers required
+            "rpc_timeout": 10,  # seconds, for async chain calls
+            "persistence_enabled": True,
+            "registry_dir": os.path.join("data", "registry"),
+            "snapshot_interval": 10000,  # WAL records between snapshots
+            "wal_fsync": False,
+            "merkle_batch_size": 1024,  # record hashes per anchored Merkle root
+            "merkle_batch_seconds": 300,  # seal a partial batch once its oldest hash is this old; 0 = only via seal_merkle_batch
+            "contract_abi_path": os.path.join("blockchain", "build", "BlueCarbonRegistry.abi.json"),
+            "chain_decimals": 3,  # fractional digits kept when amounts become contract integers
+            "tx_batch_size": 50,  # calls per multicall transaction
+            "tx_max_in_flight": 8,  # transactions awaiting receipts
+            "tx_receipt_timeout": 120,  # seconds before a stuck transaction is repriced
+            "tx_poll_interval": 2.0  # seconds between receipt polls
         }
         
         try:
@@ -97,9 +290,225 @@ class BlockchainMRVSystem:
         
         return default_config
     
+    def start(self):
+        """
+        Recover the persisted registry and start the background Merkle sealer.
+        
+        The API's startup hook, the Streamlit app and the scripts call this
+        before their first write. A registry that is never started stays in
+        memory only, so importing this module reads nothing from disk and
+        starts no threads. Calling it again does nothing.
+        """
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+            if self.config.get('persistence_enabled', True):
+                self.journal = RegistryJournal(
+                    self.config['registry_dir'],
+                    snapshot_interval=self.config['snapshot_interval'],
+                    fsync=self.config['wal_fsync']
+                )
+                self._recover()
+            if self.config['merkle_batch_seconds']:
+                self._merkle_sealer_stopping = False
+                self._merkle_sealer = threading.Thread(target=self._run_merkle_sealer, name="merkle-sealer", daemon=True)
+                self._merkle_sealer.start()
+    
+    def _recover(self):
+        """Restore the registry from the last snapshot and write-ahead log"""
+        state = self.journal.recover()
+        if state is None:
+            return
+        
+        self.projects = {k: _from_record(BlueCarbonProject, v) for k, v in state['projects'].items()}
+        self.verifications = {k: _from_record(VerificationRecord, v) for k, v in state['verifications'].items()}
+        self.credits = {k: _from_record(CarbonCredit, v) for k, v in state['credits'].items()}
+        self.company_emissions = dict(state['emissions'])
+        # 'listed' holds the listing's time priority; older logs stored True
+        listed = {k: (k if isinstance(v['listed'], bool) else v['listed'])
+                  for k, v in state['credits'].items() if v.get('listed')}
+        self._rebuild_indexes(listed)
+        self.merkle.load(state['merkle_batches'], self._merkle_leaves())
+        print(f"✅ Restored registry: {len(self.projects)} projects, {len(self.verifications)} verifications, {len(self.credits)} credits")
+    
+    def _rebuild_indexes(self, listed: Dict[int, int]):
+        """Derive every index and counter from the primary maps in one pass each"""
+        self.next_project_id = max(self.projects, default=0) + 1
+        self.next_verification_id = max(self.verifications, default=0) + 1
+        self.next_credit_id = max(self.credits, default=0) + 1
+        
+        self.projects_by_owner = {}
+        self.projects_by_ecosystem = {}
+        for project_id in sorted(self.projects):
+            project = self.projects[project_id]
+            self.projects_by_owner.setdefault(project.owner, []).append(project_id)
+            self.projects_by_ecosystem.setdefault(project.ecosystem_type, []).append(project_id)
+        
+        self.verifications_by_project = {}
+        for verification_id in sorted(self.verifications):
+            self.verifications_by_project.setdefault(self.verifications[verification_id].project_id, []).append(verification_id)
+        
+        self.carbon_credits = {}
+        self.active_credits_by_seller = {}
+        self.active_balances = {}
+        for credit_id in sorted(self.credits):
+            credit = self.credits[credit_id]
+            self.carbon_credits.setdefault(credit.seller, []).append(credit)
+            if credit.is_active:
+                self.active_credits_by_seller.setdefault(credit.seller, {})[credit_id] = None
+                self.active_balances[credit.seller] = self.active_balances.get(credit.seller, 0.0) + credit.amount
+            else:
+                self.active_balances.setdefault(credit.seller, 0.0)
+        
+        self.stats = RegistryStats()
+        for project in self.projects.values():
+            self.stats.project_added(project)
+        for verification in self.verifications.values():
+            self.stats.verification_added()
+            if verification.is_approved:
+                self.stats.verification_approved(verification.verified_carbon_amount)
+        self.stats.emissions_recorded(sum(self.company_emissions.values()))
+        
+        self.order_book = OrderBook()
+        self.order_book.bulk_load(
+            (credit_id, self.credits[credit_id].price_per_ton, self.credits[credit_id].project_id,
+             self.projects[self.credits[credit_id].project_id].ecosystem_type, sequence)
+            for credit_id, sequence in listed.items()
+            if self.credits[credit_id].is_active
+        )
+    
+    def _log(self, record_type: str, key, value):
+        """
+        Record a registry change: append it to the write-ahead log, then bump
+        the change versions.
+        
+        Call it after every field and stats update of the change, inside the
+        same critical section, so a reader that sees the new version also
+        sees the whole change.
+        """
+        if self.journal is not None:
+            self.journal.append(record_type, key, value)
+        if record_type == 'projects':
+            self._touch(value['owner'])
+        elif record_type == 'credits':
+            self._touch(value['seller'])
+        elif record_type == 'emissions':
+            self._touch(key)
+        else:
+            self._touch()
+    
+    def _touch(self, company_address: Optional[str] = None):
+        """Bump the global version, and the address's version when given"""
+        with self._version_lock:
+            self.version += 1
+            if company_address is not None:
+                self.company_versions[company_address] = self.version
+    
+    def get_version(self, company_address: Optional[str] = None) -> int:
+        """
+        Current change version, globally or for one address.
+        
+        Read it before reading the data it describes: the data is then at
+        least as new as the version.
+        """
+        if company_address is None:
+            return self.version
+        return self.company_versions.get(company_address, 0)
+    
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """
+        Register a callback for registry change events.
+        
+        Events are dicts with 'type', 'companies' (affected addresses),
+        'version', 'timestamp' and 'data'. Listeners run on the writing thread
+        after the change is applied, so they must not block.
+        """
+        self._listeners.append(listener)
+    
+    def remove_listener(self, listener: Callable[[Dict], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _emit(self, event_type: str, companies: List[str], data: Dict):
+        """Notify listeners of a change"""
+        if not self._listeners:
+            return
+        event = {
+            'type': event_type,
+            'companies': companies,
+            'version': self.version,
+            'timestamp': datetime.now().isoformat(),
+            'data': data
+        }
+        for listener in list(self._listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"❌ Event listener failed: {e}")
+    
+    def _allocate_id(self, counter: str) -> int:
+        """Atomically take the next value of an id counter attribute"""
+        with self._id_lock:
+            value = getattr(self, counter)
+            setattr(self, counter, value + 1)
+            return value
+    
+    def _log_credit(self, credit: CarbonCredit):
+        record = _to_record(credit)
+        record['listed'] = self.order_book.sequence_of(credit.id)
+        self._log('credits', credit.id, record)
+    
+    def snapshot(self):
+        """Write a compact snapshot of the whole registry and truncate the log"""
+        if self.journal is None:
+            return
+        with self._snapshot_lock:
+            self._write_snapshot()
+    
+    def _snapshot_if_due(self):
+        """Snapshot unless another thread is already writing one"""
+        if not self._snapshot_lock.acquire(blocking=False):
+            return
+        try:
+            if self.journal.snapshot_due():
+                self._write_snapshot()
+        finally:
+            self._snapshot_lock.release()
+    
+    def _write_snapshot(self):
+        # Exclusive gate: no mutation is in flight while the state is copied.
+        # Only the copy is made under the gate; mutations resume while the
+        # copy is serialized and written.
+        with self._snapshot_gate.exclusive():
+            credits = {}
+            for credit_id, credit in self.credits.items():
+                record = _to_record(credit)
+                record['listed'] = self.order_book.sequence_of(credit_id)
+                credits[credit_id] = record
+            state = {
+                'projects': {k: _to_record(v) for k, v in self.projects.items()},
+                'verifications': {k: _to_record(v) for k, v in self.verifications.items()},
+                'credits': credits,
+                'emissions': dict(self.company_emissions),
+                'merkle_batches': self.merkle.to_records()
+            }
+            mark = self.journal.mark()
+        self.journal.write_snapshot(state, mark)
+    
     def _initialize_blockchain(self):
         """Initialize blockchain connection"""
         try:
+            from web3 import Web3
+            from eth_account import Account
+            try:
+                from web3 import AsyncWeb3, AsyncHTTPProvider
+                self.async_web3 = AsyncWeb3(AsyncHTTPProvider(
+                    self.config['rpc_url'],
+                    request_kwargs={'timeout': self.config['rpc_timeout']}
+                ))
+            except ImportError:
+                pass  # web3 without the async client
             self.web3 = Web3(Web3.HTTPProvider(self.config['rpc_url']))
             if self.web3.is_connected():
                 print("✅ Connected to blockchain network")
@@ -108,11 +517,119 @@ class BlockchainMRVSystem:
                 if self.config.get('private_key'):
                     self.account = Account.from_key(self.config['private_key'])
                     print(f"Account address: {self.account.address}")
+                
+                abi_path = self.config['contract_abi_path']
+                if self.config.get('contract_address') and os.path.exists(abi_path):
+                    self.contract = self.web3.eth.contract(
+                        address=Web3.to_checksum_address(self.config['contract_address']),
+                        abi=load_file(abi_path)
+                    )
+                    if self.account is not None:
+                        self.attach_tx_pipeline(TransactionPipeline(
+                            Web3ChainClient(self.web3, self.contract, self.account),
+                            batch_size=self.config['tx_batch_size'],
+                            max_in_flight=self.config['tx_max_in_flight'],
+                            receipt_timeout=self.config['tx_receipt_timeout'],
+                            poll_interval=self.config['tx_poll_interval']
+                        ))
             else:
                 print("❌ Failed to connect to blockchain")
         except Exception as e:
             print(f"Blockchain initialization error: {e}")
     
+    def attach_tx_pipeline(self, pipeline: TransactionPipeline):
+        """Mirror registrations, verifications, emissions and Merkle roots on chain through pipeline"""
+        if self.tx_pipeline is not None:
+            self.remove_listener(self._queue_chain_calls)
+        self.tx_pipeline = pipeline
+        self.add_listener(self._queue_chain_calls)
+    
+    def _to_chain_units(self, amount: float) -> int:
+        return int(round(amount * 10 ** self.config['chain_decimals']))
+    
+    @staticmethod
+    def chain_address(account: str) -> str:
+        """
+        On-chain address for a registry company or verifier id.
+        
+        Ids that already are Ethereum addresses are used as they are; any
+        other id maps to a fixed address derived from its hash, so each
+        company keeps its own balances on chain. Verifiers must be
+        authorized on the contract (addVerifier) under this address.
+        """
+        if re.fullmatch(r'0x[0-9a-fA-F]{40}', account):
+            return account
+        return '0x' + hashlib.sha256(f"bluecarbon:{account}".encode()).hexdigest()[-40:]
+    
+    def _queue_chain_calls(self, event: Dict):
+        """
+        Registry event listener: queue the matching contract call.
+        
+        Calls are relayed from the pipeline's account through the contract's
+        owner-only *For functions, which take the acting address and the
+        registry ids; the contract maps registry ids to its own.
+        """
+        data = event['data']
+        if event['type'] == 'project_registered':
+            project = self.projects[data['project_id']]
+            self.tx_pipeline.submit('registerProjectFor', (
+                project.id,
+                self.chain_address(project.owner),
+                project.name,
+                project.location,
+                self._to_chain_units(project.area),
+                project.ecosystem_type,
+                self._to_chain_units(project.estimated_carbon_sequestration),
+                project.ipfs_hash
+            ), key=f"project:{project.id}")
+        elif event['type'] == 'verification_submitted':
+            verification = self.verifications[data['verification_id']]
+            self.tx_pipeline.submit('submitVerificationFor', (
+                verification.id,
+                verification.project_id,
+                self.chain_address(verification.verifier),
+                self._to_chain_units(verification.verified_carbon_amount),
+                verification.verification_data_hash,
+                verification.comments
+            ), key=f"verification:{verification.id}")
+        elif event['type'] == 'emissions_recorded':
+            self.tx_pipeline.submit('recordEmissionsFor', (
+                self.chain_address(event['companies'][0]),
+                self._to_chain_units(data['emissions'])
+            ))
+        elif event['type'] == 'merkle_root_sealed':
+            self.tx_pipeline.submit('anchorMerkleRoot', (
+                bytes.fromhex(data['root']),
+                data['batch_id'],
+                data['leaf_count']
+            ), key=f"merkle:{data['batch_id']}")
+    
+    async def get_chain_status(self) -> Dict:
+        """
+        Query the chain without blocking the event loop.
+        
+        Uses the async Web3 client, bounded by the rpc_timeout setting, so a slow
+        RPC endpoint only delays this call.
+        """
+        status = {
+            'enabled': bool(self.config.get('blockchain_enabled', False)),
+            'network': self.config.get('network'),
+            'connected': False,
+            'block_number': None,
+            'transactions': self.tx_pipeline.stats() if self.tx_pipeline is not None else None
+        }
+        if self.async_web3 is None:
+            return status
+        try:
+            timeout = self.config['rpc_timeout']
+            status['connected'] = await asyncio.wait_for(self.async_web3.is_connected(), timeout)
+            if status['connected']:
+                status['block_number'] = await asyncio.wait_for(self.async_web3.eth.block_number, timeout)
+        except Exception as e:
+            status['error'] = str(e)
+        return status
+    
+    @_mutation
     def register_blue_carbon_project(self, 
                                    name: str,
                                    location: str,
@@ -126,26 +643,40 @@ class BlockchainMRVSystem:
         # Create IPFS hash for project data
         ipfs_hash = self._store_to_ipfs(project_data)
         
-        project = BlueCarbonProject(
-            id=self.next_project_id,
-            name=name,
-            location=location,
-            area=area,
-            ecosystem_type=ecosystem_type,
-            owner=owner,
-            estimated_carbon_sequestration=estimated_sequestration,
-            created_at=datetime.now(),
-            status="PROPOSED",
-            ipfs_hash=ipfs_hash
-        )
-        
-        self.projects[self.next_project_id] = project
-        project_id = self.next_project_id
-        self.next_project_id += 1
+        # Ids are allocated under the registry lock so index lists stay in id order
+        with self._registry_lock:
+            project_id = self._allocate_id('next_project_id')
+            project = BlueCarbonProject(
+                id=project_id,
+                name=name,
+                location=location,
+                area=area,
+                ecosystem_type=ecosystem_type,
+                owner=owner,
+                estimated_carbon_sequestration=estimated_sequestration,
+                created_at=datetime.now(),
+                status="PROPOSED",
+                ipfs_hash=ipfs_hash
+            )
+            
+            self.projects[project_id] = project
+            self.projects_by_owner.setdefault(owner, []).append(project_id)
+            self.projects_by_ecosystem.setdefault(ecosystem_type, []).append(project_id)
+            self.stats.project_added(project)
+            self._add_merkle_leaf(f"project:{project_id}", ipfs_hash)
+            self._log('projects', project_id, _to_record(project))
+        self._announce_sealed_batches()
         
+        self._emit('project_registered', [owner], {
+            'project_id': project_id,
+            'name': name,
+            'ecosystem_type': ecosystem_type,
+            'estimated_carbon_sequestration': estimated_sequestration
+        })
         print(f"✅ Blue carbon project registered: {name} (ID: {project_id})")
         return project_id
     
+    @_mutation
     def submit_verification(self,
                           project_id: int,
                           verified_amount: float,
@@ -160,8 +691,65 @@ class BlockchainMRVSystem:
         # Create hash for verification data
         data_hash = self._create_data_hash(verification_data)
         
+        with self._registry_lock:
+            verification_id = self._add_verification(project_id, verified_amount, verifier, data_hash, comments)
+        self._announce_sealed_batches()
+        self._emit_verification_submitted(verification_id)
+        
+        print(f"✅ Verification submitted for project {project_id} by {verifier}")
+        return verification_id
+    
+    @_mutation
+    def submit_verifications_bulk(self, verifications: List[Dict]) -> List[Optional[int]]:
+        """
+        Submit many verification records under one registry lock acquisition.
+        
+        Args:
+            verifications: Dicts with submit_verification's keyword arguments
+            
+        Returns:
+            New verification id per item, or None where the project does not exist
+        """
+        # Hash outside the lock; only the inserts need it
+        hashes = [self._create_data_hash(item.get('verification_data', {})) for item in verifications]
+        
+        verification_ids = []
+        with self._registry_lock:
+            for item, data_hash in zip(verifications, hashes):
+                if item['project_id'] not in self.projects:
+                    verification_ids.append(None)
+                    continue
+                verification_ids.append(self._add_verification(
+                    item['project_id'],
+                    item['verified_amount'],
+                    item['verifier'],
+                    data_hash,
+                    item.get('comments', "")
+                ))
+        self._announce_sealed_batches()
+        
+        for verification_id in verification_ids:
+            if verification_id is not None:
+                self._emit_verification_submitted(verification_id)
+        
+        submitted = sum(1 for v in verification_ids if v is not None)
+        print(f"✅ {submitted} of {len(verifications)} verifications submitted")
+        return verification_ids
+    
+    def _emit_verification_submitted(self, verification_id: int):
+        verification = self.verifications[verification_id]
+        self._emit('verification_submitted', [self.projects[verification.project_id].owner], {
+            'verification_id': verification_id,
+            'project_id': verification.project_id,
+            'verifier': verification.verifier,
+            'verified_amount': verification.verified_carbon_amount
+        })
+    
+    def _add_verification(self, project_id: int, verified_amount: float, verifier: str, data_hash: str, comments: str) -> int:
+        """Insert a verification record (caller holds the registry lock)"""
+        verification_id = self._allocate_id('next_verification_id')
         verification = VerificationRecord(
-            id=self.next_verification_id,
+            id=verification_id,
             project_id=project_id,
             verifier=verifier,
             verified_carbon_amount=verified_amount,
@@ -171,13 +759,14 @@ class BlockchainMRVSystem:
             comments=comments
         )
         
-        self.verifications[self.next_verification_id] = verification
-        verification_id = self.next_verification_id
-        self.next_verification_id += 1
-        
-        print(f"✅ Verification submitted for project {project_id} by {verifier}")
+        self.verifications[verification_id] = verification
+        self.verifications_by_project.setdefault(project_id, []).append(verification_id)
+        self.stats.verification_added()
+        self._add_merkle_leaf(f"verification:{verification_id}", data_hash)
+        self._log('verifications', verification_id, _to_record(verification))
         return verification_id
     
+    @_mutation
     def approve_verification_and_issue_credits(self, verification_id: int) -> bool:
         """Approve verification and issue carbon credits"""
         
@@ -185,45 +774,138 @@ class BlockchainMRVSystem:
             raise ValueError(f"Verification {verification_id} does not exist")
         
         verification = self.verifications[verification_id]
-        if verification.is_approved:
-            raise ValueError("Verification already approved")
-        
-        # Approve verification
-        verification.is_approved = True
-        
-        # Issue carbon credits to project owner
-        project = self.projects[verification.project_id]
-        if project.owner not in self.carbon_credits:
-            self.carbon_credits[project.owner] = []
-        
-        credit = CarbonCredit(
-            project_id=verification.project_id,
-            amount=verification.verified_carbon_amount,
-            price_per_ton=50.0,  # Default price, can be updated
-            seller=project.owner,
-            is_active=True,
-            created_at=datetime.now()
-        )
-        
-        self.carbon_credits[project.owner].append(credit)
+        with self._registry_lock:
+            if verification.is_approved:
+                raise ValueError("Verification already approved")
+            
+            # Approve verification
+            verification.is_approved = True
+            self.stats.verification_approved(verification.verified_carbon_amount)
+            self._log('verifications', verification_id, _to_record(verification))
+            
+            # Issue carbon credits to project owner
+            project = self.projects[verification.project_id]
+            credit = self._issue_credit(
+                project_id=verification.project_id,
+                amount=verification.verified_carbon_amount,
+                price_per_ton=50.0,  # Default price, can be updated
+                holder=project.owner
+            )
         
+        self._emit('verification_approved', [project.owner], {
+            'verification_id': verification_id,
+            'project_id': verification.project_id,
+            'verified_amount': verification.verified_carbon_amount
+        })
+        self._emit('credits_issued', [project.owner], {
+            'credit_id': credit.id,
+            'project_id': credit.project_id,
+            'amount': credit.amount,
+            'price_per_ton': credit.price_per_ton
+        })
         print(f"✅ Verification approved and {verification.verified_carbon_amount} carbon credits issued to {project.owner}")
         return True
     
+    def _issue_credit(self, project_id: int, amount: float, price_per_ton: float, holder: str) -> CarbonCredit:
+        """Create an active credit held by holder and add it to the indexes"""
+        with self._account_locks.hold(holder):
+            credit = CarbonCredit(
+                project_id=project_id,
+                amount=amount,
+                price_per_ton=price_per_ton,
+                seller=holder,
+                is_active=True,
+                created_at=datetime.now(),
+                id=self._allocate_id('next_credit_id')
+            )
+            
+            self.credits[credit.id] = credit
+            self.carbon_credits.setdefault(holder, []).append(credit)
+            seller_credits = dict(self.active_credits_by_seller.get(holder, {}))
+            seller_credits[credit.id] = None
+            self.active_credits_by_seller[holder] = seller_credits
+            self.active_balances[holder] = self.active_balances.get(holder, 0.0) + amount
+            with self._book_lock:
+                self.order_book.add(credit.id, price_per_ton, project_id, self.projects[project_id].ecosystem_type)
+            self._log_credit(credit)
+            return credit
+    
+    def _deactivate_credit(self, credit: CarbonCredit):
+        """Mark a credit as used up and drop it from the active index (caller holds its locks)"""
+        credit.is_active = False
+        with self._book_lock:
+            self.order_book.cancel(credit.id)
+        self.active_balances[credit.seller] = self.active_balances.get(credit.seller, 0.0) - credit.amount
+        seller_credits = self.active_credits_by_seller.get(credit.seller)
+        if seller_credits is not None:
+            seller_credits = dict(seller_credits)
+            seller_credits.pop(credit.id, None)
+            if seller_credits:
+                self.active_credits_by_seller[credit.seller] = seller_credits
+            else:
+                del self.active_credits_by_seller[credit.seller]
+                # No active credits left; drop any accumulated rounding error
+                self.active_balances[credit.seller] = 0.0
+        self._log_credit(credit)
+    
+    def _reduce_credit(self, credit: CarbonCredit, amount: float):
+        """Take amount off an active credit that stays active (a split; caller holds its locks)"""
+        credit.amount -= amount
+        self.active_balances[credit.seller] -= amount
+        self._log_credit(credit)
+    
+    def _transfer_credit(self, credit: CarbonCredit, amount: float, buyer: str, price_per_ton: float) -> CarbonCredit:
+        """Move amount of an active credit to buyer, retiring or splitting the source credit"""
+        if credit.amount <= amount:
+            self._deactivate_credit(credit)
+        else:
+            self._reduce_credit(credit, amount)
+        
+        # Buyer receives a new credit for the transferred amount
+        return self._issue_credit(
+            project_id=credit.project_id,
+            amount=amount,
+            price_per_ton=price_per_ton,
+            holder=buyer
+        )
+    
+    @_mutation
     def record_company_emissions(self, company_address: str, emissions: float):
         """Record company emissions for carbon accounting"""
-        if company_address not in self.company_emissions:
-            self.company_emissions[company_address] = 0
-        
-        self.company_emissions[company_address] += emissions
+        with self._account_locks.hold(company_address):
+            self.company_emissions[company_address] = self.company_emissions.get(company_address, 0) + emissions
+            total = self.company_emissions[company_address]
+            self.stats.emissions_recorded(emissions)
+            self._log('emissions', company_address, total)
+        self._emit('emissions_recorded', [company_address], {'emissions': emissions, 'total_emissions': total})
         print(f"📊 Recorded {emissions} tons CO2 emissions for {company_address}")
     
     def get_company_carbon_balance(self, company_address: str) -> float:
         """Get company's total carbon credits"""
-        if company_address not in self.carbon_credits:
-            return 0.0
+        return self.active_balances.get(company_address, 0.0)
+    
+    def check_balance_consistency(self, repair: bool = False) -> Dict[str, Tuple[float, float]]:
+        """
+        Recompute every balance from the credit ledger and compare it with the running counters.
         
-        return sum(credit.amount for credit in self.carbon_credits[company_address] if credit.is_active)
+        Args:
+            repair: Overwrite mismatched counters with the recomputed values
+            
+        Returns:
+            Dict of address -> (counter, recomputed) for every mismatch
+        """
+        mismatches = {}
+        # Exclusive gate: balances and credits are compared at a quiescent point
+        with self._snapshot_gate.exclusive():
+            for company_address in set(self.carbon_credits) | set(self.active_balances):
+                expected = sum(c.amount for c in self.carbon_credits.get(company_address, []) if c.is_active)
+                actual = self.active_balances.get(company_address, 0.0)
+                if not math.isclose(actual, expected, rel_tol=1e-9, abs_tol=1e-6):
+                    mismatches[company_address] = (actual, expected)
+                    if repair:
+                        self.active_balances[company_address] = expected
+                        self._touch(company_address)
+        return mismatches
     
     def get_company_emissions(self, company_address: str) -> float:
         """Get company's total emissions"""
@@ -235,54 +917,222 @@ class BlockchainMRVSystem:
         emissions = self.get_company_emissions(company_address)
         return credits - emissions
     
+    @_mutation
+    def record_company_emissions_bulk(self, entries: List[Tuple[str, float]]) -> Dict[str, float]:
+        """
+        Record many (company_address, emissions) entries at once.
+        
+        Entries are summed per address first, so each address is locked, updated
+        and logged once however many entries it has.
+        
+        Returns:
+            Dict of address -> new emissions total, for the addresses touched
+        """
+        increments: Dict[str, float] = {}
+        for company_address, emissions in entries:
+            increments[company_address] = increments.get(company_address, 0.0) + emissions
+        
+        totals = {}
+        with self._account_locks.hold(*increments):
+            for company_address, emissions in increments.items():
+                total = self.company_emissions.get(company_address, 0) + emissions
+                self.company_emissions[company_address] = total
+                self.stats.emissions_recorded(emissions)
+                self._log('emissions', company_address, total)
+                totals[company_address] = total
+        for company_address, total in totals.items():
+            self._emit('emissions_recorded', [company_address], {
+                'emissions': increments[company_address],
+                'total_emissions': total
+            })
+        return totals
+    
+    @_mutation
     def purchase_carbon_credits(self, 
                               buyer: str, 
                               seller: str, 
                               amount: float, 
                               price_per_ton: float) -> bool:
-        """Purchase carbon credits from marketplace"""
-        
-        # Check if seller has enough credits
-        seller_credits = self.get_company_carbon_balance(seller)
-        if seller_credits < amount:
-            raise ValueError(f"Seller has insufficient credits. Available: {seller_credits}, Requested: {amount}")
-        
-        # Find and deactivate seller's credits
-        credits_to_transfer = []
-        remaining_amount = amount
-        
-        for credit in self.carbon_credits.get(seller, []):
-            if credit.is_active and remaining_amount > 0:
-                if credit.amount <= remaining_amount:
-                    credits_to_transfer.append(credit)
-                    remaining_amount -= credit.amount
-                    credit.is_active = False
-                else:
-                    # Split the credit
-                    new_credit = CarbonCredit(
-                        project_id=credit.project_id,
-                        amount=remaining_amount,
-                        price_per_ton=price_per_ton,
-                        seller=buyer,
-                        is_active=True,
-                        created_at=datetime.now()
-                    )
-                    credits_to_transfer.append(new_credit)
-                    credit.amount -= remaining_amount
-                    remaining_amount = 0
+        """
+        Buy credits a seller has listed, best price first.
         
-        # Transfer credits to buyer
-        if buyer not in self.carbon_credits:
-            self.carbon_credits[buyer] = []
+        Only the seller's listings priced at or below price_per_ton are taken,
+        and each fill executes at its listing's price. Credits the seller has
+        not listed, or has withdrawn with cancel_listing, are never sold.
+        """
         
-        for credit in credits_to_transfer:
-            credit.seller = buyer
-            self.carbon_credits[buyer].append(credit)
+        if amount <= 0:
+            raise ValueError("Purchase amount must be positive")
+        if buyer == seller:
+            raise ValueError("Buyer and seller must be different companies")
         
-        total_cost = amount * price_per_ton
+        # The seller's stripe freezes the seller's credits and listings, so the
+        # plan below stays valid while it is executed
+        with self._account_locks.hold(buyer, seller):
+            # Plan the fills first so nothing changes unless the order can be filled
+            listed = sorted(
+                key for key in map(self.order_book.key_of, self.active_credits_by_seller.get(seller, {}))
+                if key is not None
+            )
+            fills = []
+            remaining_amount = amount
+            for price, _, credit_id in listed:
+                if remaining_amount <= 0 or price > price_per_ton:
+                    break
+                credit = self.credits[credit_id]
+                fill_amount = min(credit.amount, remaining_amount)
+                fills.append((credit, fill_amount, price))
+                remaining_amount -= fill_amount
+            
+            if remaining_amount > 1e-9:
+                raise ValueError(f"Seller has insufficient listed credits at or below ${price_per_ton}/ton. "
+                                 f"Available: {amount - remaining_amount}, Requested: {amount}")
+            
+            executed = []
+            total_cost = 0.0
+            for credit, fill_amount, price in fills:
+                executed.append({
+                    'credit_id': credit.id,
+                    'seller': seller,
+                    'project_id': credit.project_id,
+                    'amount': fill_amount,
+                    'price_per_ton': price
+                })
+                self._transfer_credit(credit, fill_amount, buyer, price)
+                total_cost += fill_amount * price
+        
+        self._emit('credits_purchased', [buyer, seller], {
+            'buyer': buyer,
+            'amount': amount,
+            'total_cost': total_cost,
+            'fills': executed
+        })
         print(f"✅ Transferred {amount} carbon credits from {seller} to {buyer} for ${total_cost}")
         return True
     
+    @_mutation
+    def buy_carbon_credits(self,
+                           buyer: str,
+                           amount: float,
+                           max_price: Optional[float] = None,
+                           project_id: Optional[int] = None,
+                           ecosystem_type: Optional[str] = None,
+                           allow_partial: bool = False) -> Dict:
+        """
+        Fill a buy order from the order book at the best available prices.
+        
+        Listings are taken in price-time priority across all sellers, skipping
+        the buyer's own listings. Each fill executes at the listing's price.
+        
+        Args:
+            buyer: Buying company address
+            amount: Tons of CO2 to buy
+            max_price: Highest acceptable price per ton
+            project_id: Only buy credits from this project
+            ecosystem_type: Only buy credits from projects of this ecosystem
+            allow_partial: Fill what is available instead of failing when liquidity is short
+            
+        Returns:
+            Dict with the filled amount, total cost, average price and per-listing fills
+        """
+        if amount <= 0:
+            raise ValueError("Purchase amount must be positive")
+        
+        while True:
+            # Plan the fills from the book first so nothing changes unless the
+            # order can be filled
+            fills = []
+            remaining_amount = amount
+            with self._book_lock:
+                for key in self.order_book.iter_listings(project_id, ecosystem_type, max_price):
+                    if remaining_amount <= 0:
+                        break
+                    credit = self.credits[key[2]]
+                    if credit.seller == buyer:
+                        continue
+                    fill_amount = min(credit.amount, remaining_amount)
+                    fills.append((credit, fill_amount, key))
+                    remaining_amount -= fill_amount
+            
+            filled_amount = amount - remaining_amount
+            if remaining_amount > 1e-9 and not allow_partial:
+                raise ValueError(f"Insufficient credits in the order book. Available: {filled_amount}, Requested: {amount}")
+            
+            executed = []
+            total_cost = 0.0
+            with self._account_locks.hold(buyer, *(credit.seller for credit, _, _ in fills)):
+                # A listing may have been sold, repriced or withdrawn between
+                # planning and locking its seller; if so, plan again
+                if any(self.order_book.key_of(credit.id) != key or credit.amount < fill_amount
+                       for credit, fill_amount, key in fills):
+                    continue
+                for credit, fill_amount, (price, _, _) in fills:
+                    executed.append({
+                        'credit_id': credit.id,
+                        'seller': credit.seller,
+                        'project_id': credit.project_id,
+                        'amount': fill_amount,
+                        'price_per_ton': price
+                    })
+                    self._transfer_credit(credit, fill_amount, buyer, price)
+                    total_cost += fill_amount * price
+            break
+        
+        if executed:
+            sellers = list(dict.fromkeys(fill['seller'] for fill in executed))
+            self._emit('credits_purchased', [buyer] + sellers, {
+                'buyer': buyer,
+                'amount': filled_amount,
+                'total_cost': total_cost,
+                'fills': executed
+            })
+        print(f"✅ Matched {filled_amount} carbon credits for {buyer} across {len(executed)} listings for ${total_cost}")
+        return {
+            'buyer': buyer,
+            'requested_amount': amount,
+            'filled_amount': filled_amount,
+            'total_cost': total_cost,
+            'average_price': total_cost / filled_amount if filled_amount else 0.0,
+            'fills': executed
+        }
+    
+    @_mutation
+    def list_credit(self, credit_id: int, price_per_ton: float):
+        """Offer an active credit for sale, or change its asking price; either way it joins the back of its price level"""
+        if price_per_ton <= 0:
+            raise ValueError("Price per ton must be positive")
+        credit = self.credits.get(credit_id)
+        if credit is None:
+            raise ValueError(f"Credit {credit_id} is not active")
+        # A credit's holder never changes, so its stripe guards the credit
+        with self._account_locks.hold(credit.seller):
+            if not credit.is_active:
+                raise ValueError(f"Credit {credit_id} is not active")
+            credit.price_per_ton = price_per_ton
+            with self._book_lock:
+                self.order_book.add(credit_id, price_per_ton, credit.project_id, self.projects[credit.project_id].ecosystem_type)
+            self._log_credit(credit)
+        self._emit('listing_updated', [credit.seller], {
+            'credit_id': credit_id,
+            'project_id': credit.project_id,
+            'amount': credit.amount,
+            'price_per_ton': price_per_ton
+        })
+    
+    @_mutation
+    def cancel_listing(self, credit_id: int) -> bool:
+        """Withdraw a credit from sale; the holder keeps it"""
+        credit = self.credits.get(credit_id)
+        if credit is None:
+            return False
+        with self._account_locks.hold(credit.seller):
+            with self._book_lock:
+                if not self.order_book.cancel(credit_id):
+                    return False
+            self._log_credit(credit)
+        self._emit('listing_cancelled', [credit.seller], {'credit_id': credit_id, 'project_id': credit.project_id})
+        return True
+    
     def get_project_details(self, project_id: int) -> Optional[BlueCarbonProject]:
         """Get project details"""
         return self.projects.get(project_id)
@@ -293,34 +1143,291 @@ class BlockchainMRVSystem:
     
     def get_verification_records(self, project_id: int) -> List[VerificationRecord]:
         """Get all verification records for a project"""
-        return [v for v in self.verifications.values() if v.project_id == project_id]
+        return [self.verifications[v] for v in self.verifications_by_project.get(project_id, [])]
+    
+    def get_projects_by_owner(self, owner: str) -> List[BlueCarbonProject]:
+        """Get all projects owned by an address"""
+        return [self.projects[p] for p in self.projects_by_owner.get(owner, [])]
+    
+    def get_projects_by_ecosystem(self, ecosystem_type: str) -> List[BlueCarbonProject]:
+        """Get all projects of an ecosystem type"""
+        return [self.projects[p] for p in self.projects_by_ecosystem.get(ecosystem_type, [])]
+    
+    def query_projects(self,
+                       owner: Optional[str] = None,
+                       ecosystem_type: Optional[str] = None,
+                       status: Optional[str] = None,
+                       location: Optional[str] = None,
+                       after_id: Optional[int] = None,
+                       limit: int = 50) -> Tuple[List[BlueCarbonProject], Optional[int]]:
+        """
+        Page through projects in id order.
+        
+        owner and ecosystem_type are served from the secondary indexes; status
+        and location (case-insensitive substring) are checked per candidate.
+        
+        Args:
+            after_id: Return projects with ids greater than this cursor
+            limit: Maximum number of projects to return
+            
+        Returns:
+            Tuple of (projects, cursor for the next page or None at the end)
+        """
+        start = after_id or 0
+        indexes = []
+        if owner is not None:
+            indexes.append(self.projects_by_owner.get(owner, []))
+        if ecosystem_type is not None:
+            indexes.append(self.projects_by_ecosystem.get(ecosystem_type, []))
+        if indexes:
+            # Index lists are in id order; walk the smaller one from the cursor
+            candidates = min(indexes, key=len)
+            ids = islice(candidates, bisect_right(candidates, start), None)
+        else:
+            ids = range(start + 1, self.next_project_id)
+        
+        location = location.lower() if location else None
+        page = []
+        for project_id in ids:
+            project = self.projects.get(project_id)
+            if (project is None
+                    or (owner is not None and project.owner != owner)
+                    or (ecosystem_type is not None and project.ecosystem_type != ecosystem_type)
+                    or (status is not None and project.status != status)
+                    or (location and location not in project.location.lower())):
+                continue
+            if len(page) == limit:
+                return page, page[-1].id
+            page.append(project)
+        return page, None
+    
+    def iter_projects(self, start_date=None, end_date=None) -> Iterator[BlueCarbonProject]:
+        """Stream projects in id order, optionally by creation date, without copying the registry"""
+        for project_id in range(1, self.next_project_id):
+            project = self.projects.get(project_id)
+            if project is not None and _within(project.created_at, start_date, end_date):
+                yield project
+    
+    def iter_verifications(self, start_date=None, end_date=None) -> Iterator[VerificationRecord]:
+        """Stream verification records in id order, optionally by verification date"""
+        for verification_id in range(1, self.next_verification_id):
+            verification = self.verifications.get(verification_id)
+            if verification is not None and _within(verification.verification_date, start_date, end_date):
+                yield verification
+    
+    def iter_credits(self, start_date=None, end_date=None) -> Iterator[CarbonCredit]:
+        """Stream credits (active and retired) in id order, optionally by issue date"""
+        for credit_id in range(1, self.next_credit_id):
+            credit = self.credits.get(credit_id)
+            if credit is not None and _within(credit.created_at, start_date, end_date):
+                yield credit
+    
+    def get_active_credits(self, seller: str) -> List[CarbonCredit]:
+        """Get a company's active credits in issue order"""
+        return [self.credits[c] for c in self.active_credits_by_seller.get(seller, {})]
     
     def _store_to_ipfs(self, data: Dict) -> str:
         """Store data to IPFS (mock implementation)"""
-        # In production, this would upload to IPFS
-        data_str = json.dumps(data, sort_keys=True)
-        return hashlib.sha256(data_str.encode()).hexdigest()
+        # In production, this would upload to IPFS; the mock CID is the payload hash,
+        # which also serves as the project's Merkle leaf
+        return hash_payload(data)
     
     def _create_data_hash(self, data: Dict) -> str:
         """Create hash for data integrity"""
-        data_str = json.dumps(data, sort_keys=True)
-        return hashlib.sha256(data_str.encode()).hexdigest()
-    
-    def get_marketplace_listings(self) -> List[Dict]:
-        """Get available carbon credits in marketplace"""
-        listings = []
-        for seller, credits in self.carbon_credits.items():
-            for credit in credits:
-                if credit.is_active:
-                    listings.append({
-                        'seller': seller,
-                        'project_id': credit.project_id,
-                        'amount': credit.amount,
-                        'price_per_ton': credit.price_per_ton,
-                        'total_price': credit.amount * credit.price_per_ton,
-                        'created_at': credit.created_at.isoformat()
-                    })
-        return listings
+        return hash_payload(data)
+    
+    def _merkle_leaves(self) -> List[Tuple[str, str]]:
+        """(record key, payload hash) of every project and verification, in creation order"""
+        leaves = [(p.created_at, f"project:{p.id}", p.ipfs_hash) for p in self.projects.values()]
+        leaves += [(v.verification_date, f"verification:{v.id}", v.verification_data_hash)
+                   for v in self.verifications.values()]
+        leaves.sort(key=lambda leaf: leaf[0])
+        return [(key, payload_hash) for _, key, payload_hash in leaves]
+    
+    def _add_merkle_leaf(self, record_key: str, payload_hash: str):
+        """
+        Queue a record hash (caller holds the registry lock).
+        
+        A batch sealed by it is persisted at once and announced by
+        _announce_sealed_batches once the caller has released its locks.
+        """
+        batch = self.merkle.add(record_key, payload_hash)
+        if batch is not None:
+            self._log('merkle_batches', batch.id, batch.to_record())
+            sealed = getattr(self._local, 'sealed_batches', None)
+            if sealed is None:
+                sealed = self._local.sealed_batches = []
+            sealed.append(batch)
+    
+    def _announce_sealed_batches(self):
+        """Announce the batches this thread's last change sealed (no locks held)"""
+        sealed = getattr(self._local, 'sealed_batches', None)
+        if sealed:
+            self._local.sealed_batches = []
+            for batch in sealed:
+                self._announce_merkle_batch(batch)
+    
+    def _merkle_batch_sealed(self, batch):
+        """Persist a sealed batch and announce its root for anchoring"""
+        self._log('merkle_batches', batch.id, batch.to_record())
+        self._announce_merkle_batch(batch)
+    
+    def _announce_merkle_batch(self, batch):
+        self._emit('merkle_root_sealed', [], {
+            'batch_id': batch.id,
+            'root': batch.root,
+            'leaf_count': len(batch.leaves)
+        })
+        print(f"🌳 Sealed Merkle batch {batch.id}: {len(batch.leaves)} records, root {batch.root[:16]}...")
+    
+    @_mutation
+    def seal_merkle_batch(self) -> Optional[Dict]:
+        """
+        Seal the pending record hashes into a Merkle batch now.
+        
+        Returns:
+            Dict with batch_id, root and leaf_count, or None if nothing is pending
+        """
+        batch = self.merkle.seal()
+        if batch is None:
+            return None
+        self._merkle_batch_sealed(batch)
+        return {'batch_id': batch.id, 'root': batch.root, 'leaf_count': len(batch.leaves)}
+    
+    @_mutation
+    def _seal_merkle_batch_if_due(self):
+        batch = self.merkle.seal_if_due()
+        if batch is not None:
+            self._merkle_batch_sealed(batch)
+    
+    def _run_merkle_sealer(self):
+        while not self._merkle_sealer_stopping:
+            if self.merkle.wait_until_due(timeout=self.config['merkle_batch_seconds']):
+                try:
+                    self._seal_merkle_batch_if_due()
+                except Exception as e:
+                    print(f"❌ Merkle sealing failed: {e}")
+                    time.sleep(1)
+    
+    def close(self):
+        """Stop the background Merkle sealer and close the write-ahead log"""
+        self._merkle_sealer_stopping = True
+        if self._merkle_sealer is not None:
+            self.merkle.wake()
+            self._merkle_sealer.join()
+            self._merkle_sealer = None
+        if self.journal is not None:
+            self.journal.close()
+    
+    def get_merkle_proof(self, record_type: str, record_id: int) -> Optional[Dict]:
+        """
+        Inclusion proof of a project or verification payload hash.
+        
+        Args:
+            record_type: 'project' or 'verification'
+            record_id: Project or verification id
+            
+        Returns:
+            Proof dict (see MerkleAccumulator.get_proof), {'status': 'pending'}
+            if the record is not sealed yet, or None for an unknown record
+        """
+        if record_type not in ('project', 'verification'):
+            raise ValueError(f"Unknown record type: {record_type}")
+        record_key = f"{record_type}:{record_id}"
+        proof = self.merkle.get_proof(record_key)
+        if proof is not None:
+            proof['status'] = 'sealed'
+            return proof
+        records = self.projects if record_type == 'project' else self.verifications
+        if record_id in records:
+            return {'status': 'pending'}
+        return None
+    
+    def _listing(self, credit: CarbonCredit) -> Dict:
+        """Marketplace listing for an active credit"""
+        return {
+            'credit_id': credit.id,
+            'seller': credit.seller,
+            'project_id': credit.project_id,
+            'amount': credit.amount,
+            'price_per_ton': credit.price_per_ton,
+            'total_price': credit.amount * credit.price_per_ton,
+            'created_at': credit.created_at.isoformat()
+        }
+    
+    def get_marketplace_listings(self,
+                                 seller: Optional[str] = None,
+                                 project_id: Optional[int] = None,
+                                 ecosystem_type: Optional[str] = None) -> List[Dict]:
+        """Get available carbon credits in marketplace, best price first"""
+        if seller is not None:
+            return [
+                self._listing(credit) for credit in self.get_active_credits(seller)
+                if credit.id in self.order_book
+                and (project_id is None or credit.project_id == project_id)
+                and (ecosystem_type is None or self.projects[credit.project_id].ecosystem_type == ecosystem_type)
+            ]
+        # The order book is one shared structure; hold its lock while walking it
+        with self._book_lock:
+            return [
+                self._listing(self.credits[credit_id])
+                for _, _, credit_id in self.order_book.iter_listings(project_id, ecosystem_type)
+            ]
+    
+    def query_marketplace_listings(self,
+                                   seller: Optional[str] = None,
+                                   project_id: Optional[int] = None,
+                                   ecosystem_type: Optional[str] = None,
+                                   min_price: Optional[float] = None,
+                                   max_price: Optional[float] = None,
+                                   after: Optional[Tuple[float, int, int]] = None,
+                                   limit: int = 50) -> Tuple[List[Dict], Optional[Tuple[float, int, int]]]:
+        """
+        Page through marketplace listings in price-time order.
+        
+        Args:
+            after: (price_per_ton, sequence, credit_id) key of the last listing already returned
+            limit: Maximum number of listings to return
+            
+        Returns:
+            Tuple of (listings, cursor key for the next page or None at the end)
+        """
+        if min_price is not None and (after is None or after < (min_price, 0, 0)):
+            # Listing sequences start at 1, so this resumes at the first listing priced min_price
+            after = (min_price, 0, 0)
+        
+        # The order book is one shared structure; hold its lock for one page
+        with self._book_lock:
+            return self._listings_page(seller, project_id, ecosystem_type, max_price, after, limit)
+    
+    def _listings_page(self, seller, project_id, ecosystem_type, max_price, after, limit):
+        if seller is not None:
+            keys = sorted(
+                self.order_book.key_of(credit_id)
+                for credit_id in self.active_credits_by_seller.get(seller, {})
+                if credit_id in self.order_book
+            )
+            start = bisect_right(keys, after) if after is not None else 0
+            keys = (
+                key for key in islice(keys, start, None)
+                if (max_price is None or key[0] <= max_price)
+                and (project_id is None or self.credits[key[2]].project_id == project_id)
+                and (ecosystem_type is None or self.projects[self.credits[key[2]].project_id].ecosystem_type == ecosystem_type)
+            )
+        else:
+            keys = self.order_book.iter_listings(project_id, ecosystem_type, max_price, after)
+        
+        page = list(islice(keys, limit + 1))
+        if len(page) > limit:
+            page = page[:limit]
+            return [self._listing(self.credits[credit_id]) for _, _, credit_id in page], page[-1]
+        return [self._listing(self.credits[credit_id]) for _, _, credit_id in page], None
+    
+    def get_system_stats(self) -> Dict:
+        """Registry-wide statistics from the maintained aggregates"""
+        stats = self.stats.snapshot()
+        stats['active_companies'] = len(self.carbon_credits)
+        return stats
     
     def get_company_dashboard_data(self, company_address: str) -> Dict:
         """Get comprehensive dashboard data for a company"""
@@ -329,10 +1436,16 @@ class BlockchainMRVSystem:
             'carbon_credits': self.get_company_carbon_balance(company_address),
             'total_emissions': self.get_company_emissions(company_address),
             'net_balance': self.get_company_net_balance(company_address),
-            'owned_projects': [p for p in self.projects.values() if p.owner == company_address],
+            'owned_projects': self.get_projects_by_owner(company_address),
             'verification_status': 'Carbon Positive' if self.get_company_net_balance(company_address) > 0 else 'Carbon Negative',
-            'marketplace_listings': [l for l in self.get_marketplace_listings() if l['seller'] == company_address]
+            'marketplace_listings': self.get_marketplace_listings(seller=company_address)
         }
 
-# Global instance
-blockchain_mrv = BlockchainMRVSystem()
\ No newline at end of file
+# Global instance; entry points call start() (or use started_registry) to recover it
+blockchain_mrv = BlockchainMRVSystem()
+
+
+def started_registry() -> BlockchainMRVSystem:
+    """The global registry, recovered from disk with its background work running"""
+    blockchain_mrv.start()
+    return blockchain_mrv
\ No newline at end of file
@@ -3,21 +3,48 @@ Company Management System for Carbon Accounting and Blockchain Integration
 Handles company registration, authentication, and data management
 """
 
-import json
 import os
+import shutil
 import hashlib
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Hashable, Iterator, List, Optional
 import pandas as pd
+from emissions_store import get_emissions_store
+from serialization import dump_file, load_file
+from company_store import DB_FILENAME, SQLiteCompanyStore, SQLiteEmissionsStore, email_key, migrate_json_tree
 
 class CompanyManager:
     """Manages company registration, authentication, and data"""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(self, data_dir: str = "data", backend: Optional[str] = None, emissions_backend: Optional[str] = None):
         self.data_dir = data_dir
         self.companies_file = os.path.join(data_dir, "companies.json")
         self.ensure_data_dir()
+        
+        # 'sqlite' (default) keeps everything in one WAL-mode database,
+        # 'json' keeps companies.json and the company_<id>/ directory tree
+        self.backend = (backend or os.getenv("COMPANY_STORE_BACKEND", "sqlite")).lower()
+        self.db = None
+        if self.backend == 'sqlite':
+            self.db = SQLiteCompanyStore(os.path.join(data_dir, DB_FILENAME))
+            counts = migrate_json_tree(data_dir, self.db)
+            if counts['companies']:
+                print(f"✅ Migrated {counts['companies']} companies from JSON into {self.db.db_path}")
+            if counts['skipped']:
+                print(f"⚠️ Skipped {counts['skipped']} companies whose email was already registered")
+        
+        # Emissions rows: 'sqlite' (default with the SQLite company store) keeps them
+        # in the same database; 'parquet', 'json' and 'auto' go through get_emissions_store
+        emissions_backend = (emissions_backend or os.getenv("EMISSIONS_STORE_BACKEND")
+                             or ('sqlite' if self.db is not None else 'auto')).lower()
+        if emissions_backend == 'sqlite':
+            if self.db is None:
+                raise ValueError("The sqlite emissions store needs the sqlite company store")
+            self.emissions_store = SQLiteEmissionsStore(self.db, data_dir)
+        else:
+            self.emissions_store = get_emissions_store(data_dir, emissions_backend)
         self.companies = self.load_companies()
+        self.rebuild_indexes()
     
     def ensure_data_dir(self):
         """Ensure data directory exists"""
@@ -25,19 +52,59 @@ class CompanyManager:
     
     def load_companies(self) -> Dict:
         """Load companies from file"""
+        if self.db is not None:
+            return self.db.load_companies()
         try:
             if os.path.exists(self.companies_file):
-                with open(self.companies_file, 'r') as f:
-                    return json.load(f)
+                return load_file(self.companies_file)
         except Exception as e:
             print(f"Error loading companies: {e}")
         return {}
     
+    @staticmethod
+    def _email_key(email: str) -> str:
+        """Normalized form of an email used as the index key; the same key the SQLite store enforces"""
+        return email_key(email)
+    
+    def rebuild_indexes(self):
+        """Rebuild the email and blockchain address lookup indexes from self.companies"""
+        self.email_index: Dict[str, str] = {}
+        self.address_index: Dict[str, str] = {}
+        for company_id, company_data in self.companies.items():
+            self._index_company(company_data)
+    
+    def _index_company(self, company_data: Dict):
+        company_id = company_data['company_id']
+        self.email_index[self._email_key(company_data.get('email'))] = company_id
+        if company_data.get('blockchain_address'):
+            self.address_index[company_data['blockchain_address']] = company_id
+    
+    def _unindex_company(self, company_data: Dict):
+        company_id = company_data['company_id']
+        email_key = self._email_key(company_data.get('email'))
+        if self.email_index.get(email_key) == company_id:
+            del self.email_index[email_key]
+        address = company_data.get('blockchain_address')
+        if address and self.address_index.get(address) == company_id:
+            del self.address_index[address]
+    
+    def _cache_company(self, company_data: Dict):
+        """Store a company record in memory and keep the indexes consistent"""
+        previous = self.companies.get(company_data['company_id'])
+        if previous is not None:
+            self._unindex_company(previous)
+        self.companies[company_data['company_id']] = company_data
+        self._index_company(company_data)
+    
     def save_companies(self):
         """Save companies to file"""
+        if self.db is not None:
+            # Rows are written individually as they change
+            for company_data in self.companies.values():
+                self.db.update_company(company_data)
+            return
         try:
-            with open(self.companies_file, 'w') as f:
-                json.dump(self.companies, f, indent=2, default=str)
+            dump_file(self.companies, self.companies_file)
         except Exception as e:
             print(f"Error saving companies: {e}")
     
@@ -58,9 +125,8 @@ class CompanyManager:
         """Register a new company"""
         
         # Check if company already exists
-        for comp_id, comp_data in self.companies.items():
-            if comp_data['email'].lower() == email.lower():
-                raise ValueError(f"Company with email {email} already registered")
+        if self.get_company_by_email(email):
+            raise ValueError(f"Company with email {email} already registered")
         
         # Generate company ID
         company_id = self.generate_company_id(company_name, email)
@@ -85,8 +151,12 @@ class CompanyManager:
         }
         
         # Save company
-        self.companies[company_id] = company_data
-        self.save_companies()
+        if self.db is not None:
+            self.db.insert_company(company_data)
+            self._cache_company(company_data)
+        else:
+            self._cache_company(company_data)
+            self.save_companies()
         
         # Create company-specific data files
         self.create_company_data_files(company_id)
@@ -95,14 +165,15 @@ class CompanyManager:
     
     def create_company_data_files(self, company_id: str):
         """Create company-specific data files"""
+        if self.db is not None:
+            self.emissions_store.initialize(company_id)
+            return
+        
         company_dir = os.path.join(self.data_dir, f"company_{company_id}")
         os.makedirs(company_dir, exist_ok=True)
         
-        # Create emissions file
-        emissions_file = os.path.join(company_dir, "emissions.json")
-        if not os.path.exists(emissions_file):
-            with open(emissions_file, 'w') as f:
-                json.dump([], f)
+        # Create emissions storage
+        self.emissions_store.initialize(company_id)
         
         # Create credits file
         credits_file = os.path.join(company_dir, "carbon_credits.json")
@@ -114,20 +185,82 @@ class CompanyManager:
                 'credits_available': 0.0,
                 'transactions': []
             }
-            with open(credits_file, 'w') as f:
-                json.dump(initial_credits, f, indent=2)
+            dump_file(initial_credits, credits_file)
     
     def authenticate_company(self, company_id: str) -> Optional[Dict]:
         """Authenticate company by ID"""
-        return self.companies.get(company_id)
+        company = self.companies.get(company_id)
+        if company is None and self.db is not None:
+            # Registered by another session or process since we loaded
+            company = self.db.get_company(company_id)
+            if company:
+                self._cache_company(company)
+        return company
     
     def get_company_by_email(self, email: str) -> Optional[Dict]:
         """Get company by email"""
-        for comp_data in self.companies.values():
-            if comp_data['email'].lower() == email.lower():
-                return comp_data
+        company_id = self.email_index.get(self._email_key(email))
+        if company_id is not None:
+            return self.companies.get(company_id)
+        if self.db is not None:
+            # Registered by another session or process since we loaded
+            company = self.db.get_company_by_email(email)
+            if company:
+                self._cache_company(company)
+            return company
+        return None
+    
+    def get_company_by_blockchain_address(self, blockchain_address: str) -> Optional[Dict]:
+        """Get company by its blockchain address"""
+        company_id = self.address_index.get(blockchain_address)
+        if company_id is not None:
+            return self.companies.get(company_id)
+        if self.db is not None:
+            company = self.db.get_company_by_blockchain_address(blockchain_address)
+            if company:
+                self._cache_company(company)
+            return company
         return None
     
+    def update_company(self, company_id: str, **fields) -> Optional[Dict]:
+        """
+        Update fields of a company record.
+        
+        Raises:
+            ValueError: If the new email belongs to another company
+        """
+        if company_id not in self.companies:
+            return None
+        
+        if 'email' in fields:
+            owner = self.email_index.get(self._email_key(fields['email']))
+            if owner is not None and owner != company_id:
+                raise ValueError(f"Company with email {fields['email']} already registered")
+        
+        company_data = dict(self.companies[company_id], **fields)
+        company_data['company_id'] = company_id
+        if self.db is not None:
+            self.db.update_company(company_data)
+            self._cache_company(company_data)
+        else:
+            self._cache_company(company_data)
+            self.save_companies()
+        return company_data
+    
+    def delete_company(self, company_id: str) -> bool:
+        """Delete a company and all of its data"""
+        company_data = self.companies.pop(company_id, None)
+        if company_data is None:
+            return False
+        
+        self._unindex_company(company_data)
+        if self.db is not None:
+            self.db.delete_company(company_id)
+        else:
+            self.save_companies()
+            shutil.rmtree(os.path.join(self.data_dir, f"company_{company_id}"), ignore_errors=True)
+        return True
+    
     def get_all_companies(self) -> Dict:
         """Get all registered companies"""
         return self.companies
@@ -135,12 +268,20 @@ class CompanyManager:
     def update_company_emissions(self, company_id: str, emissions: float):
         """Update company's total emissions"""
         if company_id in self.companies:
+            if self.db is not None:
+                # Atomic increment so concurrent sessions don't overwrite each other
+                self._cache_company(self.db.increment_company_field(company_id, 'total_emissions', emissions))
+                return
             self.companies[company_id]['total_emissions'] += emissions
             self.save_companies()
     
     def award_carbon_credits(self, company_id: str, credits: float, reason: str = ""):
         """Award carbon credits to a company"""
         if company_id in self.companies:
+            if self.db is not None:
+                self._cache_company(self.db.award_credits(company_id, credits, reason))
+                return
+            
             # Update company record
             if 'carbon_credits' not in self.companies[company_id]:
                 self.companies[company_id]['carbon_credits'] = 0.0
@@ -151,8 +292,7 @@ class CompanyManager:
             # Update credits file
             credits_file = os.path.join(self.data_dir, f"company_{company_id}", "carbon_credits.json")
             try:
-                with open(credits_file, 'r') as f:
-                    credits_data = json.load(f)
+                credits_data = load_file(credits_file)
                 
                 credits_data['credits_earned'] += credits
                 credits_data['credits_available'] += credits
@@ -163,30 +303,41 @@ class CompanyManager:
                     'date': datetime.now().isoformat()
                 })
                 
-                with open(credits_file, 'w') as f:
-                    json.dump(credits_data, f, indent=2)
+                dump_file(credits_data, credits_file)
             except Exception as e:
                 print(f"Error updating credits file: {e}")
     
     def get_company_emissions_data(self, company_id: str) -> List[Dict]:
         """Get company's emissions data"""
-        emissions_file = os.path.join(self.data_dir, f"company_{company_id}", "emissions.json")
-        try:
-            if os.path.exists(emissions_file):
-                with open(emissions_file, 'r') as f:
-                    return json.load(f)
-        except Exception as e:
-            print(f"Error loading emissions data: {e}")
-        return []
+        return self.emissions_store.read_records(company_id)
+    
+    def get_company_emissions_frame(self,
+                                    company_id: str,
+                                    columns: Optional[List[str]] = None,
+                                    start_date=None,
+                                    end_date=None) -> pd.DataFrame:
+        """Get company's emissions as a DataFrame, loading only the requested columns and date range"""
+        return self.emissions_store.read_frame(company_id, columns=columns, start_date=start_date, end_date=end_date)
+    
+    def iter_company_emissions(self,
+                               company_id: str,
+                               columns: Optional[List[str]] = None,
+                               start_date=None,
+                               end_date=None) -> Iterator[Dict]:
+        """Stream company's emissions rows for export without loading them all"""
+        return self.emissions_store.iter_rows(company_id, columns=columns, start_date=start_date, end_date=end_date)
     
     def save_company_emissions_data(self, company_id: str, emissions_data: List[Dict]):
         """Save company's emissions data"""
-        emissions_file = os.path.join(self.data_dir, f"company_{company_id}", "emissions.json")
-        try:
-            with open(emissions_file, 'w') as f:
-                json.dump(emissions_data, f, indent=2, default=str)
-        except Exception as e:
-            print(f"Error saving emissions data: {e}")
+        self.emissions_store.write_records(company_id, emissions_data)
+    
+    def append_company_emissions_data(self, company_id: str, emissions_data: List[Dict]):
+        """Append records to company's emissions data without rewriting existing records"""
+        self.emissions_store.append_records(company_id, emissions_data)
+    
+    def get_emissions_version(self, company_id: str) -> Hashable:
+        """Version of company's emissions data, read from the store so writes by any process change it"""
+        return self.emissions_store.version(company_id)
     
     def get_company_carbon_summary(self, company_id: str) -> Dict:
         """Get comprehensive carbon summary for a company"""
@@ -200,15 +351,16 @@ class CompanyManager:
         credits_data = {'credits_available': 0.0, 'credits_earned': 0.0, 'credits_purchased': 0.0, 'credits_used': 0.0}
         
         try:
-            if os.path.exists(credits_file):
-                with open(credits_file, 'r') as f:
-                    credits_data = json.load(f)
+            if self.db is not None:
+                credits_data = self.db.get_credits(company_id)
+            elif os.path.exists(credits_file):
+                credits_data = load_file(credits_file)
         except Exception as e:
             print(f"Error loading credits data: {e}")
         
         # Get emissions data
-        emissions_data = self.get_company_emissions_data(company_id)
-        total_emissions = sum(item.get('emissions_kgCO2e', 0) for item in emissions_data)
+        emissions_data = self.get_company_emissions_frame(company_id, columns=['emissions_kgCO2e'])
+        total_emissions = float(pd.to_numeric(emissions_data['emissions_kgCO2e'], errors='coerce').sum())
         
         # Calculate remaining credits
         remaining_credits = credits_data['credits_available'] - (total_emissions / 1000)  # Convert kg to tonnes
@@ -0,0 +1,541 @@
+"""
+SQLite-backed store for companies, emissions and carbon credit transactions.
+Replaces companies.json and the data/company_<id>/ directory tree with a
+single WAL-mode database shared safely across Streamlit sessions and processes.
+
+Migrate an existing JSON tree with: python company_store.py migrate [data_dir]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from emissions_store import EMISSIONS_COLUMNS, EXPORT_BATCH_ROWS, EmissionsStore, get_emissions_store
+
+DB_FILENAME = "carbon.db"
+
+COMPANY_COLUMNS = [
+    'company_id', 'company_name', 'email', 'industry', 'location', 'size',
+    'contact_person', 'phone', 'website', 'registration_date',
+    'initial_carbon_credits', 'total_emissions', 'is_active',
+    'blockchain_address', 'verification_status', 'carbon_credits'
+]
+
+CREDIT_BALANCE_COLUMNS = ['credits_earned', 'credits_purchased', 'credits_used', 'credits_available']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS companies (
+    company_id TEXT PRIMARY KEY,
+    company_name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    industry TEXT,
+    location TEXT,
+    size TEXT,
+    contact_person TEXT,
+    phone TEXT,
+    website TEXT,
+    registration_date TEXT,
+    initial_carbon_credits REAL DEFAULT 0,
+    total_emissions REAL DEFAULT 0,
+    is_active INTEGER DEFAULT 1,
+    blockchain_address TEXT,
+    verification_status TEXT,
+    carbon_credits REAL DEFAULT 0,
+    extra TEXT,
+    email_key TEXT
+);
+
+CREATE TABLE IF NOT EXISTS blockchain_accounts (
+    blockchain_address TEXT PRIMARY KEY,
+    company_id TEXT NOT NULL REFERENCES companies(company_id) ON DELETE CASCADE,
+    registered_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_blockchain_accounts_company ON blockchain_accounts(company_id);
+
+CREATE TABLE IF NOT EXISTS emissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company_id TEXT NOT NULL,
+    date TEXT,
+    business_unit TEXT,
+    project TEXT,
+    scope TEXT,
+    category TEXT,
+    activity TEXT,
+    country TEXT,
+    facility TEXT,
+    responsible_person TEXT,
+    quantity REAL,
+    unit TEXT,
+    emission_factor REAL,
+    emissions_kgCO2e REAL,
+    data_quality TEXT,
+    verification_status TEXT,
+    notes TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_emissions_company_date ON emissions(company_id, date);
+
+CREATE TABLE IF NOT EXISTS emissions_versions (
+    company_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS credit_balances (
+    company_id TEXT PRIMARY KEY,
+    credits_earned REAL DEFAULT 0,
+    credits_purchased REAL DEFAULT 0,
+    credits_used REAL DEFAULT 0,
+    credits_available REAL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS credit_transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    amount REAL NOT NULL,
+    reason TEXT,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_credit_transactions_company_date ON credit_transactions(company_id, date);
+"""
+
+# Bumped in the same transaction as every change to a company's emissions rows
+BUMP_EMISSIONS_VERSION = """
+INSERT INTO emissions_versions (company_id, version) VALUES (?, 1)
+ON CONFLICT(company_id) DO UPDATE SET version = version + 1
+"""
+
+
+def email_key(email: Optional[str]) -> str:
+    """Normalized email used for uniqueness and lookups, by the store and CompanyManager alike"""
+    return (email or "").strip().casefold()
+
+
+def _clean(value):
+    """Map pandas missing values to SQL NULL"""
+    if value is None:
+        return None
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return value
+
+
+class SQLiteCompanyStore:
+    """Embedded SQLite database holding all company data"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.connection().executescript(SCHEMA)
+        self._upgrade_schema()
+
+    def connection(self) -> sqlite3.Connection:
+        """Per-thread connection in autocommit mode with WAL journaling"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction that takes the database write lock up front"""
+        conn = self.connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+    def _upgrade_schema(self):
+        """
+        Key company emails by email_key in databases created before it existed.
+
+        Raises:
+            ValueError: If two stored companies share an email once normalized
+        """
+        columns = {row['name'] for row in self.connection().execute("PRAGMA table_info(companies)")}
+        try:
+            with self.transaction() as tx:
+                if 'email_key' not in columns:
+                    tx.execute("ALTER TABLE companies ADD COLUMN email_key TEXT")
+                rows = tx.execute("SELECT company_id, email FROM companies WHERE email_key IS NULL").fetchall()
+                tx.executemany(
+                    "UPDATE companies SET email_key = ? WHERE company_id = ?",
+                    [(email_key(row['email']), row['company_id']) for row in rows]
+                )
+                # Replaced by email_key, which also ignores surrounding spaces and non-ASCII case
+                tx.execute("DROP INDEX IF EXISTS idx_companies_email")
+                tx.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_companies_email_key ON companies(email_key)")
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Companies in {self.db_path} share an email; make them distinct before upgrading")
+
+    # Metadata
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.connection().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def set_meta(self, key: str, value: str):
+        self.connection().execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    # Companies
+
+    def _row_to_company(self, row: sqlite3.Row) -> Dict:
+        company = {column: row[column] for column in COMPANY_COLUMNS}
+        company['is_active'] = bool(company['is_active'])
+        if row['extra']:
+            company.update(json.loads(row['extra']))
+        return company
+
+    def _company_params(self, company_data: Dict) -> List:
+        params = [company_data.get(column) for column in COMPANY_COLUMNS]
+        params[COMPANY_COLUMNS.index('is_active')] = int(bool(company_data.get('is_active', True)))
+        for column in ('initial_carbon_credits', 'total_emissions', 'carbon_credits'):
+            params[COMPANY_COLUMNS.index(column)] = float(company_data.get(column) or 0.0)
+        extra = {k: v for k, v in company_data.items() if k not in COMPANY_COLUMNS}
+        params.append(json.dumps(extra, default=str) if extra else None)
+        params.append(email_key(company_data.get('email')))
+        return params
+
+    def insert_company(self, company_data: Dict, conn: Optional[sqlite3.Connection] = None):
+        """
+        Insert a new company and its blockchain account.
+
+        Raises:
+            ValueError: If a company with the same email already exists
+        """
+        placeholders = ", ".join("?" for _ in range(len(COMPANY_COLUMNS) + 2))
+        try:
+            with self.transaction() if conn is None else nullcontext(conn) as tx:
+                tx.execute(
+                    f"INSERT INTO companies ({', '.join(COMPANY_COLUMNS)}, extra, email_key) VALUES ({placeholders})",
+                    self._company_params(company_data)
+                )
+                if company_data.get('blockchain_address'):
+                    tx.execute(
+                        "INSERT OR REPLACE INTO blockchain_accounts (blockchain_address, company_id, registered_at) VALUES (?, ?, ?)",
+                        (company_data['blockchain_address'], company_data['company_id'], company_data.get('registration_date'))
+                    )
+                tx.execute("INSERT OR IGNORE INTO credit_balances (company_id) VALUES (?)", (company_data['company_id'],))
+        except sqlite3.IntegrityError:
+            raise ValueError(f"Company with email {company_data['email']} already registered")
+
+    def update_company(self, company_data: Dict):
+        """Overwrite a company's stored record"""
+        assignments = ", ".join(f"{column} = ?" for column in COMPANY_COLUMNS[1:])
+        params = self._company_params(company_data)
+        with self.transaction() as tx:
+            tx.execute(
+                f"UPDATE companies SET {assignments}, extra = ?, email_key = ? WHERE company_id = ?",
+                params[1:] + [company_data['company_id']]
+            )
+            tx.execute("DELETE FROM blockchain_accounts WHERE company_id = ?", (company_data['company_id'],))
+            if company_data.get('blockchain_address'):
+                tx.execute(
+                    "INSERT OR REPLACE INTO blockchain_accounts (blockchain_address, company_id, registered_at) VALUES (?, ?, ?)",
+                    (company_data['blockchain_address'], company_data['company_id'], company_data.get('registration_date'))
+                )
+
+    def delete_company(self, company_id: str):
+        """Delete a company together with its emissions and credit records"""
+        with self.transaction() as tx:
+            for table in ('emissions', 'credit_transactions', 'credit_balances', 'blockchain_accounts', 'companies'):
+                tx.execute(f"DELETE FROM {table} WHERE company_id = ?", (company_id,))
+            tx.execute(BUMP_EMISSIONS_VERSION, (company_id,))
+
+    def get_company(self, company_id: str) -> Optional[Dict]:
+        row = self.connection().execute("SELECT * FROM companies WHERE company_id = ?", (company_id,)).fetchone()
+        return self._row_to_company(row) if row else None
+
+    def get_company_by_email(self, email: str) -> Optional[Dict]:
+        row = self.connection().execute(
+            "SELECT * FROM companies WHERE email_key = ?", (email_key(email),)
+        ).fetchone()
+        return self._row_to_company(row) if row else None
+
+    def get_company_by_blockchain_address(self, blockchain_address: str) -> Optional[Dict]:
+        row = self.connection().execute(
+            "SELECT c.* FROM blockchain_accounts a JOIN companies c ON c.company_id = a.company_id "
+            "WHERE a.blockchain_address = ?", (blockchain_address,)
+        ).fetchone()
+        return self._row_to_company(row) if row else None
+
+    def load_companies(self) -> Dict[str, Dict]:
+        rows = self.connection().execute("SELECT * FROM companies ORDER BY registration_date").fetchall()
+        return {row['company_id']: self._row_to_company(row) for row in rows}
+
+    def increment_company_field(self, company_id: str, field: str, amount: float) -> Optional[Dict]:
+        """Atomically add amount to a numeric company column and return the updated company"""
+        if field not in ('total_emissions', 'carbon_credits'):
+            raise ValueError(f"Cannot increment field {field}")
+        self.connection().execute(
+            f"UPDATE companies SET {field} = COALESCE({field}, 0) + ? WHERE company_id = ?",
+            (amount, company_id)
+        )
+        return self.get_company(company_id)
+
+    # Carbon credits
+
+    def get_credits(self, company_id: str) -> Dict:
+        """Credit balances and transactions in the carbon_credits.json layout"""
+        conn = self.connection()
+        row = conn.execute("SELECT * FROM credit_balances WHERE company_id = ?", (company_id,)).fetchone()
+        credits = {column: (row[column] if row else 0.0) for column in CREDIT_BALANCE_COLUMNS}
+        credits['transactions'] = [
+            {'type': t['type'], 'amount': t['amount'], 'reason': t['reason'], 'date': t['date']}
+            for t in conn.execute(
+                "SELECT type, amount, reason, date FROM credit_transactions WHERE company_id = ? ORDER BY id",
+                (company_id,)
+            )
+        ]
+        return credits
+
+    def award_credits(self, company_id: str, credits: float, reason: str = "") -> Optional[Dict]:
+        """Record earned credits in one transaction and return the updated company"""
+        with self.transaction() as tx:
+            tx.execute(
+                "UPDATE companies SET carbon_credits = COALESCE(carbon_credits, 0) + ? WHERE company_id = ?",
+                (credits, company_id)
+            )
+            tx.execute("INSERT OR IGNORE INTO credit_balances (company_id) VALUES (?)", (company_id,))
+            tx.execute(
+                "UPDATE credit_balances SET credits_earned = credits_earned + ?, "
+                "credits_available = credits_available + ? WHERE company_id = ?",
+                (credits, credits, company_id)
+            )
+            tx.execute(
+                "INSERT INTO credit_transactions (company_id, type, amount, reason, date) VALUES (?, 'earned', ?, ?, ?)",
+                (company_id, credits, reason, datetime.now().isoformat())
+            )
+        return self.get_company(company_id)
+
+
+class SQLiteEmissionsStore(EmissionsStore):
+    """Emissions storage backed by the emissions table of a SQLiteCompanyStore"""
+
+    def __init__(self, store: SQLiteCompanyStore, data_dir: str = "data"):
+        super().__init__(data_dir)
+        self.store = store
+
+    def initialize(self, company_id: str):
+        # Rows are created on first insert; no per-company files are needed
+        pass
+
+    def _rows(self, company_id: str, records: List[Dict]) -> List[List]:
+        rows = []
+        for record in records:
+            row = [company_id]
+            for column in EMISSIONS_COLUMNS:
+                value = _clean(record.get(column))
+                if column == 'date' and value is not None and not isinstance(value, str):
+                    value = pd.Timestamp(value).strftime('%Y-%m-%d')
+                elif value is not None and not isinstance(value, (str, int, float)):
+                    value = str(value)
+                row.append(value)
+            extra = {k: _clean(v) for k, v in record.items() if k not in EMISSIONS_COLUMNS}
+            row.append(json.dumps(extra, default=str) if extra else None)
+            rows.append(row)
+        return rows
+
+    def _insert(self, conn: sqlite3.Connection, company_id: str, records: List[Dict]):
+        columns = ['company_id'] + EMISSIONS_COLUMNS + ['extra']
+        conn.executemany(
+            f"INSERT INTO emissions ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+            self._rows(company_id, records)
+        )
+        conn.execute(BUMP_EMISSIONS_VERSION, (company_id,))
+
+    def read_records(self, company_id: str) -> List[Dict]:
+        try:
+            cursor = self.store.connection().execute(
+                f"SELECT {', '.join(EMISSIONS_COLUMNS)}, extra FROM emissions WHERE company_id = ? ORDER BY id",
+                (company_id,)
+            )
+        except Exception as e:
+            print(f"Error loading emissions data: {e}")
+            return []
+
+        records = []
+        for row in cursor:
+            record = {column: row[column] for column in EMISSIONS_COLUMNS}
+            if row['extra']:
+                record.update(json.loads(row['extra']))
+            records.append(record)
+        return records
+
+    def write_records(self, company_id: str, records: List[Dict]):
+        try:
+            with self.store.transaction() as tx:
+                tx.execute("DELETE FROM emissions WHERE company_id = ?", (company_id,))
+                self._insert(tx, company_id, records)
+        except Exception as e:
+            print(f"Error saving emissions data: {e}")
+
+    def append_records(self, company_id: str, records: List[Dict]):
+        try:
+            with self.store.transaction() as tx:
+                self._insert(tx, company_id, records)
+        except Exception as e:
+            print(f"Error saving emissions data: {e}")
+
+    def version(self, company_id: str) -> int:
+        row = self.store.connection().execute(
+            "SELECT version FROM emissions_versions WHERE company_id = ?", (company_id,)
+        ).fetchone()
+        return row['version'] if row else 0
+
+    def _select_sql(self, company_id: str, columns: List[str], start_date, end_date) -> Tuple[str, List]:
+        selected = [c for c in columns if c in EMISSIONS_COLUMNS]
+        query = f"SELECT {', '.join(selected) or 'id'} FROM emissions WHERE company_id = ?"
+        params = [company_id]
+        if start_date is not None:
+            query += " AND date >= ?"
+            params.append(pd.Timestamp(start_date).strftime('%Y-%m-%d'))
+        if end_date is not None:
+            query += " AND date <= ?"
+            params.append(pd.Timestamp(end_date).strftime('%Y-%m-%d'))
+        query += " ORDER BY id"
+        return query, params
+
+    def read_frame(self,
+                   company_id: str,
+                   columns: Optional[List[str]] = None,
+                   start_date=None,
+                   end_date=None) -> pd.DataFrame:
+        columns = columns or EMISSIONS_COLUMNS
+        cursor = self.store.connection().execute(*self._select_sql(company_id, columns, start_date, end_date))
+        df = pd.DataFrame.from_records(cursor.fetchall(), columns=[d[0] for d in cursor.description])
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date'], errors='coerce')
+        return df.reindex(columns=columns)
+
+    def iter_rows(self,
+                  company_id: str,
+                  columns: Optional[List[str]] = None,
+                  start_date=None,
+                  end_date=None,
+                  batch_size: int = EXPORT_BATCH_ROWS) -> Iterator[Dict]:
+        columns = columns or EMISSIONS_COLUMNS
+        # A dedicated connection: the generator may be resumed from another thread
+        conn = sqlite3.connect(self.store.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(*self._select_sql(company_id, columns, start_date, end_date))
+            selected = {d[0] for d in cursor.description}
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield {c: (row[c] if c in selected else None) for c in columns}
+        finally:
+            conn.close()
+
+
+def migrate_json_tree(data_dir: str, store: SQLiteCompanyStore) -> Dict[str, int]:
+    """
+    One-shot import of companies.json and the data/company_<id>/ tree.
+
+    Existing files are left untouched so the JSON tree doubles as a backup.
+    Running it again is a no-op once the migration has been recorded.
+
+    Returns:
+        Counts of migrated companies, emissions and credit transactions, and
+        of companies skipped because another one already has their email
+    """
+    counts = {'companies': 0, 'emissions': 0, 'transactions': 0, 'skipped': 0}
+    if store.get_meta('json_migrated_at'):
+        return counts
+
+    companies = {}
+    companies_file = os.path.join(data_dir, "companies.json")
+    if os.path.exists(companies_file):
+        with open(companies_file, 'r') as f:
+            companies = json.load(f)
+
+    emissions_store = SQLiteEmissionsStore(store, data_dir)
+    json_store = get_emissions_store(data_dir, 'json')
+
+    with store.transaction() as tx:
+        for company_id, company_data in companies.items():
+            company_data.setdefault('company_id', company_id)
+            try:
+                store.insert_company(company_data, conn=tx)
+            except ValueError as e:
+                print(f"⚠️ Skipping company {company_id}: {e}")
+                counts['skipped'] += 1
+                continue
+            counts['companies'] += 1
+
+            # Read emissions through whichever file-based store the tree was written with
+            if os.path.isdir(os.path.join(data_dir, f"company_{company_id}", "emissions")):
+                records = get_emissions_store(data_dir, 'parquet').read_records(company_id)
+            else:
+                records = json_store.read_records(company_id)
+            emissions_store._insert(tx, company_id, records)
+            counts['emissions'] += len(records)
+
+            credits_file = os.path.join(data_dir, f"company_{company_id}", "carbon_credits.json")
+            if os.path.exists(credits_file):
+                with open(credits_file, 'r') as f:
+                    credits_data = json.load(f)
+                tx.execute(
+                    "UPDATE credit_balances SET credits_earned = ?, credits_purchased = ?, "
+                    "credits_used = ?, credits_available = ? WHERE company_id = ?",
+                    [credits_data.get(column, 0.0) for column in CREDIT_BALANCE_COLUMNS] + [company_id]
+                )
+                for transaction in credits_data.get('transactions', []):
+                    tx.execute(
+                        "INSERT INTO credit_transactions (company_id, type, amount, reason, date) VALUES (?, ?, ?, ?, ?)",
+                        (company_id, transaction.get('type'), transaction.get('amount', 0.0),
+                         transaction.get('reason', ''), transaction.get('date'))
+                    )
+                    counts['transactions'] += 1
+
+        tx.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated_at', ?)",
+            (datetime.now().isoformat(),)
+        )
+
+    return counts
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Usage: python company_store.py migrate [data_dir]")
+        sys.exit(1)
+
+    data_dir = sys.argv[2] if len(sys.argv) > 2 else "data"
+    store = SQLiteCompanyStore(os.path.join(data_dir, DB_FILENAME))
+    if store.get_meta('json_migrated_at'):
+        print(f"✅ {data_dir} already migrated on {store.get_meta('json_migrated_at')}")
+    else:
+        counts = migrate_json_tree(data_dir, store)
+        print(f"✅ Migrated {counts['companies']} companies, {counts['emissions']} emissions "
+              f"and {counts['transactions']} credit transactions into {store.db_path}")
+        if counts['skipped']:
+            print(f"⚠️ Skipped {counts['skipped']} companies whose email was already registered")
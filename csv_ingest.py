@@ -0,0 +1,215 @@
+"""
+Chunked, vectorized ingestion of emissions CSV uploads.
+
+The file is parsed in chunks of INGEST_CHUNK_ROWS rows with every column
+read as text, so a bad cell rejects one row instead of failing the whole
+parse. Each chunk is validated and completed with column operations:
+numbers and dates are coerced, and resolve_factors fills a missing
+emission_factor or unit from EMISSION_FACTORS and calculates
+emissions_kgCO2e where it is not given. Valid rows are handed to an append
+callback chunk by chunk, so memory use depends on the chunk size rather
+than the file size. Rejected rows are collected, with a reason, into the
+returned report. If the file turns out to be malformed after some chunks
+have been stored, those rows stay stored and the report says where the
+import stopped (IngestReport.error), so callers can account for them.
+
+Configuration (environment variables):
+    CSV_INGEST_CHUNK_ROWS   rows parsed per chunk (default 50000)
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from emission_factors import resolve_factors
+
+INGEST_CHUNK_ROWS = int(os.getenv("CSV_INGEST_CHUNK_ROWS", "50000"))
+
+REQUIRED_COLUMNS = ['scope', 'category', 'activity', 'quantity', 'unit', 'emission_factor']
+NUMERIC_COLUMNS = ['quantity', 'emission_factor', 'emissions_kgCO2e']
+
+# Columns that only describe how the file was laid out and are not stored
+DROPPED_COLUMNS = ['reporting_period']
+
+
+@dataclass
+class IngestReport:
+    """Outcome of an ingest_csv run"""
+    rows_read: int = 0
+    rows_accepted: int = 0
+    rows_rejected: int = 0
+    chunks: int = 0
+    factors_filled: int = 0
+    dates_defaulted: int = 0
+    emissions_kgCO2e: float = 0.0
+    rejected: List[pd.DataFrame] = field(default_factory=list, repr=False)
+    # Parse error that stopped the import part way; rows counted above were stored
+    error: Optional[str] = None
+
+    def rejected_frame(self) -> pd.DataFrame:
+        """Kept rejected rows with their 'row' number and 'reason'"""
+        if not self.rejected:
+            return pd.DataFrame(columns=['row', 'reason'])
+        return pd.concat(self.rejected, ignore_index=True)
+
+
+def ingest_csv(source,
+               append: Callable[[pd.DataFrame], None],
+               required_columns: Optional[List[str]] = None,
+               defaults: Optional[Dict[str, str]] = None,
+               default_date: Optional[str] = None,
+               chunk_rows: Optional[int] = None,
+               progress: Optional[Callable[[int, Optional[float]], None]] = None,
+               max_reported_rejects: int = 1000) -> IngestReport:
+    """
+    Parse, validate and store an emissions CSV chunk by chunk.
+
+    Args:
+        source: Path or file-like object
+        append: Called with each chunk of valid rows (dates as 'YYYY-MM-DD' strings)
+        required_columns: Columns the header must contain (default REQUIRED_COLUMNS)
+        defaults: Values for columns the file does not have
+        default_date: Date for rows without a valid date; None rejects those rows
+        chunk_rows: Rows per chunk (default INGEST_CHUNK_ROWS)
+        progress: Called after each chunk with (rows read, fraction of the file or None)
+        max_reported_rejects: Rejected rows kept in the report (all are counted)
+
+    Returns:
+        IngestReport
+
+    Raises:
+        ValueError: If the file is empty or misses required columns
+        pandas.errors.ParserError: If the file is malformed before any rows are stored
+    """
+    required_columns = required_columns or REQUIRED_COLUMNS
+    total_bytes = _size_of(source)
+    report = IngestReport()
+
+    try:
+        reader = pd.read_csv(source, dtype=str, chunksize=chunk_rows or INGEST_CHUNK_ROWS, skipinitialspace=True)
+    except pd.errors.EmptyDataError:
+        raise ValueError("The uploaded file is empty")
+
+    with reader:
+        chunks = iter(reader)
+        while True:
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            except pd.errors.ParserError as e:
+                if report.rows_accepted == 0:
+                    raise
+                # Earlier chunks are already stored; report where the import stopped
+                report.error = f"parsing stopped after row {report.rows_read}: {e}"
+                break
+
+            if report.chunks == 0:
+                missing = [col for col in required_columns if col not in chunk.columns]
+                if missing:
+                    raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+            chunk.insert(0, 'row', pd.RangeIndex(report.rows_read + 1, report.rows_read + len(chunk) + 1))
+            report.rows_read += len(chunk)
+            report.chunks += 1
+
+            valid, rejected = _prepare_chunk(chunk, defaults or {}, default_date, report)
+            if len(rejected):
+                report.rows_rejected += len(rejected)
+                kept = sum(len(frame) for frame in report.rejected)
+                if kept < max_reported_rejects:
+                    report.rejected.append(rejected.head(max_reported_rejects - kept))
+            if len(valid):
+                append(valid)
+                report.rows_accepted += len(valid)
+                report.emissions_kgCO2e += float(valid['emissions_kgCO2e'].sum())
+
+            if progress:
+                position = _position_of(source)
+                fraction = min(position / total_bytes, 1.0) if total_bytes and position is not None else None
+                progress(report.rows_read, fraction)
+
+    if report.chunks == 0:
+        raise ValueError("The uploaded file contains no data rows")
+    return report
+
+
+def _prepare_chunk(chunk: pd.DataFrame, defaults: Dict[str, str], default_date: Optional[str], report: IngestReport):
+    """Split a raw chunk into (valid rows ready to store, rejected rows with a reason)"""
+    reasons = pd.Series(pd.NA, index=chunk.index, dtype='object')
+
+    def reject(mask: pd.Series, reason: str):
+        reasons.loc[mask & reasons.isna()] = reason
+
+    for column in ['scope', 'category', 'activity']:
+        if column in chunk.columns:
+            chunk[column] = chunk[column].str.strip()
+            reject(chunk[column].isna() | (chunk[column] == ''), f"missing {column}")
+
+    for column in NUMERIC_COLUMNS:
+        if column in chunk.columns:
+            raw = chunk[column]
+            chunk[column] = pd.to_numeric(raw, errors='coerce')
+            if column != 'emissions_kgCO2e':
+                reject(raw.notna() & chunk[column].isna(), f"invalid {column}")
+        else:
+            chunk[column] = float('nan')
+    reject(chunk['quantity'].isna(), "missing quantity")
+
+    # Fill missing factors, units and emissions from the compiled factor table
+    missing_factor = chunk['emission_factor'].isna()
+    if 'unit' in chunk.columns:
+        chunk['unit'] = chunk['unit'].str.strip().replace('', pd.NA)
+    chunk = resolve_factors(chunk, flag_column=None)
+    report.factors_filled += int((missing_factor & chunk['emission_factor'].notna()).sum())
+    reject(chunk['emission_factor'].isna(), "no emission factor for category, activity and unit")
+
+    if 'date' in chunk.columns:
+        dates = pd.to_datetime(chunk['date'], errors='coerce')
+        chunk['date'] = dates.dt.strftime('%Y-%m-%d')
+        invalid_dates = chunk['date'].isna()
+        if default_date is None:
+            reject(invalid_dates, "invalid date")
+        else:
+            report.dates_defaulted += int((invalid_dates & reasons.isna()).sum())
+            chunk['date'] = chunk['date'].fillna(default_date)
+    elif default_date is not None:
+        chunk['date'] = default_date
+    else:
+        reject(pd.Series(True, index=chunk.index), "missing date")
+
+    rejected_mask = reasons.notna()
+    rejected = chunk.loc[rejected_mask].assign(reason=reasons[rejected_mask])
+
+    valid = chunk.loc[~rejected_mask].drop(columns=['row'] + [c for c in DROPPED_COLUMNS if c in chunk.columns])
+    for column, value in defaults.items():
+        if column not in valid.columns:
+            valid[column] = value
+    return valid.reset_index(drop=True), rejected.reset_index(drop=True)
+
+
+def _size_of(source) -> Optional[int]:
+    if isinstance(source, (str, os.PathLike)):
+        try:
+            return os.path.getsize(source)
+        except OSError:
+            return None
+    size = getattr(source, 'size', None)
+    if isinstance(size, int):
+        return size
+    try:
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END)
+        source.seek(position)
+        return size
+    except Exception:
+        return None
+
+
+def _position_of(source) -> Optional[int]:
+    try:
+        return source.tell()
+    except Exception:
+        return None
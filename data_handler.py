@@ -9,15 +9,18 @@ import os
 from datetime import datetime
 import csv
 from io import StringIO
-from fpdf import FPDF  # fpdf2 package
-import matplotlib.pyplot as plt
-import seaborn as sns
-from emission_factors import get_emission_factor, get_categories, get_activities
+from csv_ingest import ingest_csv
+from emission_factors import get_emission_factor, get_categories, get_activities, resolve_factors
+from serialization import dump_file, dumps, load_file, loads
 
 # Constants
 DATA_DIR = "data"
 EMISSIONS_FILE = os.path.join(DATA_DIR, "emissions.json")
 COMPANY_INFO_FILE = os.path.join(DATA_DIR, "company_info.json")
+EMISSIONS_JOURNAL_FILE = os.path.join(DATA_DIR, "emissions.journal")
+
+# Number of journalled rows after which the journal is folded into the snapshot
+JOURNAL_COMPACTION_THRESHOLD = 1000
 
 # Ensure data directory exists
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -29,18 +32,112 @@ class DataHandler:
         self.load_company_info()
     
     def load_emissions_data(self):
-        """Load emissions data from file."""
+        """Load emissions data from the snapshot file and replay the journal."""
+        records = None
         if os.path.exists(EMISSIONS_FILE):
-            with open(EMISSIONS_FILE, 'r') as f:
-                try:
-                    self.emissions_data = pd.DataFrame(json.load(f))
-                    # Convert date strings to datetime objects
-                    if 'date' in self.emissions_data.columns:
-                        self.emissions_data['date'] = pd.to_datetime(self.emissions_data['date'])
-                except json.JSONDecodeError:
-                    self.create_empty_emissions_data()
-        else:
+            try:
+                records = load_file(EMISSIONS_FILE)
+            except ValueError:
+                records = None
+        
+        # Rows in the snapshot the journal was started against
+        self._journal_base = len(records) if records else 0
+        self._journal_rows = 0
+        
+        journal_records = self._replay_journal()
+        if records is None and not journal_records:
             self.create_empty_emissions_data()
+            return
+        
+        self.emissions_data = pd.DataFrame((records or []) + journal_records)
+        # Convert date strings to datetime objects
+        if 'date' in self.emissions_data.columns:
+            self.emissions_data['date'] = pd.to_datetime(self.emissions_data['date'])
+    
+    def _replay_journal(self):
+        """
+        Read rows appended to the journal since the last snapshot.
+        
+        The first journal line is a header recording how many rows the snapshot
+        held when the journal was started. If the snapshot no longer matches
+        (e.g. compaction was interrupted after the snapshot was replaced), the
+        journal has already been folded in and is started afresh.
+        
+        A torn final line from an interrupted append is cut off, so the next
+        append starts on a fresh line instead of joining the torn bytes.
+        
+        Returns:
+            list: Journalled records, in insertion order
+        """
+        if not os.path.exists(EMISSIONS_JOURNAL_FILE):
+            return []
+        
+        records = []
+        header = None
+        good_offset = 0
+        with open(EMISSIONS_JOURNAL_FILE, 'rb') as f:
+            header_line = f.readline()
+            if header_line.endswith(b'\n'):
+                try:
+                    header = loads(header_line)
+                except ValueError:
+                    header = None
+            if header is not None and header.get('snapshot_rows') == self._journal_base:
+                good_offset = len(header_line)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # A torn final line from an interrupted append
+                        break
+                    good_offset += len(line)
+                    try:
+                        records.append(loads(line))
+                    except ValueError:
+                        continue
+        
+        if header is None or header.get('snapshot_rows') != self._journal_base:
+            self._reset_journal(self._journal_base)
+            return []
+        
+        if good_offset < os.path.getsize(EMISSIONS_JOURNAL_FILE):
+            with open(EMISSIONS_JOURNAL_FILE, 'r+b') as f:
+                f.truncate(good_offset)
+                f.flush()
+                os.fsync(f.fileno())
+        
+        self._journal_rows = len(records)
+        return records
+    
+    def _reset_journal(self, snapshot_rows):
+        """Start an empty journal on top of a snapshot holding snapshot_rows rows."""
+        with open(EMISSIONS_JOURNAL_FILE, 'wb') as f:
+            f.write(dumps({'snapshot_rows': snapshot_rows}) + b'\n')
+        self._journal_base = snapshot_rows
+        self._journal_rows = 0
+    
+    def _append_to_journal(self, records, compact=True):
+        """
+        Append records to the emissions journal.
+        
+        Each record is written as one JSON line, so the cost of an insert does
+        not depend on the size of the dataset. Once the journal grows past
+        JOURNAL_COMPACTION_THRESHOLD rows it is compacted into the snapshot.
+        
+        Args:
+            records (list): Records with dates already formatted as strings
+            compact (bool): Whether to compact now if the journal is over the
+                threshold; bulk imports compact once at the end instead
+        """
+        if not os.path.exists(EMISSIONS_JOURNAL_FILE):
+            self._reset_journal(self._journal_base)
+        
+        with open(EMISSIONS_JOURNAL_FILE, 'ab') as f:
+            f.write(b''.join(dumps(record) + b'\n' for record in records))
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_rows += len(records)
+        
+        if compact and self._journal_rows >= JOURNAL_COMPACTION_THRESHOLD:
+            self.save_emissions_data()
     
     def create_empty_emissions_data(self):
         """Create empty emissions dataframe."""
@@ -78,19 +175,30 @@ class DataHandler:
         }
     
     def save_emissions_data(self):
-        """Save emissions data to file."""
-        # Convert datetime objects to strings
-        data_to_save = self.emissions_data.copy()
-        if 'date' in data_to_save.columns:
-            data_to_save['date'] = data_to_save['date'].dt.strftime('%Y-%m-%d')
+        """
+        Save a full snapshot of the emissions data and truncate the journal.
+        
+        The snapshot is written to a temporary file and swapped in atomically,
+        so a crash never leaves a half-written emissions file behind.
+        """
+        records = self._to_records(self.emissions_data)
         
-        with open(EMISSIONS_FILE, 'w') as f:
-            json.dump(data_to_save.to_dict('records'), f, indent=2)
+        tmp_file = EMISSIONS_FILE + '.tmp'
+        dump_file(records, tmp_file)
+        os.replace(tmp_file, EMISSIONS_FILE)
+        
+        self._reset_journal(len(records))
+    
+    def _to_records(self, data):
+        """Convert a dataframe to JSON-ready records with string dates."""
+        data_to_save = data.copy()
+        if 'date' in data_to_save.columns:
+            data_to_save['date'] = pd.to_datetime(data_to_save['date']).dt.strftime('%Y-%m-%d')
+        return data_to_save.to_dict('records')
     
     def save_company_info(self):
         """Save company information to file."""
-        with open(COMPANY_INFO_FILE, 'w') as f:
-            json.dump(self.company_info, f, indent=2)
+        dump_file(self.company_info, COMPANY_INFO_FILE)
     
     def add_emission_entry(self, date, business_unit, project, scope, category, activity, country, facility, responsible_person, quantity, unit, emission_factor, data_quality, verification_status, notes=""):
         """
@@ -143,8 +251,8 @@ class DataHandler:
             # Append to existing data
             self.emissions_data = pd.concat([self.emissions_data, new_entry], ignore_index=True)
             
-            # Save data
-            self.save_emissions_data()
+            # Journal the new row instead of rewriting the whole file
+            self._append_to_journal(self._to_records(new_entry))
             
             return True
         except Exception as e:
@@ -155,43 +263,64 @@ class DataHandler:
         """
         Import emissions data from CSV.
         
+        The file is read and journalled in chunks; rows that fail validation
+        are skipped and counted in the message. If the file is malformed part
+        way through, the rows before that point stay imported and the message
+        says where the import stopped.
+        
         Args:
             file_path_or_buffer: Path to CSV file or file-like object
             
         Returns:
             tuple: (success, message)
         """
+        required_columns = ['date', 'scope', 'category', 'activity', 'quantity', 'unit', 'emission_factor']
+        imported = []
+        
+        def append_chunk(chunk):
+            # Journal each chunk as it is parsed; the snapshot is compacted once at the end
+            self._append_to_journal(chunk.to_dict('records'), compact=False)
+            chunk['date'] = pd.to_datetime(chunk['date'])
+            imported.append(chunk)
+        
         try:
-            # Read CSV
-            df = pd.read_csv(file_path_or_buffer)
-            
-            # Check required columns
-            required_columns = ['date', 'scope', 'category', 'activity', 'quantity', 'unit', 'emission_factor']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                return False, f"Missing required columns: {', '.join(missing_columns)}"
-            
-            # Convert date strings to datetime objects
-            df['date'] = pd.to_datetime(df['date'])
-            
-            # Calculate emissions if not provided
-            if 'emissions_kgCO2e' not in df.columns:
-                df['emissions_kgCO2e'] = df['quantity'].astype(float) * df['emission_factor'].astype(float)
-            
-            # Add notes column if not present
-            if 'notes' not in df.columns:
-                df['notes'] = ""
-            
-            # Append to existing data
-            self.emissions_data = pd.concat([self.emissions_data, df], ignore_index=True)
-            
-            # Save data
-            self.save_emissions_data()
-            
-            return True, f"Successfully imported {len(df)} entries"
+            report = ingest_csv(file_path_or_buffer, append_chunk, required_columns=required_columns, defaults={'notes': ""})
+        except ValueError as e:
+            return False, str(e)
         except Exception as e:
             return False, f"Error importing CSV: {str(e)}"
+        finally:
+            if imported:
+                # Keep the in-memory data in step with whatever was journalled
+                self.emissions_data = pd.concat([self.emissions_data] + imported, ignore_index=True)
+                if self._journal_rows >= JOURNAL_COMPACTION_THRESHOLD:
+                    self.save_emissions_data()
+        
+        if report.rows_accepted == 0:
+            return False, f"No valid rows to import ({report.rows_rejected} invalid rows skipped)"
+        message = f"Successfully imported {report.rows_accepted} entries"
+        if report.rows_rejected:
+            message += f" ({report.rows_rejected} invalid rows skipped)"
+        if report.error:
+            message = f"Partially imported {report.rows_accepted} entries ({report.rows_rejected} invalid rows skipped); {report.error}"
+        return True, message
+    
+    def recalculate_emissions(self):
+        """
+        Recalculate every entry from the emission factor database.
+        
+        Entries whose category and activity are not in the database, or
+        whose unit differs from the database unit, keep their own emission
+        factor; every entry keeps its unit.
+        
+        Returns:
+            int: Number of entries without an applicable database factor
+        """
+        resolved = resolve_factors(self.emissions_data, overwrite=True)
+        unknown = int((~resolved['factor_found']).sum())
+        self.emissions_data = resolved.drop(columns=['factor_found'])
+        self.save_emissions_data()
+        return unknown
     
     def export_csv(self, file_path=None, start_date=None, end_date=None):
         """
@@ -248,7 +377,8 @@ class DataHandler:
                 mask = (data['date'] >= pd.Timestamp(start_date)) & (data['date'] <= pd.Timestamp(end_date))
                 data = data.loc[mask]
             
-            # Create PDF
+            # Create PDF (fpdf2 is only loaded when a report is rendered)
+            from fpdf import FPDF
             pdf = FPDF()
             pdf.add_page()
             
@@ -11,6 +11,8 @@ def populate_demo_data():
     """Populate the system with demonstration data"""
     
     print("🌊 Populating Blockchain Blue Carbon Registry with demo data...")
+    # Populated data goes to the persisted registry, recovered first if need be
+    blockchain_mrv.start()
     
     # Sample blue carbon projects
     projects_data = [
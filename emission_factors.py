@@ -3,6 +3,13 @@ Emission factors database for YourCarbonFootprint application.
 Based on DEFRA/IPCC datasets for common emission sources.
 """
 
+from lazy_imports import lazy_import
+
+# NumPy and pandas load on the first FactorTable or resolve_factors call;
+# the factor dicts and their lookups below need neither
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
 # Emission factors by category (in kgCO2e per unit)
 EMISSION_FACTORS = {
     # Scope 1 - Direct emissions
@@ -246,3 +253,117 @@ def get_unit(category, activity):
     if ef:
         return ef["unit"]
     return None
+
+
+class FactorTable:
+    """
+    EMISSION_FACTORS compiled for vectorized lookups.
+    
+    Categories and activities each get an integer code; factors and units
+    are held in (category code, activity code) grids, so resolving a column
+    of pairs is two categorical encodings and an array index.
+    """
+    
+    def __init__(self, factors=None):
+        factors = EMISSION_FACTORS if factors is None else factors
+        self.categories = pd.Index(list(factors))
+        self.activities = pd.Index(sorted({activity for activities in factors.values() for activity in activities}))
+        shape = (len(self.categories), len(self.activities))
+        self.factor_grid = np.full(shape, np.nan)
+        self.unit_grid = np.full(shape, None, dtype=object)
+        for category, activities in factors.items():
+            row = self.categories.get_loc(category)
+            for activity, entry in activities.items():
+                column = self.activities.get_loc(activity)
+                self.factor_grid[row, column] = entry["factor"]
+                self.unit_grid[row, column] = entry["unit"]
+    
+    def lookup(self, categories, activities):
+        """
+        Factors and units for arrays of (category, activity) pairs.
+        
+        Args:
+            categories: Array-like of categories
+            activities: Array-like of activities, same length
+            
+        Returns:
+            tuple: (factors with NaN for unknown pairs, units with None for unknown pairs)
+        """
+        category_codes = self._encode(categories, self.categories)
+        activity_codes = self._encode(activities, self.activities)
+        known = (category_codes >= 0) & (activity_codes >= 0)
+        factors = np.full(len(category_codes), np.nan)
+        units = np.full(len(category_codes), None, dtype=object)
+        factors[known] = self.factor_grid[category_codes[known], activity_codes[known]]
+        units[known] = self.unit_grid[category_codes[known], activity_codes[known]]
+        return factors, units
+    
+    @staticmethod
+    def _encode(values, index):
+        """Codes of values in index, -1 where absent; matches each distinct value once"""
+        if not isinstance(values, (pd.Series, pd.Index, np.ndarray)):
+            values = np.asarray(values, dtype=object)
+        codes, uniques = pd.factorize(values)
+        mapped = index.get_indexer(uniques)
+        return np.where(codes >= 0, mapped[codes], -1)
+
+
+_factor_table = None
+
+def get_factor_table():
+    """The FactorTable for EMISSION_FACTORS, compiled on first use"""
+    global _factor_table
+    if _factor_table is None:
+        _factor_table = FactorTable()
+    return _factor_table
+
+def resolve_factors(df, overwrite=False, flag_column="factor_found"):
+    """
+    Fill emission factors, units and emissions for a whole DataFrame at once.
+    
+    Rows whose (category, activity) pair is not in EMISSION_FACTORS keep
+    their own values and are flagged instead of raising. A row's unit is
+    never replaced: the table factor is only used where the row's unit is
+    blank (it is then filled in) or matches the table's unit, since the
+    factor applies per that unit.
+    
+    Args:
+        df (DataFrame): Rows with category, activity and quantity columns
+        overwrite (bool): Replace existing factors and recalculate every
+            emission, instead of only filling blanks
+        flag_column (str): Boolean column added to mark rows the table
+            factor applies to, or None to skip it
+        
+    Returns:
+        DataFrame: A copy of df with emission_factor, unit and emissions_kgCO2e filled
+    """
+    result = df.copy()
+    factors, units = get_factor_table().lookup(result["category"], result["activity"])
+    
+    for column in ["emission_factor", "emissions_kgCO2e"]:
+        if column in result.columns:
+            result[column] = pd.to_numeric(result[column], errors="coerce")
+        else:
+            result[column] = np.nan
+    if "unit" not in result.columns:
+        result["unit"] = None
+    
+    row_units = result["unit"].fillna("").astype(str).str.strip().str.lower().to_numpy()
+    table_units = pd.Series(units, dtype=object).fillna("").str.lower().to_numpy()
+    found = ~np.isnan(factors) & ((row_units == "") | (row_units == table_units))
+    
+    replace = found if overwrite else found & result["emission_factor"].isna().to_numpy()
+    result["emission_factor"] = np.where(replace, factors, result["emission_factor"])
+    replace_unit = found & (row_units == "")
+    if replace_unit.any():
+        result.loc[replace_unit, "unit"] = units[replace_unit]
+    
+    emissions = pd.to_numeric(result["quantity"], errors="coerce") * result["emission_factor"]
+    if overwrite:
+        result["emissions_kgCO2e"] = emissions.where(emissions.notna(), result["emissions_kgCO2e"])
+    else:
+        result["emissions_kgCO2e"] = result["emissions_kgCO2e"].fillna(emissions)
+    
+    if flag_column:
+        result[flag_column] = found
+    return result
@@ -1,65 +1,74 @@
-import json
-import pandas as pd
-from datetime import datetime
+from emissions_mmap import open_current, read_rows
 
-# Load and analyze the emissions data
-with open('data/emissions.json', 'r') as f:
-    data = json.load(f)
+# Aggregates run over a memory-mapped columnar copy of the emissions store
+# (snapshot + journal), rebuilt only when the store has changed
+SOURCE = 'data/emissions.json'
+COLUMNAR_FILE = 'data/emissions.bcem'
 
-df = pd.DataFrame(data)
-df['date'] = pd.to_datetime(df['date'])
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+emissions = open_current(SOURCE, COLUMNAR_FILE)
+total_kg = emissions.total()
+start_date, end_date = emissions.date_range()
+
+# Rows printed in full are picked from the mapped columns; only those rows are
+# then read back from the store for their text fields
+top_rows = emissions.top_rows(10)
+high_emission_rows = emissions.rows_above('emissions_kgCO2e', 10000)
+high_factor_rows = emissions.rows_above('emission_factor', 100)
+records = read_rows(SOURCE, top_rows + high_emission_rows + high_factor_rows)
+top_activities = [records[row] for row in top_rows]
+high_emissions = [records[row] for row in high_emission_rows]
+high_factors = [records[row] for row in high_factor_rows]
 
 print("=" * 60)
 print("DETAILED EMISSIONS DATA ANALYSIS")
 print("=" * 60)
-print(f"Total records: {len(df)}")
-print(f"Date range: {df['date'].min().strftime('%Y-%m-%d')} to {df['date'].max().strftime('%Y-%m-%d')}")
-print(f"Period: {(df['date'].max() - df['date'].min()).days} days")
-print(f"Total emissions: {df['emissions_kgCO2e'].sum()/1000:.2f} tonnes CO2e")
+print(f"Total records: {len(emissions)}")
+print(f"Date range: {start_date} to {end_date}")
+print(f"Period: {(end_date - start_date).days if start_date else 0} days")
+print(f"Total emissions: {total_kg/1000:.2f} tonnes CO2e")
 print()
 
 print("=" * 60)
 print("BREAKDOWN BY SCOPE")
 print("=" * 60)
-scope_breakdown = df.groupby('scope').agg({
-    'emissions_kgCO2e': 'sum',
-    'activity': 'count'
-}).round(2)
-scope_breakdown.columns = ['Total_Emissions_kg', 'Activity_Count']
-scope_breakdown['Emissions_tonnes'] = scope_breakdown['Total_Emissions_kg'] / 1000
-scope_breakdown['Percentage'] = (scope_breakdown['Total_Emissions_kg'] / df['emissions_kgCO2e'].sum()) * 100
-
-for scope in scope_breakdown.index:
-    row = scope_breakdown.loc[scope]
+scope_totals = emissions.sum_by('scope')
+scope_counts = emissions.count_by('scope')
+for scope in sorted(scope_totals):
     print(f"{scope}:")
-    print(f"  - Emissions: {row['Emissions_tonnes']:.2f} tonnes ({row['Percentage']:.1f}%)")
-    print(f"  - Activities: {row['Activity_Count']} entries")
+    print(f"  - Emissions: {scope_totals[scope]/1000:.2f} tonnes ({scope_totals[scope] / total_kg * 100 if total_kg else 0:.1f}%)")
+    print(f"  - Activities: {scope_counts[scope]} entries")
     print()
 
 print("=" * 60)
 print("TOP 10 HIGHEST EMISSION ACTIVITIES")
 print("=" * 60)
-top_activities = df.nlargest(10, 'emissions_kgCO2e')
-for idx, row in top_activities.iterrows():
-    print(f"{row['activity']} ({row['scope']}):")
-    print(f"  - Emissions: {row['emissions_kgCO2e']/1000:.2f} tonnes CO2e")
-    print(f"  - Calculation: {row['quantity']:.0f} {row['unit']} × {row['emission_factor']:.2f} = {row['emissions_kgCO2e']:.0f} kg CO2e")
-    print(f"  - Date: {row['date'].strftime('%Y-%m-%d')}")
-    print(f"  - Facility: {row['facility']}")
-    print(f"  - Notes: {row['notes']}")
+for row in top_activities:
+    print(f"{row.get('activity')} ({row.get('scope')}):")
+    print(f"  - Emissions: {_number(row.get('emissions_kgCO2e'))/1000:.2f} tonnes CO2e")
+    print(f"  - Calculation: {_number(row.get('quantity')):.0f} {row.get('unit')} × {_number(row.get('emission_factor')):.2f} = {_number(row.get('emissions_kgCO2e')):.0f} kg CO2e")
+    print(f"  - Date: {str(row.get('date'))[:10]}")
+    print(f"  - Facility: {row.get('facility')}")
+    print(f"  - Notes: {row.get('notes')}")
     print()
 
 print("=" * 60)
 print("REALITY CHECK - QUESTIONABLE ACTIVITIES")
 print("=" * 60)
 print("Activities with emissions > 10 tonnes:")
-high_emissions = df[df['emissions_kgCO2e'] > 10000]
 if len(high_emissions) > 0:
-    for idx, row in high_emissions.iterrows():
-        print(f"⚠️  {row['activity']} = {row['emissions_kgCO2e']/1000:.1f} tonnes")
-        print(f"    Calculation: {row['quantity']:.0f} {row['unit']} × {row['emission_factor']:.2f}")
-        print(f"    Date: {row['date'].strftime('%Y-%m-%d')}")
-        print(f"    Notes: {row['notes']}")
+    for row in high_emissions:
+        print(f"⚠️  {row.get('activity')} = {_number(row.get('emissions_kgCO2e'))/1000:.1f} tonnes")
+        print(f"    Calculation: {_number(row.get('quantity')):.0f} {row.get('unit')} × {_number(row.get('emission_factor')):.2f}")
+        print(f"    Date: {str(row.get('date'))[:10]}")
+        print(f"    Notes: {row.get('notes')}")
         print()
 else:
     print("No activities with emissions > 10 tonnes found.")
@@ -67,22 +76,19 @@ else:
 print("=" * 60)
 print("MONTHLY BREAKDOWN")
 print("=" * 60)
-df['month'] = df['date'].dt.strftime('%Y-%m')
-monthly = df.groupby('month')['emissions_kgCO2e'].sum() / 1000
-for month, emissions in monthly.items():
-    print(f"{month}: {emissions:.2f} tonnes CO2e")
+for month, total in emissions.monthly_totals().items():
+    print(f"{month}: {total / 1000:.2f} tonnes CO2e")
 
 print()
 print("=" * 60)
 print("EMISSION FACTOR ANALYSIS")
 print("=" * 60)
 print("High emission factors (>100 kg CO2e per unit):")
-high_factors = df[df['emission_factor'] > 100]
-for idx, row in high_factors.iterrows():
-    print(f"{row['activity']}: {row['emission_factor']:.0f} kg CO2e per {row['unit']}")
-    print(f"  - Quantity: {row['quantity']:.0f} {row['unit']}")
-    print(f"  - Total emissions: {row['emissions_kgCO2e']/1000:.2f} tonnes")
-    print(f"  - Notes: {row['notes']}")
+for row in high_factors:
+    print(f"{row.get('activity')}: {_number(row.get('emission_factor')):.0f} kg CO2e per {row.get('unit')}")
+    print(f"  - Quantity: {_number(row.get('quantity')):.0f} {row.get('unit')}")
+    print(f"  - Total emissions: {_number(row.get('emissions_kgCO2e'))/1000:.2f} tonnes")
+    print(f"  - Notes: {row.get('notes')}")
     print()
 
 print("=" * 60)
@@ -90,13 +96,14 @@ print("SUMMARY FOR 1-MONTH PERIOD")
 print("=" * 60)
 print(f"Company: Manufacturing facility in Visakhapatnam")
 print(f"Assessment Period: 1 month (January 2025)")
-print(f"Total Emissions: {df['emissions_kgCO2e'].sum()/1000:.2f} tonnes CO2e")
-print(f"Daily Average: {(df['emissions_kgCO2e'].sum()/1000)/28:.2f} tonnes CO2e per day")
-print(f"Annual Projection: {(df['emissions_kgCO2e'].sum()/1000)*12:.2f} tonnes CO2e per year")
+print(f"Total Emissions: {total_kg/1000:.2f} tonnes CO2e")
+print(f"Daily Average: {(total_kg/1000)/28:.2f} tonnes CO2e per day")
+print(f"Annual Projection: {(total_kg/1000)*12:.2f} tonnes CO2e per year")
 print()
 print("Key Contributors:")
-print(f"1. Manufacturing Electricity: {df[df['activity']=='Manufacturing Electricity']['emissions_kgCO2e'].sum()/1000:.2f} tonnes")
-print(f"2. Refrigerant Leak: {df[df['activity']=='Refrigerant Leak']['emissions_kgCO2e'].sum()/1000:.2f} tonnes")
-print(f"3. Raw Materials: {df[df['activity']=='Raw Materials']['emissions_kgCO2e'].sum()/1000:.2f} tonnes")
-print(f"4. Boiler (Natural Gas): {df[df['activity']=='Boiler']['emissions_kgCO2e'].sum()/1000:.2f} tonnes")
-print(f"5. Chemical Production: {df[df['activity']=='Chemical Production']['emissions_kgCO2e'].sum()/1000:.2f} tonnes")
+activity_totals = emissions.sum_by('activity')
+print(f"1. Manufacturing Electricity: {activity_totals.get('Manufacturing Electricity', 0)/1000:.2f} tonnes")
+print(f"2. Refrigerant Leak: {activity_totals.get('Refrigerant Leak', 0)/1000:.2f} tonnes")
+print(f"3. Raw Materials: {activity_totals.get('Raw Materials', 0)/1000:.2f} tonnes")
+print(f"4. Boiler (Natural Gas): {activity_totals.get('Boiler', 0)/1000:.2f} tonnes")
+print(f"5. Chemical Production: {activity_totals.get('Chemical Production', 0)/1000:.2f} tonnes")
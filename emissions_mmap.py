@@ -0,0 +1,487 @@
+"""
+Memory-mapped columnar file format for large emissions histories.
+
+Numeric columns are stored as fixed-width little-endian arrays behind a small
+header, and scope/category/activity as integer codes into a side string table
+(<path>.strings.json). Opening a file only maps it; aggregations run over
+NumPy views of the mapping in fixed-size chunks, so resident memory stays
+bounded no matter how many rows the file holds.
+
+Usage:
+    python emissions_mmap.py build <emissions.json|emissions.journal|file.ndjson|carbon.db:company_id> <output.bcem>
+    python emissions_mmap.py summary <file.bcem>
+"""
+
+import json
+import os
+import sqlite3
+import struct
+import sys
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"BCEM"
+FORMAT_VERSION = 1
+
+# Header: magic, version, row count; padded so column data starts 8-byte aligned
+HEADER = struct.Struct("<4sIQ")
+HEADER_SIZE = 64
+
+# Fixed-width columns, in file order
+COLUMNS: List[Tuple[str, str]] = [
+    ('date', '<i4'),              # days since 1970-01-01
+    ('quantity', '<f8'),
+    ('emission_factor', '<f8'),
+    ('emissions_kgCO2e', '<f8'),
+    ('scope', '<u4'),             # codes into the string table
+    ('category', '<u4'),
+    ('activity', '<u4'),
+]
+
+STRING_COLUMNS = ['scope', 'category', 'activity']
+
+# Marks a missing or unparseable date
+MISSING_DATE = np.iinfo(np.int32).min
+
+# Rows processed per step when building or aggregating
+CHUNK_ROWS = 1_000_000
+
+# Characters read per step when streaming a JSON array snapshot
+JSON_READ_CHARS = 1 << 20
+
+_EPOCH = date(1970, 1, 1)
+
+
+def _to_days(value) -> int:
+    """Convert a date string or date-like value to days since the epoch"""
+    if value is None or value == "":
+        return MISSING_DATE
+    try:
+        if isinstance(value, datetime):
+            value = value.date()
+        elif not isinstance(value, date):
+            value = date.fromisoformat(str(value)[:10])
+        return (value - _EPOCH).days
+    except (TypeError, ValueError):
+        return MISSING_DATE
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def build_columnar(records: Iterable[Dict], path: str, chunk_rows: int = CHUNK_ROWS) -> int:
+    """
+    Write records to a columnar file, streaming them in chunks.
+
+    Each column is first spooled to its own temporary file, then the columns
+    are concatenated behind the header, so memory use is bounded by
+    chunk_rows rather than the number of records.
+
+    Args:
+        records: Iterable of emissions records (dicts)
+        path: Output file; the string table is written to path + '.strings.json'
+        chunk_rows: Records buffered per column write
+
+    Returns:
+        int: Number of rows written
+    """
+    string_tables = {column: {} for column in STRING_COLUMNS}
+    spool_paths = {name: f"{path}.{name}.tmp" for name, _ in COLUMNS}
+    spools = {name: open(spool_path, 'wb') for name, spool_path in spool_paths.items()}
+    buffers = {name: [] for name, _ in COLUMNS}
+    row_count = 0
+
+    def flush():
+        for name, dtype in COLUMNS:
+            spools[name].write(np.asarray(buffers[name], dtype=dtype).tobytes())
+            buffers[name].clear()
+
+    try:
+        for record in records:
+            buffers['date'].append(_to_days(record.get('date')))
+            buffers['quantity'].append(_to_float(record.get('quantity')))
+            buffers['emission_factor'].append(_to_float(record.get('emission_factor')))
+            buffers['emissions_kgCO2e'].append(_to_float(record.get('emissions_kgCO2e')))
+            for column in STRING_COLUMNS:
+                table = string_tables[column]
+                label = record.get(column)
+                label = "" if label is None else str(label)
+                buffers[column].append(table.setdefault(label, len(table)))
+            row_count += 1
+            if row_count % chunk_rows == 0:
+                flush()
+        flush()
+    finally:
+        for spool in spools.values():
+            spool.close()
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, row_count).ljust(HEADER_SIZE, b"\0"))
+        for name, dtype in COLUMNS:
+            with open(spool_paths[name], 'rb') as spool:
+                while True:
+                    block = spool.read(8 * 1024 * 1024)
+                    if not block:
+                        break
+                    out.write(block)
+            # Keep every column 8-byte aligned for the NumPy views
+            padding = -out.tell() % 8
+            out.write(b"\0" * padding)
+            os.remove(spool_paths[name])
+
+    with open(f"{path}.strings.json.tmp", 'w') as f:
+        json.dump({column: list(table) for column, table in string_tables.items()}, f)
+    os.replace(tmp_path, path)
+    os.replace(f"{path}.strings.json.tmp", f"{path}.strings.json")
+    return row_count
+
+
+class ColumnarEmissions:
+    """Read-only, memory-mapped view of a columnar emissions file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mmap = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, version, row_count = HEADER.unpack_from(self._mmap[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a columnar emissions file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar emissions format version {version}")
+        self.row_count = row_count
+
+        # Zero-copy views over each column of the mapping
+        self.columns: Dict[str, np.ndarray] = {}
+        offset = HEADER_SIZE
+        for name, dtype in COLUMNS:
+            itemsize = np.dtype(dtype).itemsize
+            self.columns[name] = np.ndarray((row_count,), dtype=dtype, buffer=self._mmap, offset=offset)
+            offset += row_count * itemsize
+            offset += -offset % 8
+
+        with open(f"{path}.strings.json", 'r') as f:
+            self.strings: Dict[str, List[str]] = json.load(f)
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def _chunks(self) -> Iterator[slice]:
+        for start in range(0, self.row_count, CHUNK_ROWS):
+            yield slice(start, min(start + CHUNK_ROWS, self.row_count))
+
+    def _date_mask(self, rows: slice, start_date=None, end_date=None) -> Optional[np.ndarray]:
+        if start_date is None and end_date is None:
+            return None
+        days = self.columns['date'][rows]
+        mask = days != MISSING_DATE
+        if start_date is not None:
+            mask &= days >= _to_days(start_date)
+        if end_date is not None:
+            mask &= days <= _to_days(end_date)
+        return mask
+
+    def total(self, column: str = 'emissions_kgCO2e', start_date=None, end_date=None) -> float:
+        """Sum of a numeric column, ignoring missing values"""
+        total = 0.0
+        for rows in self._chunks():
+            values = self.columns[column][rows]
+            mask = self._date_mask(rows, start_date, end_date)
+            if mask is not None:
+                values = values[mask]
+            total += float(np.nansum(values))
+        return total
+
+    def sum_by(self, key: str, column: str = 'emissions_kgCO2e', start_date=None, end_date=None) -> Dict[str, float]:
+        """
+        Sum a numeric column grouped by scope, category or activity.
+
+        Returns:
+            dict: Label -> sum, for labels that occur in the selected rows
+        """
+        if key not in STRING_COLUMNS:
+            raise ValueError(f"Cannot group by {key}")
+        labels = self.strings[key]
+        sums = np.zeros(len(labels))
+        counts = np.zeros(len(labels), dtype=np.int64)
+        for rows in self._chunks():
+            codes = self.columns[key][rows]
+            values = self.columns[column][rows]
+            mask = self._date_mask(rows, start_date, end_date)
+            if mask is not None:
+                codes, values = codes[mask], values[mask]
+            sums += np.bincount(codes, weights=np.nan_to_num(values), minlength=len(labels))
+            counts += np.bincount(codes, minlength=len(labels))
+        return {labels[i]: float(sums[i]) for i in np.flatnonzero(counts)}
+
+    def count_by(self, key: str) -> Dict[str, int]:
+        """Number of rows per scope, category or activity"""
+        labels = self.strings[key]
+        counts = np.zeros(len(labels), dtype=np.int64)
+        for rows in self._chunks():
+            counts += np.bincount(self.columns[key][rows], minlength=len(labels))
+        return {labels[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+
+    def monthly_totals(self, column: str = 'emissions_kgCO2e') -> Dict[str, float]:
+        """Sum of a numeric column per calendar month ('YYYY-MM'), in month order"""
+        totals: Dict[str, float] = {}
+        for rows in self._chunks():
+            days = self.columns['date'][rows]
+            valid = days != MISSING_DATE
+            months = days[valid].astype('datetime64[D]').astype('datetime64[M]')
+            unique_months, inverse = np.unique(months, return_inverse=True)
+            sums = np.bincount(inverse, weights=np.nan_to_num(self.columns[column][rows][valid]))
+            for month, value in zip(unique_months, sums):
+                label = str(month)
+                totals[label] = totals.get(label, 0.0) + float(value)
+        return dict(sorted(totals.items()))
+
+    def date_range(self) -> Tuple[Optional[date], Optional[date]]:
+        """Earliest and latest valid dates"""
+        low, high = None, None
+        for rows in self._chunks():
+            days = self.columns['date'][rows]
+            days = days[days != MISSING_DATE]
+            if len(days):
+                low = int(days.min()) if low is None else min(low, int(days.min()))
+                high = int(days.max()) if high is None else max(high, int(days.max()))
+        if low is None:
+            return None, None
+        return (np.datetime64(low, 'D').astype(date), np.datetime64(high, 'D').astype(date))
+
+    def top_rows(self, n: int, column: str = 'emissions_kgCO2e') -> List[int]:
+        """Row numbers of the n largest values of column, largest first (earliest row on ties)"""
+        best_values = np.empty(0)
+        best_rows = np.empty(0, dtype=np.int64)
+        if n <= 0:
+            return []
+        for rows in self._chunks():
+            values = self.columns[column][rows]
+            candidates = np.flatnonzero(~np.isnan(values))
+            if len(candidates) > n:
+                # Everything tied with the n-th largest value stays in, so ties resolve by row
+                cutoff = np.partition(values[candidates], len(candidates) - n)[len(candidates) - n]
+                candidates = candidates[values[candidates] >= cutoff]
+            best_values = np.concatenate([best_values, values[candidates]])
+            best_rows = np.concatenate([best_rows, candidates + rows.start])
+            order = np.lexsort((best_rows, -best_values))[:n]
+            best_values, best_rows = best_values[order], best_rows[order]
+        return [int(row) for row in best_rows]
+
+    def rows_above(self, column: str, threshold: float) -> List[int]:
+        """Row numbers whose value of column is greater than threshold, in row order"""
+        selected = []
+        for rows in self._chunks():
+            selected.extend(int(row) for row in np.flatnonzero(self.columns[column][rows] > threshold) + rows.start)
+        return selected
+
+    def to_frame(self, columns: Optional[List[str]] = None):
+        """Materialize selected columns as a pandas DataFrame (copies the data)"""
+        import pandas as pd
+
+        data = {}
+        for name in columns or [name for name, _ in COLUMNS]:
+            values = self.columns[name]
+            if name == 'date':
+                days = np.where(values == MISSING_DATE, np.iinfo(np.int64).min, values.astype(np.int64))
+                data[name] = pd.to_datetime(days.astype('datetime64[D]'), errors='coerce')
+            elif name in STRING_COLUMNS:
+                data[name] = pd.Categorical.from_codes(values.astype(np.int64), categories=self.strings[name])
+            else:
+                data[name] = np.array(values)
+        return pd.DataFrame(data)
+
+
+def open_columnar(path: str) -> ColumnarEmissions:
+    """Open a columnar emissions file for reading"""
+    return ColumnarEmissions(path)
+
+
+def iter_source_records(source: str) -> Iterator[Dict]:
+    """
+    Stream records from an emissions source.
+
+    Supports a JSON array file, the DataHandler store (emissions.json and/or
+    emissions.journal: the snapshot followed by the journal rows written on
+    top of it), a plain NDJSON file, or a company's rows in the SQLite store
+    given as 'path/to/carbon.db:company_id'.
+    """
+    if ".db:" in source:
+        db_path, company_id = source.rsplit(":", 1)
+        conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.execute(
+                "SELECT date, scope, category, activity, quantity, emission_factor, emissions_kgCO2e "
+                "FROM emissions WHERE company_id = ? ORDER BY id", (company_id,)
+            )
+            for row in cursor:
+                yield dict(row)
+        finally:
+            conn.close()
+    elif source.endswith(".ndjson"):
+        with open(source, 'r') as f:
+            for line in f:
+                yield json.loads(line)
+    elif source.endswith(".journal"):
+        yield from iter_snapshot_and_journal(os.path.splitext(source)[0] + ".json", source)
+    else:
+        yield from iter_snapshot_and_journal(source, os.path.splitext(source)[0] + ".journal")
+
+
+def read_rows(source: str, row_numbers: Iterable[int]) -> Dict[int, Dict]:
+    """
+    Full records for the given row numbers of source, in one streaming pass.
+
+    Row numbers are positions in iter_source_records order, the same order
+    build_columnar writes, so rows picked from the columnar file can be read
+    back with the fields it does not hold (unit, facility, notes, ...).
+    """
+    wanted = set(row_numbers)
+    found: Dict[int, Dict] = {}
+    if not wanted:
+        return found
+    last = max(wanted)
+    for index, record in enumerate(iter_source_records(source)):
+        if index in wanted:
+            found[index] = record
+        if index >= last:
+            break
+    return found
+
+
+def iter_json_array(path: str, read_chars: int = JSON_READ_CHARS) -> Iterator:
+    """Items of a file holding one JSON array, decoded one at a time"""
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer, pos, eof, started = "", 0, False, False
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n" + ("," if started else ""):
+                pos += 1
+            if pos == len(buffer) and not eof:
+                buffer, pos = f.read(read_chars), 0
+                eof = not buffer
+                continue
+            if pos == len(buffer):
+                raise ValueError(f"{path}: unterminated JSON array" if started else f"{path}: expected a JSON array")
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError(f"{path}: expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = len(buffer)
+            # An item running to the end of the buffer may be cut short (a number, say); read more
+            if end == len(buffer) and not eof:
+                more = f.read(read_chars)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield item
+            pos = end
+
+
+def iter_snapshot_and_journal(snapshot_path: str, journal_path: str) -> Iterator[Dict]:
+    """
+    Rows of a snapshot file followed by the journal rows appended since it was written.
+
+    Uses the same rules as DataHandler: the journal only counts if its header
+    matches the snapshot's row count, and a torn final line is ignored.
+    """
+    snapshot_rows = 0
+    if os.path.exists(snapshot_path):
+        # Streamed, so a large snapshot is never held in memory at once
+        for record in iter_json_array(snapshot_path):
+            snapshot_rows += 1
+            yield record
+
+    if not os.path.exists(journal_path):
+        return
+    with open(journal_path, 'rb') as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            return
+        if header.get('snapshot_rows') != snapshot_rows:
+            # Already folded into the snapshot by a compaction
+            return
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def _source_files(source: str) -> List[str]:
+    if ".db:" in source:
+        db_path = source.rsplit(":", 1)[0]
+        return [db_path, db_path + "-wal"]
+    stem = os.path.splitext(source)[0]
+    if source.endswith(".json") or source.endswith(".journal"):
+        return [stem + ".json", stem + ".journal"]
+    return [source]
+
+
+def _fingerprint(source: str) -> List:
+    fingerprint = []
+    for path in _source_files(source):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            fingerprint.append([path, stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def open_current(source: str, path: str) -> ColumnarEmissions:
+    """
+    Open the columnar file for source, (re)building it first if source changed.
+
+    The size and modification time of the source files are recorded next to
+    the columnar file (<path>.source.json), so unchanged data is only mapped.
+    """
+    fingerprint = _fingerprint(source)
+    fingerprint_path = f"{path}.source.json"
+    try:
+        with open(fingerprint_path, 'r') as f:
+            current = json.load(f) == {'source': source, 'files': fingerprint}
+    except (OSError, ValueError):
+        current = False
+    if not current or not os.path.exists(path):
+        build_columnar(iter_source_records(source), path)
+        with open(fingerprint_path, 'w') as f:
+            json.dump({'source': source, 'files': fingerprint}, f)
+    return open_columnar(path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "build":
+        rows = build_columnar(iter_source_records(sys.argv[2]), sys.argv[3])
+        print(f"✅ Wrote {rows} rows to {sys.argv[3]}")
+    elif len(sys.argv) == 3 and sys.argv[1] == "summary":
+        emissions = open_columnar(sys.argv[2])
+        start, end = emissions.date_range()
+        print(f"Total records: {len(emissions)}")
+        print(f"Date range: {start} to {end}")
+        print(f"Total emissions: {emissions.total() / 1000:.2f} tonnes CO2e")
+        print("\nBy scope:")
+        for scope, value in sorted(emissions.sum_by('scope').items()):
+            print(f"  {scope}: {value / 1000:.2f} tonnes")
+        print("\nMonthly:")
+        for month, value in emissions.monthly_totals().items():
+            print(f"  {month}: {value / 1000:.2f} tonnes")
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,485 @@
+"""
+Pluggable storage layer for per-company emissions data.
+Provides a JSON backend (the original list-of-dicts file) and a columnar
+Parquet backend partitioned by year and month.
+"""
+
+import datetime
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Dict, Hashable, Iterator, List, Optional
+
+import pandas as pd
+
+from serialization import dump_file, load_file
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Columns of an emissions record, in display order
+EMISSIONS_COLUMNS = [
+    'date', 'business_unit', 'project', 'scope', 'category', 'activity',
+    'country', 'facility', 'responsible_person', 'quantity', 'unit',
+    'emission_factor', 'emissions_kgCO2e', 'data_quality',
+    'verification_status', 'notes'
+]
+
+NUMERIC_COLUMNS = ['quantity', 'emission_factor', 'emissions_kgCO2e']
+
+# Low-cardinality columns stored dictionary-encoded
+DICTIONARY_COLUMNS = ['scope', 'category', 'activity']
+
+# Columns needed to draw the Dashboard charts
+DASHBOARD_COLUMNS = ['date', 'scope', 'category', 'emissions_kgCO2e']
+
+# Rows fetched per step when streaming an export
+EXPORT_BATCH_ROWS = 5000
+
+# A Parquet partition is rewritten as one file once appends leave it this many part files
+COMPACT_PART_FILES = 8
+
+# Written into each Parquet dataset on every change; readers skip names starting with '_'
+MANIFEST_FILE = "_manifest.json"
+
+
+def _export_value(value):
+    """Plain JSON/CSV-ready value for an exported cell"""
+    if value is None or (isinstance(value, float) and pd.isna(value)) or value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime.date)):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def _files_version(path: str) -> Hashable:
+    """(inode, file count, total size, newest mtime) of a file or directory tree"""
+    try:
+        root = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if not os.path.isdir(path):
+        return (root.st_ino, 1, root.st_size, root.st_mtime_ns)
+
+    count, size, mtime = 0, 0, root.st_mtime_ns
+    for dirpath, _, filenames in os.walk(path):
+        mtime = max(mtime, os.stat(dirpath).st_mtime_ns)
+        for filename in filenames:
+            try:
+                stat = os.stat(os.path.join(dirpath, filename))
+            except FileNotFoundError:
+                continue
+            count += 1
+            size += stat.st_size
+            mtime = max(mtime, stat.st_mtime_ns)
+    return (root.st_ino, count, size, mtime)
+
+
+class EmissionsStore(ABC):
+    """Base class for company emissions storage backends"""
+
+    def __init__(self, data_dir: str = "data"):
+        self.data_dir = data_dir
+
+    def company_dir(self, company_id: str) -> str:
+        """Directory holding a company's data files"""
+        return os.path.join(self.data_dir, f"company_{company_id}")
+
+    def initialize(self, company_id: str):
+        """Create empty storage for a newly registered company"""
+        os.makedirs(self.company_dir(company_id), exist_ok=True)
+
+    @abstractmethod
+    def read_records(self, company_id: str) -> List[Dict]:
+        """Read all emissions records for a company"""
+
+    @abstractmethod
+    def write_records(self, company_id: str, records: List[Dict]):
+        """Replace all emissions records for a company"""
+
+    @abstractmethod
+    def append_records(self, company_id: str, records: List[Dict]):
+        """Append emissions records for a company"""
+
+    @abstractmethod
+    def version(self, company_id: str) -> Hashable:
+        """
+        Token that changes whenever a company's stored emissions change,
+        including writes made by other processes sharing the data directory.
+        """
+
+    def read_frame(self,
+                   company_id: str,
+                   columns: Optional[List[str]] = None,
+                   start_date=None,
+                   end_date=None) -> pd.DataFrame:
+        """
+        Read a company's emissions as a DataFrame.
+
+        Args:
+            company_id: Company to read
+            columns: Columns to load, or None for all columns
+            start_date: Inclusive lower bound on the date column
+            end_date: Inclusive upper bound on the date column
+
+        Returns:
+            DataFrame with a datetime 'date' column when it is requested
+        """
+        df = pd.DataFrame(self.read_records(company_id))
+        if df.empty:
+            return pd.DataFrame(columns=columns or EMISSIONS_COLUMNS)
+
+        df['date'] = pd.to_datetime(df.get('date'), errors='coerce')
+        if start_date is not None:
+            df = df[df['date'] >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            df = df[df['date'] <= pd.Timestamp(end_date)]
+        if columns:
+            df = df.reindex(columns=columns)
+        return df.reset_index(drop=True)
+
+    def iter_rows(self,
+                  company_id: str,
+                  columns: Optional[List[str]] = None,
+                  start_date=None,
+                  end_date=None,
+                  batch_size: int = EXPORT_BATCH_ROWS) -> Iterator[Dict]:
+        """
+        Stream a company's emissions as dicts with ISO date strings.
+
+        Backends that can read incrementally override this so exports run in
+        constant memory; the default goes through read_frame.
+        """
+        df = self.read_frame(company_id, columns, start_date, end_date)
+        for row in df.to_dict('records'):
+            yield {k: _export_value(v) for k, v in row.items()}
+
+
+class JsonEmissionsStore(EmissionsStore):
+    """Stores each company's emissions as data/company_<id>/emissions.json"""
+
+    def _emissions_file(self, company_id: str) -> str:
+        return os.path.join(self.company_dir(company_id), "emissions.json")
+
+    def initialize(self, company_id: str):
+        super().initialize(company_id)
+        emissions_file = self._emissions_file(company_id)
+        if not os.path.exists(emissions_file):
+            with open(emissions_file, 'w') as f:
+                json.dump([], f)
+
+    def read_records(self, company_id: str) -> List[Dict]:
+        emissions_file = self._emissions_file(company_id)
+        try:
+            if os.path.exists(emissions_file):
+                return load_file(emissions_file)
+        except Exception as e:
+            print(f"Error loading emissions data: {e}")
+        return []
+
+    def write_records(self, company_id: str, records: List[Dict]):
+        emissions_file = self._emissions_file(company_id)
+        try:
+            dump_file(records, emissions_file)
+        except Exception as e:
+            print(f"Error saving emissions data: {e}")
+
+    def append_records(self, company_id: str, records: List[Dict]):
+        self.write_records(company_id, self.read_records(company_id) + list(records))
+
+    def version(self, company_id: str) -> Hashable:
+        return _files_version(self._emissions_file(company_id))
+
+
+class ParquetEmissionsStore(EmissionsStore):
+    """
+    Stores each company's emissions as a Parquet dataset under
+    data/company_<id>/emissions/year=YYYY/month=M/, with scope, category and
+    activity dictionary-encoded. Appends write a new part file to the affected
+    partitions, and a partition is compacted into one file once it holds
+    COMPACT_PART_FILES of them; reads support column projection and
+    date-range pushdown. Every change writes a new generation id to the
+    dataset's manifest, which version() reads instead of listing the files.
+    """
+
+    PARTITIONING = ['year', 'month']
+
+    def __init__(self, data_dir: str = "data"):
+        if not PYARROW_AVAILABLE:
+            raise ImportError("pyarrow is required for Parquet storage. Install with: pip install pyarrow")
+        super().__init__(data_dir)
+        self.json_store = JsonEmissionsStore(data_dir)
+        self._compact_lock = threading.Lock()
+
+        fields = [pa.field('seq', pa.int64())]
+        for column in EMISSIONS_COLUMNS:
+            if column == 'date':
+                fields.append(pa.field(column, pa.date32()))
+            elif column in NUMERIC_COLUMNS:
+                fields.append(pa.field(column, pa.float64()))
+            elif column in DICTIONARY_COLUMNS:
+                fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+            else:
+                fields.append(pa.field(column, pa.string()))
+        # Any columns outside the standard set, as a JSON object per row
+        fields.append(pa.field('extra', pa.string()))
+        self.schema = pa.schema(fields)
+        self.partition_schema = pa.schema([('year', pa.int16()), ('month', pa.int8())])
+
+    def _dataset_dir(self, company_id: str) -> str:
+        return os.path.join(self.company_dir(company_id), "emissions")
+
+    def _migrate_json(self, company_id: str):
+        """Import an existing emissions.json the first time a company is read"""
+        records = self.json_store.read_records(company_id)
+        if records:
+            self._write_dataset(self._dataset_dir(company_id), records, first_seq=0)
+            self._write_manifest(self._dataset_dir(company_id))
+
+    def _to_table(self, records: List[Dict], first_seq: int) -> "pa.Table":
+        df = pd.DataFrame(records)
+        extra_columns = [c for c in df.columns if c not in EMISSIONS_COLUMNS]
+        df = df.reindex(columns=EMISSIONS_COLUMNS + extra_columns)
+
+        if extra_columns:
+            extras = df[extra_columns].to_dict('records')
+            df['extra'] = [json.dumps({k: v for k, v in row.items() if pd.notna(v)}, default=str) for row in extras]
+            df = df.drop(columns=extra_columns)
+        else:
+            df['extra'] = None
+
+        dates = pd.to_datetime(df['date'], errors='coerce')
+        df['date'] = dates.dt.date
+        # Rows without a valid date land in year=0/month=0
+        df['year'] = dates.dt.year.fillna(0).astype('int16')
+        df['month'] = dates.dt.month.fillna(0).astype('int8')
+        df['seq'] = range(first_seq, first_seq + len(df))
+
+        for column in NUMERIC_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        for column in EMISSIONS_COLUMNS:
+            if column != 'date' and column not in NUMERIC_COLUMNS:
+                df[column] = df[column].map(lambda v: None if v is None or (isinstance(v, float) and pd.isna(v)) else str(v))
+
+        schema = self.schema
+        for field in self.partition_schema:
+            schema = schema.append(field)
+        return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+    def _write_dataset(self, root: str, records: List[Dict], first_seq: int) -> List[str]:
+        """Write records as new part files; returns the partition directories written to"""
+        table = self._to_table(records, first_seq)
+        pq.write_to_dataset(
+            table,
+            root,
+            partition_cols=self.PARTITIONING,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore'
+        )
+        partitions = set(zip(table.column('year').to_pylist(), table.column('month').to_pylist()))
+        return [os.path.join(root, f"year={year}", f"month={month}") for year, month in sorted(partitions)]
+
+    def _write_manifest(self, root: str):
+        """Record a new generation of the dataset at root"""
+        path = os.path.join(root, MANIFEST_FILE)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        dump_file({'generation': uuid.uuid4().hex}, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _compact_partition(self, partition_dir: str):
+        """
+        Rewrite a partition holding COMPACT_PART_FILES or more part files as one file.
+
+        The compacted partition is built beside the old one under a hidden
+        name and swapped in, so readers see either the old files or the new one.
+        """
+        parts = sorted(name for name in os.listdir(partition_dir)
+                       if name.endswith('.parquet') and not name.startswith(('.', '_')))
+        if len(parts) < COMPACT_PART_FILES:
+            return
+        table = pa.concat_tables(
+            [pq.read_table(os.path.join(partition_dir, name), schema=self.schema) for name in parts]
+        ).sort_by('seq')
+
+        parent, name = os.path.split(partition_dir)
+        new_dir = os.path.join(parent, f".{name}.compact")
+        old_dir = os.path.join(parent, f".{name}.old")
+        shutil.rmtree(new_dir, ignore_errors=True)
+        os.makedirs(new_dir)
+        pq.write_table(table, os.path.join(new_dir, f"part-{uuid.uuid4().hex}-0.parquet"))
+        os.replace(partition_dir, old_dir)
+        os.replace(new_dir, partition_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    def _dataset(self, company_id: str) -> Optional["ds.Dataset"]:
+        root = self._dataset_dir(company_id)
+        if not os.path.isdir(root):
+            self._migrate_json(company_id)
+            if not os.path.isdir(root):
+                return None
+        return ds.dataset(
+            root,
+            format='parquet',
+            schema=self.schema.append(self.partition_schema.field('year')).append(self.partition_schema.field('month')),
+            partitioning=ds.partitioning(self.partition_schema, flavor='hive')
+        )
+
+    def initialize(self, company_id: str):
+        root = self._dataset_dir(company_id)
+        os.makedirs(root, exist_ok=True)
+        if not os.path.exists(os.path.join(root, MANIFEST_FILE)):
+            self._write_manifest(root)
+
+    def write_records(self, company_id: str, records: List[Dict]):
+        root = self._dataset_dir(company_id)
+        tmp_root = f"{root}.tmp"
+        try:
+            shutil.rmtree(tmp_root, ignore_errors=True)
+            os.makedirs(tmp_root)
+            if records:
+                self._write_dataset(tmp_root, records, first_seq=0)
+            self._write_manifest(tmp_root)
+            # Swap the new dataset in so readers never see a partial rewrite
+            old_root = f"{root}.old"
+            if os.path.isdir(root):
+                os.replace(root, old_root)
+            os.replace(tmp_root, root)
+            shutil.rmtree(old_root, ignore_errors=True)
+        except Exception as e:
+            print(f"Error saving emissions data: {e}")
+
+    def append_records(self, company_id: str, records: List[Dict]):
+        if not records:
+            return
+        root = self._dataset_dir(company_id)
+        if not os.path.isdir(root):
+            self._migrate_json(company_id)
+        try:
+            # Nanosecond clock keeps appended rows ordered after earlier writes
+            partitions = self._write_dataset(root, records, first_seq=time.time_ns())
+            with self._compact_lock:
+                for partition_dir in partitions:
+                    self._compact_partition(partition_dir)
+            self._write_manifest(root)
+        except Exception as e:
+            print(f"Error saving emissions data: {e}")
+
+    def version(self, company_id: str) -> Hashable:
+        # Until the first read migrates it, the data still lives in emissions.json
+        root = self._dataset_dir(company_id)
+        if not os.path.isdir(root):
+            return ('json', self.json_store.version(company_id))
+        try:
+            return ('parquet', load_file(os.path.join(root, MANIFEST_FILE))['generation'])
+        except (OSError, ValueError, KeyError):
+            # Datasets written before manifests existed, until their next write
+            return _files_version(root)
+
+    def _scan(self, company_id: str, columns: Optional[List[str]], start_date, end_date) -> Optional["pa.Table"]:
+        dataset = self._dataset(company_id)
+        if dataset is None:
+            return None
+
+        scan_columns = None
+        if columns is not None:
+            scan_columns = ['seq'] + [c for c in columns if c in self.schema.names and c != 'seq']
+        table = dataset.to_table(columns=scan_columns, filter=self._date_filter(start_date, end_date))
+        return table.sort_by('seq')
+
+    def _date_filter(self, start_date, end_date) -> Optional["ds.Expression"]:
+        """Date-range filter that also prunes year partitions"""
+        expression = None
+        if start_date is not None:
+            start = pd.Timestamp(start_date)
+            expression = (ds.field('year') >= start.year) & (ds.field('date') >= pa.scalar(start.date(), pa.date32()))
+        if end_date is not None:
+            end = pd.Timestamp(end_date)
+            bound = (ds.field('year') <= end.year) & (ds.field('date') <= pa.scalar(end.date(), pa.date32()))
+            expression = bound if expression is None else expression & bound
+        return expression
+
+    def iter_rows(self,
+                  company_id: str,
+                  columns: Optional[List[str]] = None,
+                  start_date=None,
+                  end_date=None,
+                  batch_size: int = EXPORT_BATCH_ROWS) -> Iterator[Dict]:
+        # Record batches straight from the scanner, in partition order
+        columns = columns or EMISSIONS_COLUMNS
+        dataset = self._dataset(company_id)
+        if dataset is None:
+            return
+        scan_columns = [c for c in columns if c in self.schema.names]
+        for batch in dataset.to_batches(columns=scan_columns, filter=self._date_filter(start_date, end_date), batch_size=batch_size):
+            for row in batch.to_pylist():
+                yield {c: _export_value(row.get(c)) for c in columns}
+
+    def read_records(self, company_id: str) -> List[Dict]:
+        try:
+            table = self._scan(company_id, EMISSIONS_COLUMNS + ['extra'], None, None)
+        except Exception as e:
+            print(f"Error loading emissions data: {e}")
+            return []
+        if table is None:
+            return []
+
+        records = []
+        for row in table.drop_columns(['seq']).to_pylist():
+            extra = row.pop('extra')
+            if row['date'] is not None:
+                row['date'] = row['date'].strftime('%Y-%m-%d')
+            if extra:
+                row.update(json.loads(extra))
+            records.append(row)
+        return records
+
+    def read_frame(self,
+                   company_id: str,
+                   columns: Optional[List[str]] = None,
+                   start_date=None,
+                   end_date=None) -> pd.DataFrame:
+        table = self._scan(company_id, columns or EMISSIONS_COLUMNS, start_date, end_date)
+        if table is None:
+            return pd.DataFrame(columns=columns or EMISSIONS_COLUMNS)
+
+        df = table.drop_columns(['seq']).to_pandas()
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date'])
+        # Hand back plain strings so callers can group and concatenate freely
+        for column in DICTIONARY_COLUMNS:
+            if column in df.columns:
+                df[column] = df[column].astype(object)
+        if columns:
+            df = df.reindex(columns=columns)
+        return df
+
+
+EMISSIONS_STORES = {
+    'json': JsonEmissionsStore,
+    'parquet': ParquetEmissionsStore,
+}
+
+
+def get_emissions_store(data_dir: str = "data", backend: Optional[str] = None) -> EmissionsStore:
+    """
+    Create the configured emissions store.
+
+    The backend is taken from the EMISSIONS_STORE_BACKEND environment variable
+    when not given. 'auto' selects Parquet when pyarrow is installed and falls
+    back to JSON otherwise.
+    """
+    backend = (backend or os.getenv("EMISSIONS_STORE_BACKEND", "auto")).lower()
+    if backend == 'auto':
+        backend = 'parquet' if PYARROW_AVAILABLE else 'json'
+    if backend not in EMISSIONS_STORES:
+        raise ValueError(f"Unknown emissions store backend: {backend}")
+    return EMISSIONS_STORES[backend](data_dir)
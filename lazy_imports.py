@@ -0,0 +1,121 @@
+"""
+Deferred imports and a startup import-time report.
+
+lazy_import returns a module object whose code runs on first attribute
+access, so a page or endpoint that never touches plotly (say) never pays
+for loading it. lazy_attr does the same for an object defined in a module,
+and lazy_call for the object a module function returns, such as the started
+blockchain_mrv registry.
+
+Run as a script to see what a module costs to import:
+    python lazy_imports.py backend_api --top 25
+It runs `python -X importtime -c "import <module>"` in a fresh interpreter
+and lists the slowest imports by cumulative time, with the total and the
+child process's peak RSS.
+"""
+
+import argparse
+import importlib
+import importlib.util
+import os
+import subprocess
+import sys
+from typing import Any, Callable, List, Tuple
+
+
+def lazy_import(name: str):
+    """Module that is only executed when one of its attributes is first used"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+class _LazyAttr:
+    """Stand-in for module.attribute that imports the module on first use"""
+
+    def __init__(self, load: Callable[[], Any]):
+        object.__setattr__(self, '_load', load)
+        object.__setattr__(self, '_target', None)
+
+    def _resolve(self):
+        target = object.__getattribute__(self, '_target')
+        if target is None:
+            target = object.__getattribute__(self, '_load')()
+            object.__setattr__(self, '_target', target)
+        return target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._resolve(), name, value)
+
+
+def lazy_attr(module_name: str, attribute: str):
+    """Proxy for module_name.attribute, importing module_name on first use"""
+    return _LazyAttr(lambda: getattr(importlib.import_module(module_name), attribute))
+
+
+def lazy_call(module_name: str, function: str):
+    """Proxy for module_name.function(), importing the module and calling it on first use"""
+    return _LazyAttr(lambda: getattr(importlib.import_module(module_name), function)())
+
+
+def measure_imports(module: str) -> Tuple[List[Tuple[int, int, str]], int, int]:
+    """
+    Import module in a fresh interpreter with -X importtime.
+
+    Returns:
+        ([(self_us, cumulative_us, name)], peak RSS in KB, exit code)
+    """
+    code = (
+        f"import {module}, resource, sys; "
+        f"print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=os.getcwd()
+    )
+    timings = []
+    peak_rss = 0
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:"):
+            parts = line[len("import time:"):].split("|")
+            if parts[0].strip().isdigit():
+                timings.append((int(parts[0]), int(parts[1]), parts[2].rstrip()))
+        elif line.strip().isdigit():
+            peak_rss = int(line.strip())
+    return timings, peak_rss, result.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import time of a module")
+    parser.add_argument("module", nargs="?", default="backend_api", help="Module to import (default: backend_api)")
+    parser.add_argument("--top", type=int, default=20, help="Number of imports to list")
+    args = parser.parse_args()
+
+    timings, peak_rss, returncode = measure_imports(args.module)
+    if not timings:
+        print(f"❌ Could not import {args.module}")
+        sys.exit(1)
+
+    top_level = [t for t in timings if not t[2].startswith("  ")]
+    total_us = sum(cumulative for _, cumulative, _ in top_level)
+    print(f"📦 import {args.module}: {total_us / 1000:.0f} ms, {len(timings)} modules, peak RSS {peak_rss / 1024:.1f} MB")
+    if returncode != 0:
+        print(f"⚠️ The import exited with status {returncode}; timings cover what loaded before that")
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  module")
+    for self_us, cumulative_us, name in sorted(timings, key=lambda t: t[1], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name.strip()}")
+
+
+if __name__ == "__main__":
+    main()
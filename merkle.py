@@ -0,0 +1,260 @@
+"""
+Merkle batching of registry record hashes.
+
+Project and verification payload hashes are collected into batches; each
+sealed batch has one Merkle root, so a single on-chain anchor covers every
+record in it, and any record can later be proven against that root.
+
+Tree layout: leaf = sha256(0x00 || payload hash), node = sha256(0x01 ||
+left || right). The prefixes keep a leaf from being passed off as an inner
+node. An odd node at the end of a level is carried up unchanged rather than
+duplicated, so no two leaf lists share a root.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def canonical_json(data) -> bytes:
+    """
+    Canonical encoding of a payload for hashing: sorted keys, stdlib formatting.
+
+    Kept byte-for-byte identical to the registry's original hash input so
+    existing record hashes still verify. Deliberately not the orjson fast
+    path, whose float formatting differs from the stdlib's.
+    """
+    return json.dumps(data, sort_keys=True).encode()
+
+
+def hash_payload(data) -> str:
+    """SHA-256 hex digest of a payload's canonical encoding"""
+    return hashlib.sha256(canonical_json(data)).hexdigest()
+
+
+def _leaf(payload_hash: str) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + bytes.fromhex(payload_hash)).digest()
+
+
+def _node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_levels(payload_hashes: List[str]) -> List[List[bytes]]:
+    """All tree levels, leaves first and the root level last"""
+    level = [_leaf(h) for h in payload_hashes]
+    levels = [level]
+    while len(level) > 1:
+        level = [_node(level[i], level[i + 1]) if i + 1 < len(level) else level[i]
+                 for i in range(0, len(level), 2)]
+        levels.append(level)
+    return levels
+
+
+def merkle_root(payload_hashes: List[str]) -> str:
+    if not payload_hashes:
+        raise ValueError("Cannot build a Merkle root of no leaves")
+    return build_levels(payload_hashes)[-1][0].hex()
+
+
+def verify_proof(payload_hash: str, proof: List[Dict], root: str) -> bool:
+    """
+    Check an inclusion proof.
+
+    Args:
+        payload_hash: Hex hash of the record payload
+        proof: Sibling steps from leaf to root, each {'hash': hex, 'position': 'left' | 'right'}
+        root: Expected hex Merkle root
+    """
+    try:
+        current = _leaf(payload_hash)
+        for step in proof:
+            sibling = bytes.fromhex(step['hash'])
+            if step['position'] == 'left':
+                current = _node(sibling, current)
+            elif step['position'] == 'right':
+                current = _node(current, sibling)
+            else:
+                return False
+    except (KeyError, TypeError, ValueError):
+        return False
+    return current.hex() == root
+
+
+@dataclass
+class MerkleBatch:
+    """A sealed batch of (record key, payload hash) leaves and its root"""
+    id: int
+    root: str
+    leaves: List[Tuple[str, str]]
+    sealed_at: datetime
+    _levels: Optional[List[List[bytes]]] = field(default=None, repr=False, compare=False)
+
+    def levels(self) -> List[List[bytes]]:
+        if self._levels is None:
+            self._levels = build_levels([h for _, h in self.leaves])
+        return self._levels
+
+    def proof(self, index: int) -> List[Dict]:
+        """Sibling path for the leaf at index"""
+        steps = []
+        for level in self.levels()[:-1]:
+            sibling = index ^ 1
+            if sibling < len(level):
+                steps.append({
+                    'hash': level[sibling].hex(),
+                    'position': 'left' if sibling < index else 'right'
+                })
+            index //= 2
+        return steps
+
+    def to_record(self) -> Dict:
+        return {
+            'root': self.root,
+            'leaves': [list(leaf) for leaf in self.leaves],
+            'sealed_at': self.sealed_at.isoformat()
+        }
+
+
+class MerkleAccumulator:
+    """
+    Collects payload hashes and seals them into Merkle batches.
+
+    Args:
+        batch_size: Leaves per batch; a full batch is sealed at once
+        max_age_seconds: Seal a partial batch once its oldest leaf is this
+            old; 0 (or None) disables age-based sealing, leaving partial
+            batches for seal()
+    """
+
+    def __init__(self, batch_size: int = 1024, max_age_seconds: Optional[float] = 300):
+        self.batch_size = batch_size
+        self.max_age_seconds = max_age_seconds
+        self.batches: Dict[int, MerkleBatch] = {}
+        self._pending: List[Tuple[str, str]] = []
+        self._pending_since: Optional[float] = None
+        self._locations: Dict[str, Tuple[int, int]] = {}  # record key -> (batch id, leaf index)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)  # signalled when a pending batch starts
+
+    def add(self, record_key: str, payload_hash: str) -> Optional[MerkleBatch]:
+        """
+        Queue a record's payload hash.
+
+        Returns:
+            The batch sealed as a result (full, or pending longer than
+            max_age_seconds), else None
+        """
+        with self._lock:
+            if not self._pending:
+                self._pending_since = time.monotonic()
+                self._cond.notify_all()
+            self._pending.append((record_key, payload_hash))
+            if len(self._pending) >= self.batch_size or self._due():
+                return self._seal()
+        return None
+
+    def seal(self) -> Optional[MerkleBatch]:
+        """Seal the pending leaves now; None if there are none"""
+        with self._lock:
+            return self._seal()
+
+    def seal_if_due(self) -> Optional[MerkleBatch]:
+        """Seal the pending leaves if the oldest is max_age_seconds old; else None"""
+        with self._lock:
+            if self._due():
+                return self._seal()
+        return None
+
+    def wait_until_due(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait once for the pending leaves to reach max_age_seconds.
+
+        Returns early when a new batch starts, on wake() or after timeout,
+        so callers loop on it.
+
+        Returns:
+            True if a batch is due for sealing
+        """
+        with self._cond:
+            if not self._due():
+                if self._pending and self.max_age_seconds:
+                    timeout = self._pending_since + self.max_age_seconds - time.monotonic()
+                self._cond.wait(timeout)
+            return self._due()
+
+    def wake(self):
+        """Release threads blocked in wait_until_due"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def _due(self) -> bool:
+        if not self._pending or not self.max_age_seconds:
+            return False
+        return time.monotonic() - self._pending_since >= self.max_age_seconds
+
+    def _seal(self) -> Optional[MerkleBatch]:
+        if not self._pending:
+            return None
+        leaves, self._pending = self._pending, []
+        batch_id = max(self.batches, default=0) + 1
+        levels = build_levels([h for _, h in leaves])
+        batch = MerkleBatch(batch_id, levels[-1][0].hex(), leaves, datetime.now(), levels)
+        self._register(batch)
+        return batch
+
+    def _register(self, batch: MerkleBatch):
+        self.batches[batch.id] = batch
+        for index, (record_key, _) in enumerate(batch.leaves):
+            self._locations[record_key] = (batch.id, index)
+
+    def load(self, batch_records: Dict[int, Dict], pending: List[Tuple[str, str]]):
+        """Restore persisted batches, then queue the leaves not in any of them"""
+        with self._lock:
+            self.batches = {}
+            self._locations = {}
+            for batch_id in sorted(batch_records):
+                record = batch_records[batch_id]
+                self._register(MerkleBatch(
+                    batch_id,
+                    record['root'],
+                    [tuple(leaf) for leaf in record['leaves']],
+                    datetime.fromisoformat(record['sealed_at'])
+                ))
+            self._pending = [leaf for leaf in pending if leaf[0] not in self._locations]
+            self._pending_since = time.monotonic() if self._pending else None
+
+    def get_proof(self, record_key: str) -> Optional[Dict]:
+        """
+        Inclusion proof for a record.
+
+        Returns:
+            Dict with batch_id, root, payload_hash, index and proof; None if
+            the record is not in a sealed batch
+        """
+        location = self._locations.get(record_key)
+        if location is None:
+            return None
+        batch_id, index = location
+        batch = self.batches[batch_id]
+        return {
+            'batch_id': batch_id,
+            'root': batch.root,
+            'payload_hash': batch.leaves[index][1],
+            'index': index,
+            'proof': batch.proof(index)
+        }
+
+    def is_pending(self, record_key: str) -> bool:
+        with self._lock:
+            return any(key == record_key for key, _ in self._pending)
+
+    def to_records(self) -> Dict[int, Dict]:
+        return {batch_id: batch.to_record() for batch_id, batch in self.batches.items()}
@@ -0,0 +1,209 @@
+"""
+Price-time priority order book for the carbon credit marketplace.
+Listings are keyed by (price_per_ton, sequence, credit_id). A credit takes a
+new sequence number every time it is listed or repriced, so iteration order
+is best price first, then earliest listed at that price.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+ListingKey = Tuple[float, int, int]
+
+
+class SortedKeyList:
+    """
+    Sorted list split into bounded buckets.
+
+    Insert and remove bisect the bucket maxima and then the bucket itself,
+    so both cost O(log n) comparisons plus a memmove of at most LOAD items.
+    """
+
+    LOAD = 512
+
+    def __init__(self):
+        self._buckets: List[List[ListingKey]] = []
+        self._maxes: List[ListingKey] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[ListingKey]:
+        for bucket in self._buckets:
+            yield from bucket
+
+    def add(self, key: ListingKey):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+        else:
+            pos = bisect_left(self._maxes, key)
+            if pos == len(self._buckets):
+                pos -= 1
+                self._buckets[pos].append(key)
+                self._maxes[pos] = key
+            else:
+                insort(self._buckets[pos], key)
+            if len(self._buckets[pos]) > 2 * self.LOAD:
+                bucket = self._buckets[pos]
+                self._buckets[pos:pos + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+                self._maxes[pos:pos + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+        self._len += 1
+
+    def remove(self, key: ListingKey) -> bool:
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._buckets):
+            return False
+        bucket = self._buckets[pos]
+        idx = bisect_left(bucket, key)
+        if idx == len(bucket) or bucket[idx] != key:
+            return False
+        del bucket[idx]
+        self._len -= 1
+        if not bucket:
+            del self._buckets[pos]
+            del self._maxes[pos]
+        else:
+            self._maxes[pos] = bucket[-1]
+        return True
+
+    def bulk_load(self, keys: Iterable[ListingKey]):
+        """Replace the contents with keys, sorting once instead of inserting one by one"""
+        ordered = sorted(keys)
+        self._buckets = [ordered[i:i + self.LOAD] for i in range(0, len(ordered), self.LOAD)]
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        self._len = len(ordered)
+
+    def first(self) -> Optional[ListingKey]:
+        return self._buckets[0][0] if self._buckets else None
+
+    def iter_from(self, key: Optional[ListingKey] = None) -> Iterator[ListingKey]:
+        """Iterate keys strictly greater than key (all keys when key is None)"""
+        if key is None:
+            yield from self
+            return
+        pos = bisect_right(self._maxes, key)
+        if pos == len(self._buckets):
+            return
+        bucket = self._buckets[pos]
+        yield from bucket[bisect_right(bucket, key):]
+        for bucket in self._buckets[pos + 1:]:
+            yield from bucket
+
+
+class OrderBook:
+    """Listings indexed by price then time, overall and per project and ecosystem"""
+
+    def __init__(self):
+        self.book = SortedKeyList()
+        self.by_project: Dict[int, SortedKeyList] = {}
+        self.by_ecosystem: Dict[str, SortedKeyList] = {}
+        # credit id -> (key, project_id, ecosystem_type)
+        self.listings: Dict[int, Tuple[ListingKey, int, str]] = {}
+        self._next_sequence = 1
+
+    def __len__(self) -> int:
+        return len(self.listings)
+
+    def __contains__(self, credit_id: int) -> bool:
+        return credit_id in self.listings
+
+    def add(self, credit_id: int, price_per_ton: float, project_id: int, ecosystem_type: str,
+            sequence: Optional[int] = None):
+        """
+        List a credit, replacing any existing listing for it.
+
+        The credit joins the back of its price level; pass sequence only to
+        restore a persisted listing in its original place.
+        """
+        if credit_id in self.listings:
+            self.cancel(credit_id)
+        if sequence is None:
+            sequence = self._next_sequence
+        self._next_sequence = max(self._next_sequence, sequence + 1)
+        key = (price_per_ton, sequence, credit_id)
+        self.listings[credit_id] = (key, project_id, ecosystem_type)
+        self.book.add(key)
+        self.by_project.setdefault(project_id, SortedKeyList()).add(key)
+        self.by_ecosystem.setdefault(ecosystem_type, SortedKeyList()).add(key)
+
+    def cancel(self, credit_id: int) -> bool:
+        """Remove a credit's listing; returns False if it was not listed"""
+        entry = self.listings.pop(credit_id, None)
+        if entry is None:
+            return False
+        key, project_id, ecosystem_type = entry
+        self.book.remove(key)
+        for index, value in ((self.by_project, project_id), (self.by_ecosystem, ecosystem_type)):
+            index[value].remove(key)
+            if not index[value]:
+                del index[value]
+        return True
+
+    def bulk_load(self, entries: Iterable[Tuple[int, float, int, str, int]]):
+        """Rebuild the book from (credit_id, price_per_ton, project_id, ecosystem_type, sequence) entries"""
+        self.listings = {}
+        self._next_sequence = 1
+        project_keys: Dict[int, List[ListingKey]] = {}
+        ecosystem_keys: Dict[str, List[ListingKey]] = {}
+        for credit_id, price_per_ton, project_id, ecosystem_type, sequence in entries:
+            key = (price_per_ton, sequence, credit_id)
+            self._next_sequence = max(self._next_sequence, sequence + 1)
+            self.listings[credit_id] = (key, project_id, ecosystem_type)
+            project_keys.setdefault(project_id, []).append(key)
+            ecosystem_keys.setdefault(ecosystem_type, []).append(key)
+
+        self.book = SortedKeyList()
+        self.book.bulk_load(entry[0] for entry in self.listings.values())
+        self.by_project = {}
+        for project_id, keys in project_keys.items():
+            self.by_project[project_id] = SortedKeyList()
+            self.by_project[project_id].bulk_load(keys)
+        self.by_ecosystem = {}
+        for ecosystem_type, keys in ecosystem_keys.items():
+            self.by_ecosystem[ecosystem_type] = SortedKeyList()
+            self.by_ecosystem[ecosystem_type].bulk_load(keys)
+
+    def price_of(self, credit_id: int) -> Optional[float]:
+        entry = self.listings.get(credit_id)
+        return entry[0][0] if entry else None
+
+    def sequence_of(self, credit_id: int) -> Optional[int]:
+        """Time priority of a credit's listing, or None if it is not listed"""
+        entry = self.listings.get(credit_id)
+        return entry[0][1] if entry else None
+
+    def key_of(self, credit_id: int) -> Optional[ListingKey]:
+        entry = self.listings.get(credit_id)
+        return entry[0] if entry else None
+
+    def iter_listings(self,
+                      project_id: Optional[int] = None,
+                      ecosystem_type: Optional[str] = None,
+                      max_price: Optional[float] = None,
+                      after: Optional[ListingKey] = None) -> Iterator[ListingKey]:
+        """
+        Iterate listing keys in price-time order.
+
+        Args:
+            project_id: Only listings for this project
+            ecosystem_type: Only listings for projects of this ecosystem
+            max_price: Stop once the price exceeds this limit
+            after: Resume strictly after this key (for pagination)
+        """
+        if project_id is not None:
+            keys = self.by_project.get(project_id)
+        elif ecosystem_type is not None:
+            keys = self.by_ecosystem.get(ecosystem_type)
+        else:
+            keys = self.book
+        if keys is None:
+            return
+
+        for key in keys.iter_from(after):
+            if max_price is not None and key[0] > max_price:
+                return
+            if project_id is not None and ecosystem_type is not None and self.listings[key[2]][2] != ecosystem_type:
+                continue
+            yield key
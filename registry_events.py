@@ -0,0 +1,106 @@
+"""
+Fan-out of registry change events to asyncio subscribers (the /api/events feed).
+
+BlockchainMRVSystem calls listeners on whichever thread made the change;
+EventBus.publish hands each event to the subscribers' event loops with
+call_soon_threadsafe and never blocks the writer.
+
+Backpressure: every subscriber has a bounded queue. When a slow client lets
+it fill up, the oldest events are dropped and the subscriber is told how
+many it missed, so it can refetch current state over REST instead.
+
+Configuration (environment variables):
+    REGISTRY_EVENT_QUEUE_SIZE   events buffered per subscriber (default 256)
+"""
+
+import asyncio
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class EventSubscription:
+    """One subscriber's bounded event queue, bound to the loop it was created on"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, companies: Optional[Set[str]],
+                 event_types: Optional[Set[str]], queue_size: int):
+        self.loop = loop
+        self.companies = companies
+        self.event_types = event_types
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def matches(self, event: Dict) -> bool:
+        if self.event_types is not None and event['type'] not in self.event_types:
+            return False
+        return self.companies is None or not self.companies.isdisjoint(event['companies'])
+
+    def _offer(self, event: Dict):
+        """Enqueue on the subscriber's loop, dropping the oldest event when full"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Next event, or None if none arrives within timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def take_dropped(self) -> int:
+        """Events dropped since the last call"""
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class EventBus:
+    """Thread-safe publisher for asyncio subscribers"""
+
+    def __init__(self, queue_size: Optional[int] = None):
+        self.queue_size = queue_size or int(os.getenv("REGISTRY_EVENT_QUEUE_SIZE", "256"))
+        self._subscriptions: List[EventSubscription] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self,
+                  companies: Optional[Iterable[str]] = None,
+                  event_types: Optional[Iterable[str]] = None) -> EventSubscription:
+        """
+        Subscribe the running event loop to events.
+
+        Args:
+            companies: Only events affecting one of these addresses (default: all)
+            event_types: Only events of these types (default: all)
+        """
+        subscription = EventSubscription(
+            asyncio.get_running_loop(),
+            set(companies) if companies else None,
+            set(event_types) if event_types else None,
+            self.queue_size
+        )
+        with self._lock:
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription):
+        with self._lock:
+            self._subscriptions = [s for s in self._subscriptions if s is not subscription]
+
+    def publish(self, event: Dict):
+        """Deliver event to every matching subscriber; safe to call from any thread"""
+        closed = []
+        for subscription in self._subscriptions:
+            if not subscription.matches(event):
+                continue
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, event)
+            except RuntimeError:
+                # Subscriber's loop has been closed
+                closed.append(subscription)
+        for subscription in closed:
+            self.unsubscribe(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions)
@@ -0,0 +1,61 @@
+"""
+Executor layer for calling the synchronous registry from async request handlers.
+
+Blocking work (hashing, logging, WAL writes, lock waits) runs on a bounded
+thread pool so the event loop stays free. Reads and writes have separate
+concurrency limits, so a burst of slow writes cannot starve cheap reads.
+
+Configuration (environment variables):
+    REGISTRY_EXECUTOR_WORKERS    thread pool size (default 16)
+    REGISTRY_READ_CONCURRENCY    concurrent read calls (default: pool size)
+    REGISTRY_WRITE_CONCURRENCY   concurrent write calls (default 4)
+"""
+
+import asyncio
+import functools
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class RegistryExecutor:
+    """Bounded thread pool with per-class (read/write) concurrency limits"""
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 read_concurrency: Optional[int] = None,
+                 write_concurrency: Optional[int] = None):
+        self.max_workers = max_workers or int(os.getenv("REGISTRY_EXECUTOR_WORKERS", "16"))
+        self.limits = {
+            'read': read_concurrency or int(os.getenv("REGISTRY_READ_CONCURRENCY", str(self.max_workers))),
+            'write': write_concurrency or int(os.getenv("REGISTRY_WRITE_CONCURRENCY", "4")),
+        }
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="registry")
+        # asyncio semaphores belong to one event loop; keep a set per loop
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+    def _semaphore(self, kind: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphores = self._semaphores.get(loop)
+        if semaphores is None:
+            semaphores = {k: asyncio.Semaphore(limit) for k, limit in self.limits.items()}
+            self._semaphores[loop] = semaphores
+        return semaphores[kind]
+
+    async def run(self, kind: str, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run fn(*args, **kwargs) on the pool under the 'read' or 'write' limit"""
+        async with self._semaphore(kind):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+
+    async def read(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await self.run('read', fn, *args, **kwargs)
+
+    async def write(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await self.run('write', fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
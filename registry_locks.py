@@ -0,0 +1,95 @@
+"""
+Locking primitives for the shared BlockchainMRVSystem registry.
+
+Lock order, to keep multi-lock operations deadlock free:
+    snapshot gate (shared) -> registry lock -> account stripes (ascending stripe index) -> order book lock
+Account stripes are always taken together through LockStripes.hold, which
+sorts them, so an operation touching two accounts never waits in the
+opposite order of another one. The order book lock is a leaf: it is held
+only around reads and changes of the book itself.
+"""
+
+import threading
+import zlib
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List
+
+
+class LockStripes:
+    """Fixed pool of re-entrant locks; each account maps to one stripe"""
+
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def index_of(self, key: str) -> int:
+        # crc32 is stable across processes, unlike hash() on str
+        return zlib.crc32(key.encode()) % len(self._locks)
+
+    def _ordered(self, keys: Iterable[str]) -> List[threading.RLock]:
+        return [self._locks[i] for i in sorted({self.index_of(key) for key in keys})]
+
+    @contextmanager
+    def hold(self, *keys: str) -> Iterator[None]:
+        """Hold the stripes for all keys, acquired in ascending stripe order"""
+        locks = self._ordered(keys)
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+
+class SharedExclusiveLock:
+    """
+    Readers-writer lock: any number of shared holders, or one exclusive holder.
+
+    Exclusive requests take priority: once one is queued, new shared
+    acquisitions wait until it has been served, so a steady stream of
+    shared holders cannot starve it. A thread that already holds the shared
+    side may take it again without waiting, which keeps nested shared
+    sections from deadlocking against a queued exclusive request.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._shared = 0
+        self._exclusive = False
+        self._exclusive_waiting = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        depth = getattr(self._local, 'depth', 0)
+        with self._cond:
+            if not depth:
+                while self._exclusive or self._exclusive_waiting:
+                    self._cond.wait()
+            self._shared += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            with self._cond:
+                self._shared -= 1
+                if not self._shared:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        with self._cond:
+            self._exclusive_waiting += 1
+            try:
+                while self._exclusive or self._shared:
+                    self._cond.wait()
+            finally:
+                self._exclusive_waiting -= 1
+            self._exclusive = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._exclusive = False
+                self._cond.notify_all()
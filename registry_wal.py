@@ -0,0 +1,181 @@
+"""
+Durable storage for the in-memory BlockchainMRVSystem registry.
+Mutations are appended to a write-ahead log as full-record upserts; the log
+is periodically folded into a compact snapshot. Recovery loads the snapshot,
+applies newer log records on top and hands the final state back in one go,
+so indexes are rebuilt once instead of replaying each operation.
+"""
+
+import os
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+from serialization import dumps, loads
+
+SNAPSHOT_FILE = "snapshot.json"
+WAL_FILE = "wal.ndjson"
+
+
+class RegistryJournal:
+    """Write-ahead log plus snapshot for registry state"""
+
+    def __init__(self, directory: str, snapshot_interval: int = 10000, fsync: bool = False):
+        self.directory = directory
+        self.snapshot_interval = snapshot_interval
+        self.fsync = fsync
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.wal_path = os.path.join(directory, WAL_FILE)
+        self.seq = 0
+        self.records_since_snapshot = 0
+        self._lock = threading.Lock()
+        self._wal = None
+        os.makedirs(directory, exist_ok=True)
+
+    def recover(self) -> Optional[Dict]:
+        """
+        Load the registry state from the snapshot and the log.
+
+        Log records are upserts keyed by record type and id, so applying
+        them to the snapshot maps yields the latest version of every record.
+
+        Returns:
+            Dict with 'projects', 'verifications', 'credits', 'emissions'
+            and 'merkle_batches' maps, or None if nothing has been persisted yet
+        """
+        state = None
+        snapshot_seq = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'rb') as f:
+                snapshot = loads(f.read())
+            snapshot_seq = snapshot['seq']
+            state = {
+                'projects': {int(k): v for k, v in snapshot['projects'].items()},
+                'verifications': {int(k): v for k, v in snapshot['verifications'].items()},
+                'credits': {int(k): v for k, v in snapshot['credits'].items()},
+                'emissions': snapshot['emissions'],
+                'merkle_batches': {int(k): v for k, v in snapshot.get('merkle_batches', {}).items()},
+            }
+        self.seq = snapshot_seq
+
+        for seq, record_type, key, value in self._read_wal(snapshot_seq):
+            if state is None:
+                state = {'projects': {}, 'verifications': {}, 'credits': {}, 'emissions': {}, 'merkle_batches': {}}
+            state[record_type][key] = value
+            self.seq = seq
+            self.records_since_snapshot += 1
+        return state
+
+    def _read_wal(self, after_seq: int) -> Iterator[Tuple[int, str, object, object]]:
+        """
+        Yield the log records newer than after_seq.
+
+        Reading stops at the first incomplete or unparseable line, the torn
+        tail of an interrupted write. Once the good records are exhausted the
+        log is cut back to them, so the next append starts on a fresh line
+        instead of being joined onto the torn one and lost with it.
+        """
+        if not os.path.exists(self.wal_path):
+            return
+        good_offset = 0
+        with open(self.wal_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = loads(line)
+                except ValueError:
+                    break
+                good_offset += len(line)
+                if record['s'] <= after_seq:
+                    continue
+                yield record['s'], record['t'], record['k'], record['v']
+
+        if good_offset < os.path.getsize(self.wal_path):
+            print(f"⚠️ Discarding torn registry log tail after byte {good_offset}")
+            with open(self.wal_path, 'r+b') as f:
+                f.truncate(good_offset)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def append(self, record_type: str, key, value):
+        """
+        Log the new version of a record.
+
+        Args:
+            record_type: 'projects', 'verifications', 'credits' or 'emissions'
+            key: Record id (company address for emissions)
+            value: JSON-serializable record
+        """
+        with self._lock:
+            if self._wal is None:
+                self._wal = open(self.wal_path, 'ab')
+            self.seq += 1
+            self._wal.write(dumps({'s': self.seq, 't': record_type, 'k': key, 'v': value}) + b'\n')
+            self._wal.flush()
+            if self.fsync:
+                os.fsync(self._wal.fileno())
+            self.records_since_snapshot += 1
+
+    def snapshot_due(self) -> bool:
+        return self.records_since_snapshot >= self.snapshot_interval
+
+    def mark(self) -> Tuple[int, int]:
+        """
+        Position of the log at a snapshot point: (last sequence number, byte offset).
+
+        Take it while the state being snapshotted is quiescent; records
+        appended afterwards stay in the log when the snapshot is written.
+        """
+        with self._lock:
+            offset = 0
+            if self._wal is not None:
+                self._wal.flush()
+                offset = self._wal.tell()
+            elif os.path.exists(self.wal_path):
+                offset = os.path.getsize(self.wal_path)
+            self.records_since_snapshot = 0
+            return self.seq, offset
+
+    def write_snapshot(self, state: Dict, mark: Optional[Tuple[int, int]] = None):
+        """
+        Write a compact snapshot of the state at mark and drop the log records it covers.
+
+        The snapshot records the last log sequence number it covers, so a
+        crash between replacing the snapshot and compacting the log only
+        leaves records that recovery skips. Serialization runs without the
+        journal lock; only the copy of the log tail written since mark holds it.
+
+        Args:
+            state: Registry maps as of mark
+            mark: Result of mark() taken with state; defaults to the current position
+        """
+        seq, offset = mark if mark is not None else self.mark()
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(dumps(dict(state, seq=seq)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        with self._lock:
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+            tail = b''
+            if os.path.exists(self.wal_path):
+                with open(self.wal_path, 'rb') as f:
+                    f.seek(offset)
+                    tail = f.read()
+            tmp_path = self.wal_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.wal_path)
+            self._wal = open(self.wal_path, 'ab')
+
+    def close(self):
+        with self._lock:
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
@@ -4,11 +4,11 @@ Generates PDF reports and visualizations.
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from fpdf import FPDF  # fpdf2 package
+from lazy_imports import lazy_import
+
+# Plotting libraries load on first chart
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
 import os
 from datetime import datetime
 import base64
@@ -39,7 +39,8 @@ class ReportGenerator:
             if len(data) == 0:
                 return False, "No data available for the selected period."
             
-            # Create PDF
+            # Create PDF (fpdf2 is only loaded when a report is rendered)
+            from fpdf import FPDF
             pdf = FPDF()
             pdf.add_page()
             
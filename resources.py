@@ -0,0 +1,138 @@
+"""
+Process-wide registry of heavy, shareable objects.
+
+Streamlit runs every session in the same worker process, so objects that
+are expensive to build and hold no per-session state (the CrewAI agents,
+the compliance framework, the company manager) are built once per process
+here instead of once per session. Each resource is built lazily on first
+use, under its own lock, so concurrent sessions wait for a single build.
+
+A resource can have a health check. It is rerun at most every
+check_interval seconds on access; a failing check discards the object and
+the next access rebuilds it.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class _Resource:
+    def __init__(self, factory: Callable[[], Any], health_check: Optional[Callable[[Any], bool]], check_interval: float):
+        self.factory = factory
+        self.health_check = health_check
+        self.check_interval = check_interval
+        self.value = None
+        self.built = False
+        self.checked_at: Optional[float] = None
+        self.build_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.lock = threading.Lock()
+
+
+class ResourceRegistry:
+    """Lazily built, thread-safe singletons keyed by name"""
+
+    def __init__(self):
+        self._resources: Dict[str, _Resource] = {}
+
+    def register(self,
+                 name: str,
+                 factory: Callable[[], Any],
+                 health_check: Optional[Callable[[Any], bool]] = None,
+                 check_interval: float = 300.0):
+        """
+        Register a resource; nothing is built until the first get().
+
+        Args:
+            name: Resource name
+            factory: Builds the object
+            health_check: Returns False (or raises) when the object should be rebuilt
+            check_interval: Seconds between health checks
+        """
+        self._resources[name] = _Resource(factory, health_check, check_interval)
+
+    def get(self, name: str) -> Any:
+        """The shared object, built on first use (or after a failed health check)"""
+        resource = self._resources[name]
+        if resource.built and not self._check_due(resource):
+            return resource.value
+        with resource.lock:
+            if resource.built and self._check_due(resource) and not self._healthy(resource):
+                print(f"❌ Resource '{name}' failed its health check; rebuilding")
+                resource.value, resource.built = None, False
+            if not resource.built:
+                start = time.perf_counter()
+                try:
+                    resource.value = resource.factory()
+                except Exception as e:
+                    resource.error = str(e)
+                    raise
+                resource.build_seconds = time.perf_counter() - start
+                resource.checked_at = time.monotonic()
+                resource.built = True
+                resource.error = None
+            return resource.value
+
+    def warm(self, *names: str):
+        """Start building resources in the background so a later get() finds them ready"""
+        for name in names:
+            if not self._resources[name].built:
+                threading.Thread(target=self._warm_one, args=(name,), name=f"warm-{name}", daemon=True).start()
+
+    def _warm_one(self, name: str):
+        try:
+            self.get(name)
+        except Exception as e:
+            print(f"❌ Could not build resource '{name}': {e}")
+
+    def invalidate(self, name: str):
+        """Drop the shared object; the next get() rebuilds it"""
+        resource = self._resources[name]
+        with resource.lock:
+            resource.value, resource.built = None, False
+
+    def status(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                'built': resource.built,
+                'build_seconds': resource.build_seconds,
+                'error': resource.error
+            }
+            for name, resource in self._resources.items()
+        }
+
+    @staticmethod
+    def _check_due(resource: _Resource) -> bool:
+        return resource.health_check is not None and time.monotonic() - resource.checked_at >= resource.check_interval
+
+    @staticmethod
+    def _healthy(resource: _Resource) -> bool:
+        resource.checked_at = time.monotonic()
+        try:
+            return bool(resource.health_check(resource.value))
+        except Exception:
+            return False
+
+
+def _build_ai_agents():
+    from ai_agents import CarbonFootprintAgents
+    return CarbonFootprintAgents()
+
+
+def _build_compliance_framework():
+    from carbon_compliance import CarbonComplianceFramework
+    return CarbonComplianceFramework()
+
+
+def _build_company_manager():
+    # The module keeps its own singleton; share that one instead of opening a second store
+    from company_manager import company_manager
+    return company_manager
+
+
+resources = ResourceRegistry()
+# Unavailable agents (e.g. GROQ_API_KEY added later) are retried every check interval
+resources.register('ai_agents', _build_ai_agents, health_check=lambda agents: agents.available)
+resources.register('compliance_framework', _build_compliance_framework)
+resources.register('company_manager', _build_company_manager)
@@ -0,0 +1,60 @@
+"""
+Version-keyed cache of encoded API responses, plus ETag helpers.
+
+Each entry stores the registry version it was built at. A lookup with the
+current version either returns the stored body or misses; there is no
+explicit invalidation, since any change moves the version on.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+def make_etag(epoch: str, version: int) -> str:
+    # Weak: equal versions mean equal content, not byte-identical encodings
+    return f'W/"{epoch}-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches etag"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in tags:
+        return True
+    # Weak comparison: ignore the W/ prefix on either side
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == opaque for tag in tags)
+
+
+class ResponseCache:
+    """Bounded LRU of (version, encoded body) per request key"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: int) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, version: int, body: bytes):
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and current[0] > version:
+                # A newer response was stored meanwhile
+                return
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
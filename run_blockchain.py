@@ -87,7 +87,8 @@ def initialize_blockchain_data():
     print("\n🌊 Initializing blockchain with demo data...")
     
     try:
-        from blockchain_mrv import blockchain_mrv
+        from blockchain_mrv import started_registry
+        blockchain_mrv = started_registry()
         
         # Check if data already exists
         if len(blockchain_mrv.projects) > 0:
@@ -139,7 +140,8 @@ def start_blockchain_backend():
     print("\n⛓️  Starting blockchain backend...")
     
     try:
-        from blockchain_mrv import blockchain_mrv
+        from blockchain_mrv import started_registry
+        blockchain_mrv = started_registry()
         
         # Test blockchain initialization
         print("🔗 Testing blockchain connection...")
@@ -0,0 +1,141 @@
+"""
+Shared JSON serialization for API responses and on-disk persistence.
+
+Uses orjson when it is installed and falls back to the standard library
+otherwise. Both paths produce compact UTF-8 bytes, write NaN and infinity
+as null (the fallback never emits the non-standard NaN token), and handle
+datetimes, dataclasses, NumPy scalars and int dict keys alike; only orjson
+accepts datetime dict keys. Set JSON_PRETTY=1 to indent persisted files
+for debugging.
+
+Objects that are serialized in bulk get a precompiled encoder (see
+compile_encoder), which reads attributes with one attrgetter call instead
+of walking the object through dataclasses.asdict or FastAPI's encoder.
+"""
+
+import dataclasses
+import json
+import math
+import os
+from datetime import date, datetime
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Optional
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+PRETTY = os.getenv("JSON_PRETTY", "").lower() in ("1", "true", "yes")
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for values neither encoder handles natively"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return _finite(dataclasses.asdict(obj))
+    if hasattr(obj, 'item'):
+        # NumPy scalars
+        value = obj.item()
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+    return str(obj)
+
+
+def _finite(obj: Any) -> Any:
+    """Copy of obj with NaN and infinite floats replaced by None, as orjson writes them"""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+if ORJSON_AVAILABLE:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(obj: Any, pretty: bool = False) -> bytes:
+        """Serialize obj to compact JSON bytes (indented when pretty)"""
+        return orjson.dumps(obj, default=_default, option=_OPTIONS | (orjson.OPT_INDENT_2 if pretty else 0))
+
+    def loads(data) -> Any:
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any, pretty: bool = False) -> bytes:
+        """Serialize obj to compact JSON bytes (indented when pretty)"""
+        layout = {'indent': 2} if pretty else {'separators': (',', ':')}
+        try:
+            return json.dumps(obj, default=_default, allow_nan=False, ensure_ascii=False, **layout).encode()
+        except ValueError:
+            # Only walk the object when it actually holds NaN or infinity
+            return json.dumps(_finite(obj), default=_default, allow_nan=False, ensure_ascii=False, **layout).encode()
+
+    def loads(data) -> Any:
+        return json.loads(data)
+
+
+def dump_file(obj: Any, path: str, pretty: Optional[bool] = None):
+    """Write obj to path as JSON; compact unless pretty (default: JSON_PRETTY)"""
+    with open(path, 'wb') as f:
+        f.write(dumps(obj, pretty=PRETTY if pretty is None else pretty))
+
+
+def load_file(path: str) -> Any:
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def compile_encoder(fields: Dict[str, str], datetime_keys: Iterable[str] = ()) -> Callable[[Any], Dict]:
+    """
+    Build an object -> dict encoder.
+
+    Args:
+        fields: Output key -> attribute name, in output order
+        datetime_keys: Output keys holding datetimes, emitted as ISO strings
+
+    Returns:
+        Function that encodes one object
+    """
+    keys = tuple(fields)
+    attributes = list(fields.values())
+    getter = attrgetter(*attributes) if len(attributes) > 1 else (lambda obj: (getattr(obj, attributes[0]),))
+    iso_positions = [keys.index(key) for key in datetime_keys]
+
+    if not iso_positions:
+        return lambda obj: dict(zip(keys, getter(obj)))
+
+    def encode(obj) -> Dict:
+        values = list(getter(obj))
+        for i in iso_positions:
+            if values[i] is not None:
+                values[i] = values[i].isoformat()
+        return dict(zip(keys, values))
+    return encode
+
+
+def dataclass_encoder(cls, rename: Optional[Dict[str, str]] = None, exclude: Iterable[str] = ()) -> Callable[[Any], Dict]:
+    """
+    Compile an encoder for a dataclass's fields.
+
+    Args:
+        cls: Dataclass type
+        rename: Attribute name -> output key, for keys that differ
+        exclude: Attribute names to leave out
+    """
+    rename = rename or {}
+    exclude = set(exclude)
+    fields = {}
+    datetime_keys = []
+    for field in dataclasses.fields(cls):
+        if field.name in exclude:
+            continue
+        key = rename.get(field.name, field.name)
+        fields[key] = field.name
+        if field.type in (datetime, date):
+            datetime_keys.append(key)
+    return compile_encoder(fields, datetime_keys)
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for the running carbon balance counters
+Checks that balances follow issue, split and transfer, and that a corrupted
+counter is reported by check_balance_consistency and repaired on request
+"""
+
+import shutil
+import tempfile
+
+from test_order_book import issue, make_registry
+
+
+def test_balances_follow_trades():
+    """Counters match the ledger after issuing, a partial purchase and a full one"""
+    print("🧪 Testing running carbon balances...")
+    data_dir = tempfile.mkdtemp()
+    registry = None
+    try:
+        registry = make_registry(data_dir)
+        issue(registry, "seller_a", 10.0, 20.0)
+        issue(registry, "seller_a", 5.0, 30.0)
+        registry.purchase_carbon_credits("buyer_b", "seller_a", 12.0, 30.0)
+
+        assert registry.get_company_carbon_balance("seller_a") == 3.0
+        assert registry.get_company_carbon_balance("buyer_b") == 12.0
+        assert registry.check_balance_consistency() == {}
+        print("   ✅ Seller 3.0 and buyer 12.0 tonnes, matching the ledger")
+    finally:
+        if registry is not None:
+            registry.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def test_corrupted_balance_reported_and_repaired():
+    """A counter that drifts from the ledger is reported, left alone without repair, and fixed with it"""
+    print("🧪 Testing balance consistency check and repair...")
+    data_dir = tempfile.mkdtemp()
+    registry = None
+    try:
+        registry = make_registry(data_dir)
+        issue(registry, "seller_a", 10.0, 20.0)
+        issue(registry, "seller_c", 4.0, 20.0)
+        registry.active_balances["seller_a"] += 2.5
+        registry.active_balances["ghost"] = 1.0
+
+        expected = {"seller_a": (12.5, 10.0), "ghost": (1.0, 0)}
+        assert registry.check_balance_consistency() == expected
+        assert registry.get_company_carbon_balance("seller_a") == 12.5
+
+        assert registry.check_balance_consistency(repair=True) == expected
+        assert registry.get_company_carbon_balance("seller_a") == 10.0
+        assert registry.get_company_carbon_balance("ghost") == 0
+        assert registry.get_company_carbon_balance("seller_c") == 4.0
+        assert registry.check_balance_consistency() == {}
+        print("   ✅ Both mismatches reported, then repaired from the ledger")
+    finally:
+        if registry is not None:
+            registry.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_balances_follow_trades()
+    test_corrupted_balance_reported_and_repaired()
+    print("🎉 Carbon balance tests passed")
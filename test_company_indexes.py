@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for the CompanyManager lookup indexes
+Checks that email_index and address_index match the companies map after
+register, update and delete, on both the SQLite and JSON backends
+"""
+
+import shutil
+import tempfile
+
+from company_manager import CompanyManager
+
+BACKENDS = ('sqlite', 'json')
+
+
+def expected_indexes(manager):
+    """The email and address indexes rebuilt from scratch from manager.companies"""
+    emails = {manager._email_key(c['email']): company_id for company_id, c in manager.companies.items()}
+    addresses = {c['blockchain_address']: company_id for company_id, c in manager.companies.items()
+                 if c.get('blockchain_address')}
+    return emails, addresses
+
+
+def assert_consistent(manager):
+    """Live indexes equal the rebuilt ones, and a fresh manager on the same data agrees"""
+    emails, addresses = expected_indexes(manager)
+    assert manager.email_index == emails, manager.email_index
+    assert manager.address_index == addresses, manager.address_index
+    reloaded = CompanyManager(manager.data_dir, backend=manager.backend)
+    assert (reloaded.email_index, reloaded.address_index) == (emails, addresses)
+
+
+def register(manager, name, email):
+    return manager.register_company(name, email, "Manufacturing", "Pune", "Small", "Ravi", "", "")
+
+
+def test_register_indexes_company():
+    """A registered company is found by email (any spelling) and by address"""
+    for backend in BACKENDS:
+        print(f"🧪 Testing indexes after register ({backend})...")
+        data_dir = tempfile.mkdtemp()
+        try:
+            manager = CompanyManager(data_dir, backend=backend)
+            first = register(manager, "Alpha Steel", "ops@alpha.com")
+            second = register(manager, "Beta Cement", "Ops@Beta.com")
+            assert_consistent(manager)
+            assert manager.get_company_by_email(" OPS@beta.com")['company_id'] == second
+            address = manager.companies[first]['blockchain_address']
+            assert manager.get_company_by_blockchain_address(address)['company_id'] == first
+            print("   ✅ Both companies indexed by email and address")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def test_update_moves_index_entries():
+    """Changing email or address drops the old keys; a rejected update changes nothing"""
+    for backend in BACKENDS:
+        print(f"🧪 Testing indexes after update ({backend})...")
+        data_dir = tempfile.mkdtemp()
+        try:
+            manager = CompanyManager(data_dir, backend=backend)
+            first = register(manager, "Alpha Steel", "ops@alpha.com")
+            second = register(manager, "Beta Cement", "ops@beta.com")
+            old_address = manager.companies[first]['blockchain_address']
+
+            manager.update_company(first, email="carbon@alpha.com", blockchain_address="0x" + "a" * 40)
+            assert_consistent(manager)
+            assert manager.get_company_by_email("ops@alpha.com") is None
+            assert manager.get_company_by_blockchain_address(old_address) is None
+            assert manager.get_company_by_email("CARBON@alpha.com")['company_id'] == first
+            assert manager.get_company_by_blockchain_address("0x" + "a" * 40)['company_id'] == first
+
+            before = (dict(manager.email_index), dict(manager.address_index))
+            try:
+                manager.update_company(second, email=" Carbon@Alpha.com")
+                raise AssertionError("updated to an email that is already taken")
+            except ValueError:
+                pass
+            assert (manager.email_index, manager.address_index) == before
+            assert_consistent(manager)
+
+            # Re-saving the same email under another spelling keeps one entry
+            manager.update_company(second, email="OPS@beta.com", company_name="Beta Cement Ltd")
+            assert_consistent(manager)
+            assert len(manager.email_index) == 2
+            print("   ✅ Old keys removed, new keys indexed, rejected update left indexes alone")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def test_delete_unindexes_company():
+    """A deleted company is gone from both indexes; its email can be registered again"""
+    for backend in BACKENDS:
+        print(f"🧪 Testing indexes after delete ({backend})...")
+        data_dir = tempfile.mkdtemp()
+        try:
+            manager = CompanyManager(data_dir, backend=backend)
+            first = register(manager, "Alpha Steel", "ops@alpha.com")
+            second = register(manager, "Beta Cement", "ops@beta.com")
+            address = manager.companies[first]['blockchain_address']
+
+            assert manager.delete_company(first)
+            assert not manager.delete_company(first)
+            assert_consistent(manager)
+            assert manager.get_company_by_email("ops@alpha.com") is None
+            assert manager.get_company_by_blockchain_address(address) is None
+            assert manager.get_company_by_email("ops@beta.com")['company_id'] == second
+
+            again = register(manager, "Alpha Steel", "OPS@alpha.com")
+            assert again != first
+            assert_consistent(manager)
+            print("   ✅ Deleted company unindexed and its email reusable")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_register_indexes_company()
+    test_update_moves_index_entries()
+    test_delete_unindexes_company()
+    print("🎉 Company index tests passed")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test script for the SQLite company store
+Checks the JSON tree migration, credit and emissions round trips, and that
+the store and CompanyManager agree on which emails are the same
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from company_manager import CompanyManager
+from company_store import DB_FILENAME, SQLiteCompanyStore, SQLiteEmissionsStore, migrate_json_tree
+from test_emissions_store import make_record
+
+
+def company(company_id, email):
+    return {
+        'company_id': company_id, 'company_name': f"Company {company_id}", 'email': email,
+        'industry': 'Manufacturing', 'location': 'Chennai', 'size': 'Small',
+        'contact_person': 'Asha', 'phone': '', 'website': '',
+        'registration_date': f"2025-01-0{company_id[-1]}T00:00:00", 'initial_carbon_credits': 0.0,
+        'total_emissions': 3.0, 'is_active': True, 'blockchain_address': f"0x{company_id[-1] * 40}",
+        'verification_status': 'pending', 'carbon_credits': 12.5, 'sector_code': 'C24'
+    }
+
+
+def write_json_tree(data_dir, companies):
+    """companies.json plus a company_<id>/ directory with emissions and credits for each company"""
+    with open(os.path.join(data_dir, "companies.json"), 'w') as f:
+        json.dump({c['company_id']: c for c in companies}, f)
+    for c in companies:
+        company_dir = os.path.join(data_dir, f"company_{c['company_id']}")
+        os.makedirs(company_dir)
+        with open(os.path.join(company_dir, "emissions.json"), 'w') as f:
+            json.dump([make_record('2025-01-01', 1.0), make_record('2025-01-02', 2.0)], f)
+        with open(os.path.join(company_dir, "carbon_credits.json"), 'w') as f:
+            json.dump({'credits_earned': 12.5, 'credits_purchased': 0.0, 'credits_used': 2.5,
+                       'credits_available': 10.0,
+                       'transactions': [{'type': 'earned', 'amount': 12.5, 'reason': 'audit', 'date': '2025-01-03'},
+                                        {'type': 'used', 'amount': 2.5, 'reason': 'offset', 'date': '2025-01-04'}]}, f)
+
+
+def table_counts(store):
+    conn = store.connection()
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ('companies', 'emissions', 'credit_transactions')}
+
+
+def test_migration_round_trip():
+    """Migrating twice imports once; companies, emissions and credits read back as written"""
+    print("🧪 Testing JSON tree migration...")
+    data_dir = tempfile.mkdtemp()
+    try:
+        companies = [company('c1', 'one@example.com'), company('c2', 'two@example.com')]
+        write_json_tree(data_dir, companies)
+        store = SQLiteCompanyStore(os.path.join(data_dir, DB_FILENAME))
+
+        counts = migrate_json_tree(data_dir, store)
+        assert counts == {'companies': 2, 'emissions': 4, 'transactions': 4, 'skipped': 0}, counts
+        before = table_counts(store)
+        assert migrate_json_tree(data_dir, store) == {'companies': 0, 'emissions': 0, 'transactions': 0, 'skipped': 0}
+        assert table_counts(store) == before
+
+        assert store.get_company('c1') == companies[0]
+        assert store.get_company_by_blockchain_address('0x' + '2' * 40)['company_id'] == 'c2'
+        with open(os.path.join(data_dir, "company_c1", "carbon_credits.json"), 'r') as f:
+            assert store.get_credits('c1') == json.load(f)
+        records = SQLiteEmissionsStore(store, data_dir).read_records('c1')
+        assert records == [make_record('2025-01-01', 1.0), make_record('2025-01-02', 2.0)]
+
+        # CompanyManager on the same tree does not import it again
+        manager = CompanyManager(data_dir)
+        assert sorted(manager.companies) == ['c1', 'c2'] and table_counts(store) == before
+        print("   ✅ Imported once; companies, emissions and credits unchanged")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def test_duplicate_emails_skipped():
+    """A company whose email matches an earlier one once normalized is skipped and counted"""
+    print("🧪 Testing migration of duplicate emails...")
+    data_dir = tempfile.mkdtemp()
+    try:
+        write_json_tree(data_dir, [company('c1', 'Ops@Example.com'), company('c2', '  ops@example.COM ')])
+        store = SQLiteCompanyStore(os.path.join(data_dir, DB_FILENAME))
+        counts = migrate_json_tree(data_dir, store)
+        assert counts['companies'] == 1 and counts['skipped'] == 1, counts
+        assert table_counts(store) == {'companies': 1, 'emissions': 2, 'credit_transactions': 2}
+        assert store.get_company_by_email('OPS@example.com')['company_id'] == 'c1'
+        print("   ✅ Duplicate skipped and reported, without its emissions or credits")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def test_email_lookup_matches_manager():
+    """Emails differing in case (ASCII or not) or surrounding spaces are one email everywhere"""
+    print("🧪 Testing email normalization in the store and the manager...")
+    data_dir = tempfile.mkdtemp()
+    try:
+        manager = CompanyManager(data_dir)
+        company_id = manager.register_company("Straße GmbH", "José@Straße.de", "Manufacturing", "Berlin", "Small",
+                                              "Jo", "", "")
+        for email in (" josé@strasse.de ", "JOSÉ@STRASSE.DE"):
+            assert manager.get_company_by_email(email)['company_id'] == company_id
+            assert manager.db.get_company_by_email(email)['company_id'] == company_id
+            assert manager._email_key(email) == manager._email_key("José@Straße.de")
+        try:
+            manager.register_company("Other", " JOSÉ@straße.de", "Retail", "Pune", "Small", "Ana", "", "")
+            raise AssertionError("registered an email that is already taken")
+        except ValueError:
+            pass
+
+        # A fresh manager finds it through the database, not its warm index
+        assert CompanyManager(data_dir).db.get_company_by_email("josé@STRASSE.de")['company_id'] == company_id
+        print("   ✅ Store and manager agree on every spelling")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def test_existing_database_upgraded():
+    """A database from before email_key gets the column filled in and the new unique index"""
+    print("🧪 Testing the email_key upgrade of an existing database...")
+    data_dir = tempfile.mkdtemp()
+    try:
+        db_path = os.path.join(data_dir, DB_FILENAME)
+        conn = sqlite3.connect(db_path)
+        conn.executescript("""
+            CREATE TABLE companies (company_id TEXT PRIMARY KEY, company_name TEXT NOT NULL, email TEXT NOT NULL,
+                industry TEXT, location TEXT, size TEXT, contact_person TEXT, phone TEXT, website TEXT,
+                registration_date TEXT, initial_carbon_credits REAL DEFAULT 0, total_emissions REAL DEFAULT 0,
+                is_active INTEGER DEFAULT 1, blockchain_address TEXT, verification_status TEXT,
+                carbon_credits REAL DEFAULT 0, extra TEXT);
+            CREATE UNIQUE INDEX idx_companies_email ON companies(email COLLATE NOCASE);
+            INSERT INTO companies (company_id, company_name, email) VALUES ('c1', 'Old', ' Old@Example.com');
+        """)
+        conn.close()
+
+        store = SQLiteCompanyStore(db_path)
+        assert store.get_company_by_email('old@example.COM')['company_id'] == 'c1'
+        try:
+            store.insert_company(company('c2', 'OLD@example.com  '))
+            raise AssertionError("inserted an email that is already taken")
+        except ValueError:
+            pass
+        indexes = {row[1] for row in store.connection().execute("PRAGMA index_list(companies)")}
+        assert 'idx_companies_email_key' in indexes and 'idx_companies_email' not in indexes
+        print("   ✅ Existing rows keyed and the old index replaced")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_migration_round_trip()
+    test_duplicate_emails_skipped()
+    test_email_lookup_matches_manager()
+    test_existing_database_upgraded()
+    print("🎉 Company store tests passed")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script for chunked CSV ingestion
+Checks validation, factor filling and a file that is malformed part way through
+"""
+
+import io
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+import csv_ingest
+import data_handler
+from csv_ingest import ingest_csv
+from data_handler import DataHandler
+from test_emissions_journal import use_data_dir
+
+HEADER = "date,scope,category,activity,quantity,unit,emission_factor\n"
+
+
+def test_validation_and_factors():
+    """Bad rows are rejected with a reason; missing factors come from the factor table"""
+    print("🧪 Testing CSV validation and factor filling...")
+    csv = io.StringIO(
+        HEADER
+        + "2025-01-01,Scope 2,Electricity,India Grid,100,,\n"      # factor and unit filled
+        + "2025-01-02,Scope 1,Stationary Combustion,Diesel,abc,liter,2.68787\n"  # invalid quantity
+        + "2025-01-03,Scope 1,Custom,Widget,10,kg,1.5\n"           # own factor kept
+        + "not a date,Scope 1,Custom,Widget,10,kg,\n"              # no factor, bad date
+        + "2025-01-05,Scope 2,Electricity,Japan Grid,10,kWh,\n"
+    )
+    stored = []
+    report = ingest_csv(csv, stored.append, chunk_rows=2)
+    assert (report.rows_read, report.rows_accepted, report.rows_rejected, report.chunks) == (5, 3, 2, 3)
+    assert report.factors_filled == 2 and report.error is None
+
+    rows = pd.concat(stored, ignore_index=True)
+    assert [round(value, 6) for value in rows['emissions_kgCO2e']] == [82.0, 15.0, 4.7]
+    assert list(rows['unit']) == ['kWh', 'kg', 'kWh']
+    assert round(report.emissions_kgCO2e, 6) == 101.7
+    rejected = report.rejected_frame()
+    assert list(rejected['row']) == [2, 4]
+    assert list(rejected['reason']) == ['invalid quantity', 'no emission factor for category, activity and unit']
+    print("   ✅ 3 rows stored, 2 rejected with reasons")
+
+
+def test_partial_failure_reported():
+    """Chunks stored before a malformed line stay stored and are reported, not lost"""
+    print("🧪 Testing a CSV malformed part way through...")
+    saved = (data_handler.EMISSIONS_FILE, data_handler.COMPANY_INFO_FILE, data_handler.EMISSIONS_JOURNAL_FILE)
+    saved_chunk_rows = csv_ingest.INGEST_CHUNK_ROWS
+    data_dir = tempfile.mkdtemp()
+    try:
+        use_data_dir(data_dir)
+        csv_ingest.INGEST_CHUNK_ROWS = 2
+        path = os.path.join(data_dir, "upload.csv")
+        with open(path, 'w') as f:
+            f.write(HEADER)
+            for day in range(1, 5):
+                f.write(f"2025-03-0{day},Scope 2,Electricity,India Grid,10,kWh,0.82\n")
+            f.write("2025-03-05,Scope 2,\"Electricity,India Grid,10,kWh,0.82\n")
+            f.write("2025-03-06,Scope 2,Electricity,India Grid,10,kWh,0.82\n")
+
+        stored = []
+        report = ingest_csv(path, stored.append)
+        assert report.rows_accepted == 4 and report.error and "after row 4" in report.error
+        assert round(report.emissions_kgCO2e, 6) == 32.8
+
+        handler = DataHandler()
+        success, message = handler.import_csv(path)
+        assert success and message.startswith("Partially imported 4 entries"), message
+        assert len(handler.emissions_data) == 4
+
+        # What was reported as imported is what a restart recovers
+        assert len(DataHandler().emissions_data) == 4
+        print("   ✅ 4 rows kept and reported after the parse error")
+    finally:
+        csv_ingest.INGEST_CHUNK_ROWS = saved_chunk_rows
+        data_handler.EMISSIONS_FILE, data_handler.COMPANY_INFO_FILE, data_handler.EMISSIONS_JOURNAL_FILE = saved
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_validation_and_factors()
+    test_partial_failure_reported()
+    print("🎉 CSV ingest tests passed")
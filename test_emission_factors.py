@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled emission factor table
+Checks vectorized lookups and that resolving factors never changes a stored unit
+"""
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from emission_factors import EMISSION_FACTORS, FactorTable, resolve_factors
+
+
+def test_lookup_matches_dictionary():
+    """Every (category, activity) pair resolves to its own entry; unknown pairs to NaN"""
+    print("🧪 Testing FactorTable lookups...")
+    table = FactorTable()
+    pairs = [(c, a) for c, activities in EMISSION_FACTORS.items() for a in activities]
+    pairs += [("Electricity", "Diesel"), ("Unknown", "India Grid"), ("Unknown", "Unknown")]
+    factors, units = table.lookup([c for c, _ in pairs], [a for _, a in pairs])
+
+    known = len(pairs) - 3
+    for (category, activity), factor, unit in zip(pairs[:known], factors[:known], units[:known]):
+        assert factor == EMISSION_FACTORS[category][activity]["factor"]
+        assert unit == EMISSION_FACTORS[category][activity]["unit"]
+    assert np.isnan(factors[known:]).all() and list(units[known:]) == [None] * 3
+    # The same activity under two categories keeps both factors apart
+    diesel, _ = table.lookup(["Stationary Combustion", "Mobile Combustion"], ["Diesel", "Diesel"])
+    assert list(diesel) == [2.68787, 2.70553]
+    print(f"   ✅ {known} known pairs resolved, unknown pairs left blank")
+
+
+def test_resolve_keeps_units():
+    """Blank units are filled; a stored unit is kept, and a different one keeps its own factor"""
+    print("🧪 Testing resolve_factors unit handling...")
+    df = pd.DataFrame({
+        'category': ['Electricity', 'Electricity', 'Electricity', 'Custom'],
+        'activity': ['India Grid', 'India Grid', 'India Grid', 'Widget'],
+        'quantity': [10.0, 10.0, 2.0, 4.0],
+        'unit': [None, 'KWH', 'MWh', 'kg'],
+        'emission_factor': [np.nan, 0.5, 820.0, 1.5],
+        'emissions_kgCO2e': [np.nan, 5.0, 1640.0, 6.0],
+    })
+
+    filled = resolve_factors(df)
+    assert list(filled['unit']) == ['kWh', 'KWH', 'MWh', 'kg']
+    assert list(filled['emission_factor']) == [0.82, 0.5, 820.0, 1.5]
+    assert list(filled['emissions_kgCO2e']) == [8.2, 5.0, 1640.0, 6.0]
+
+    recalculated = resolve_factors(df, overwrite=True)
+    assert list(recalculated['unit']) == ['kWh', 'KWH', 'MWh', 'kg']
+    assert list(recalculated['emission_factor']) == [0.82, 0.82, 820.0, 1.5]
+    assert list(recalculated['emissions_kgCO2e']) == [8.2, 8.2, 1640.0, 6.0]
+    assert list(recalculated['factor_found']) == [True, True, False, False]
+    print("   ✅ Units kept; table factor only applied in the table's unit")
+
+
+def test_import_defers_numpy_and_pandas():
+    """Importing emission_factors and using the factor dicts loads neither NumPy nor pandas"""
+    print("🧪 Testing emission_factors import cost...")
+    code = (
+        "import sys, emission_factors as ef; "
+        "ef.get_emission_factor('Electricity', 'India Grid'); "
+        "loaded = lambda: [type(sys.modules.get(m)).__name__ for m in ('numpy', 'pandas')]; "
+        "before = loaded(); ef.get_factor_table(); "
+        "print(before, loaded())"
+    )
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.splitlines()[-1] == "['_LazyModule', '_LazyModule'] ['module', 'module']", result.stdout
+    print("   ✅ NumPy and pandas loaded only by the factor table")
+
+
+if __name__ == "__main__":
+    test_lookup_matches_dictionary()
+    test_resolve_keeps_units()
+    test_import_defers_numpy_and_pandas()
+    print("🎉 Emission factor tests passed")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for the memory-mapped columnar emissions store
+Checks that builds cover the snapshot and the journal, and refresh on change,
+and that rows are selected from the columns and read back by row number
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+import emissions_mmap
+from emissions_mmap import iter_json_array, open_current, read_rows
+
+
+def record(date, scope, emissions):
+    return {'date': date, 'scope': scope, 'category': 'Electricity', 'activity': 'India Grid',
+            'quantity': emissions, 'emission_factor': 1.0, 'emissions_kgCO2e': emissions}
+
+
+def write_store(data_dir, snapshot, journal):
+    """Write a DataHandler-style snapshot and journal"""
+    with open(os.path.join(data_dir, "emissions.json"), 'w') as f:
+        json.dump(snapshot, f)
+    with open(os.path.join(data_dir, "emissions.journal"), 'w') as f:
+        f.write(json.dumps({'snapshot_rows': len(snapshot)}) + "\n")
+        for row in journal:
+            f.write(json.dumps(row) + "\n")
+
+
+def test_build_from_snapshot_and_journal():
+    """A build after a compaction holds the snapshot rows as well as the journal rows"""
+    print("🧪 Testing columnar build from snapshot + journal...")
+    data_dir = tempfile.mkdtemp()
+    try:
+        write_store(data_dir,
+                    [record('2025-01-05', 'Scope 1', 100.0), record('2025-01-20', 'Scope 2', 50.0)],
+                    [record('2025-02-03', 'Scope 2', 25.0)])
+        source = os.path.join(data_dir, "emissions.journal")
+        emissions = open_current(source, os.path.join(data_dir, "emissions.bcem"))
+        assert len(emissions) == 3
+        assert emissions.total() == 175.0
+        assert emissions.sum_by('scope') == {'Scope 1': 100.0, 'Scope 2': 75.0}
+        assert emissions.monthly_totals() == {'2025-01': 150.0, '2025-02': 25.0}
+        print("   ✅ Snapshot and journal rows both present")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def test_stale_and_torn_journal():
+    """Journals already folded into the snapshot, and torn tails, are not counted"""
+    print("🧪 Testing columnar build with stale and torn journals...")
+    data_dir = tempfile.mkdtemp()
+    try:
+        snapshot = [record('2025-01-05', 'Scope 1', 100.0)]
+        write_store(data_dir, snapshot, [record('2025-01-05', 'Scope 1', 100.0)])
+        # Header says the journal was started on an empty snapshot: already compacted
+        with open(os.path.join(data_dir, "emissions.journal"), 'w') as f:
+            f.write('{"snapshot_rows": 0}\n' + json.dumps(snapshot[0]) + "\n")
+        source = os.path.join(data_dir, "emissions.json")
+        path = os.path.join(data_dir, "emissions.bcem")
+        assert open_current(source, path).total() == 100.0
+
+        write_store(data_dir, snapshot, [record('2025-01-06', 'Scope 1', 5.0)])
+        with open(os.path.join(data_dir, "emissions.journal"), 'a') as f:
+            f.write('{"date": "2025-01-0')
+        emissions = open_current(source, path)
+        assert len(emissions) == 2 and emissions.total() == 105.0
+        print("   ✅ Stale journal ignored, torn tail skipped, file rebuilt on change")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def test_streamed_snapshot_matches_json_load():
+    """The incremental snapshot decoder yields exactly what json.load returns"""
+    print("🧪 Testing streamed JSON array decoding...")
+    data_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(data_dir, "emissions.json")
+        items = [record('2025-01-05', 'Scope 1', 123456.789), {'notes': 'a, [b] {"c"}', 'n': [1, 2.5e-3, None]},
+                 12345678, "text", [], {}]
+        with open(path, 'w') as f:
+            json.dump(items, f, indent=2)
+        for read_chars in (1, 3, 7, 1 << 20):
+            assert list(iter_json_array(path, read_chars)) == items, read_chars
+
+        with open(path, 'w') as f:
+            f.write(' [ ]\n')
+        assert list(iter_json_array(path, 2)) == []
+        with open(path, 'w') as f:
+            f.write('[{"a": 1}, {"a": 2}')
+        try:
+            list(iter_json_array(path, 4))
+            raise AssertionError("accepted an unterminated array")
+        except ValueError:
+            pass
+        print("   ✅ Same items at every read size; unterminated arrays rejected")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def test_rows_selected_from_columns():
+    """Top-N and threshold rows come from the mapped columns and read back in full"""
+    print("🧪 Testing column-based row selection...")
+    data_dir = tempfile.mkdtemp()
+    saved_chunk_rows = emissions_mmap.CHUNK_ROWS
+    try:
+        values = [5.0, 50.0, 20.0, 50.0, float('nan'), 1.0, 50.0, 30.0]
+        rows = [dict(record('2025-01-0%d' % (i + 1), 'Scope 1', value), notes=f"row {i}") for i, value in enumerate(values)]
+        rows[2]['emission_factor'] = 150.0
+        write_store(data_dir, rows[:5], rows[5:])
+        source = os.path.join(data_dir, "emissions.json")
+        emissions = open_current(source, os.path.join(data_dir, "emissions.bcem"))
+
+        # Small chunks so selections are merged across chunks
+        emissions_mmap.CHUNK_ROWS = 3
+        assert emissions.top_rows(3) == [1, 3, 6]
+        assert emissions.top_rows(5) == [1, 3, 6, 7, 2]
+        assert emissions.top_rows(20) == [1, 3, 6, 7, 2, 0, 5]
+        assert emissions.rows_above('emissions_kgCO2e', 25.0) == [1, 3, 6, 7]
+        assert emissions.rows_above('emission_factor', 100) == [2]
+
+        found = read_rows(source, [6, 2, 1])
+        assert {row: found[row]['notes'] for row in found} == {1: "row 1", 2: "row 2", 6: "row 6"}
+        assert read_rows(source, []) == {}
+        print("   ✅ Largest rows first, ties by row, journal rows read back")
+    finally:
+        emissions_mmap.CHUNK_ROWS = saved_chunk_rows
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_build_from_snapshot_and_journal()
+    test_stale_and_torn_journal()
+    test_streamed_snapshot_matches_json_load()
+    test_rows_selected_from_columns()
+    print("🎉 Columnar emissions tests passed")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script for per-company emissions storage
+Checks how the backend is selected, that appends keep existing rows, that
+Parquet part files are compacted, and that the data version follows writes
+made by another process
+"""
+
+import os
+import shutil
+import tempfile
+
+from company_manager import CompanyManager
+from company_store import SQLiteEmissionsStore
+from emissions_store import (COMPACT_PART_FILES, PYARROW_AVAILABLE, EmissionsStore, JsonEmissionsStore,
+                             ParquetEmissionsStore)
+
+
+def make_record(date, quantity):
+    return {
+        'date': date, 'business_unit': 'Operations', 'project': 'Quick Entry',
+        'scope': 'Scope 1', 'category': 'General', 'activity': 'Quick Entry',
+        'country': 'India', 'facility': 'HQ', 'responsible_person': '',
+        'quantity': quantity, 'unit': 'kg', 'emission_factor': 1.0,
+        'emissions_kgCO2e': quantity, 'data_quality': 'Medium',
+        'verification_status': 'Unverified', 'notes': ''
+    }
+
+
+def test_backend_selection():
+    """SQLite by default; EMISSIONS_STORE_BACKEND or emissions_backend pick another store"""
+    print("🧪 Testing emissions store selection...")
+    data_dir = tempfile.mkdtemp()
+    saved_env = os.environ.pop("EMISSIONS_STORE_BACKEND", None)
+    try:
+        assert isinstance(CompanyManager(data_dir).emissions_store, SQLiteEmissionsStore)
+        assert isinstance(CompanyManager(data_dir, emissions_backend='json').emissions_store, JsonEmissionsStore)
+        if PYARROW_AVAILABLE:
+            os.environ["EMISSIONS_STORE_BACKEND"] = "parquet"
+            assert isinstance(CompanyManager(data_dir).emissions_store, ParquetEmissionsStore)
+        print("   ✅ Backends selected as documented")
+    finally:
+        os.environ.pop("EMISSIONS_STORE_BACKEND", None)
+        if saved_env is not None:
+            os.environ["EMISSIONS_STORE_BACKEND"] = saved_env
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def test_append_keeps_rows():
+    """append_company_emissions_data adds rows on every backend"""
+    print("🧪 Testing emissions appends...")
+    backends = ['sqlite', 'json'] + (['parquet'] if PYARROW_AVAILABLE else [])
+    for backend in backends:
+        data_dir = tempfile.mkdtemp()
+        try:
+            manager = CompanyManager(data_dir, emissions_backend=backend)
+            manager.emissions_store.initialize('c1')
+            manager.save_company_emissions_data('c1', [make_record('2025-01-01', 1.0)])
+            manager.append_company_emissions_data('c1', [make_record('2025-02-01', 2.0)])
+            manager.append_company_emissions_data('c1', [make_record('2025-03-01', 3.0)])
+            frame = manager.emissions_store.read_frame('c1')
+            assert sorted(frame['quantity']) == [1.0, 2.0, 3.0], (backend, frame)
+            print(f"   ✅ {backend}: 3 rows after 2 appends")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def test_parquet_appends_compacted():
+    """Many small appends leave a bounded number of part files and every row in order"""
+    if not PYARROW_AVAILABLE:
+        print("⚠️ pyarrow not installed, skipping Parquet compaction test")
+        return
+    print("🧪 Testing Parquet part file compaction...")
+    data_dir = tempfile.mkdtemp()
+    try:
+        store = ParquetEmissionsStore(data_dir)
+        store.initialize('c1')
+        versions = {store.version('c1')}
+        for day in range(1, 21):
+            store.append_records('c1', [make_record(f'2025-01-{day:02d}', float(day))])
+            versions.add(store.version('c1'))
+        store.append_records('c1', [make_record('2025-02-01', 21.0)])
+
+        partition = os.path.join(data_dir, "company_c1", "emissions", "year=2025", "month=1")
+        parts = [name for name in os.listdir(partition) if name.endswith('.parquet')]
+        assert len(parts) < COMPACT_PART_FILES, parts
+        assert not [name for name in os.listdir(os.path.dirname(partition)) if name.startswith('.')]
+        assert [record['quantity'] for record in store.read_records('c1')] == [float(day) for day in range(1, 22)]
+        assert len(versions) == 21 and store.version('c1') == store.version('c1')
+        print(f"   ✅ 20 appends kept in {len(parts)} part files, a new version each time")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    try:
+        EmissionsStore(data_dir)
+        raise AssertionError("instantiated the abstract base store")
+    except TypeError:
+        pass
+
+
+def test_version_follows_other_writers():
+    """A write through one manager changes the version another manager reads"""
+    print("🧪 Testing emissions versions across managers...")
+    backends = ['sqlite', 'json'] + (['parquet'] if PYARROW_AVAILABLE else [])
+    for backend in backends:
+        data_dir = tempfile.mkdtemp()
+        try:
+            writer = CompanyManager(data_dir, emissions_backend=backend)
+            reader = CompanyManager(data_dir, emissions_backend=backend)
+            writer.emissions_store.initialize('c1')
+            versions = [reader.get_emissions_version('c1')]
+            writer.save_company_emissions_data('c1', [make_record('2025-01-01', 1.0)])
+            versions.append(reader.get_emissions_version('c1'))
+            writer.append_company_emissions_data('c1', [make_record('2025-02-01', 2.0)])
+            versions.append(reader.get_emissions_version('c1'))
+            writer.save_company_emissions_data('c1', [make_record('2025-03-01', 3.0)])
+            versions.append(reader.get_emissions_version('c1'))
+            assert len(set(versions)) == 4, (backend, versions)
+            assert reader.get_emissions_version('c1') == versions[-1]
+            hash(versions[-1])
+            print(f"   ✅ {backend}: every write seen by the other manager")
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_backend_selection()
+    test_append_keeps_rows()
+    test_parquet_appends_compacted()
+    test_version_follows_other_writers()
+    print("🎉 Emissions store tests passed")
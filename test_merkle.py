@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for Merkle batching of registry records
+Checks inclusion proofs, size- and age-based sealing, and the sealed event
+"""
+
+import shutil
+import tempfile
+import threading
+
+from merkle import MerkleAccumulator, hash_payload, merkle_root, verify_proof
+from test_order_book import make_registry
+
+
+def test_proofs_verify():
+    """Every leaf of a sealed batch proves against its root; a wrong hash does not"""
+    print("🧪 Testing Merkle inclusion proofs...")
+    accumulator = MerkleAccumulator(batch_size=5, max_age_seconds=3600)
+    hashes = [hash_payload({'record': i}) for i in range(5)]
+    batches = [accumulator.add(f"project:{i}", h) for i, h in enumerate(hashes)]
+    assert batches[:4] == [None] * 4 and batches[4] is not None
+    batch = batches[4]
+    assert batch.root == merkle_root(hashes)
+
+    for i, payload_hash in enumerate(hashes):
+        proof = accumulator.get_proof(f"project:{i}")
+        assert proof['batch_id'] == batch.id and proof['payload_hash'] == payload_hash
+        assert verify_proof(payload_hash, proof['proof'], batch.root)
+    proof = accumulator.get_proof("project:2")
+    assert not verify_proof(hashes[3], proof['proof'], batch.root)
+    assert accumulator.get_proof("project:9") is None
+    print("   ✅ 5 leaves proven, tampered leaf rejected")
+
+
+def test_zero_age_means_manual_sealing():
+    """max_age_seconds=0 turns age-based sealing off: partial batches wait for seal()"""
+    print("🧪 Testing Merkle batches with age-based sealing off...")
+    accumulator = MerkleAccumulator(batch_size=3, max_age_seconds=0)
+    assert [accumulator.add(f"project:{i}", hash_payload({'record': i})) for i in range(2)] == [None, None]
+    assert accumulator.seal_if_due() is None and not accumulator.wait_until_due(timeout=0.01)
+    assert accumulator.get_proof("project:0") is None
+
+    batch = accumulator.seal()
+    assert [key for key, _ in batch.leaves] == ["project:0", "project:1"]
+    full = [accumulator.add(f"project:{i}", hash_payload({'record': i})) for i in range(2, 5)]
+    assert full[:2] == [None, None] and len(full[2].leaves) == 3
+    print("   ✅ Partial batch kept until sealed by hand; full batch sealed on add")
+
+
+def test_partial_batch_sealed_by_age():
+    """A partial batch is sealed once it is old enough, with no further records arriving"""
+    print("🧪 Testing age-based Merkle sealing...")
+    data_dir = tempfile.mkdtemp()
+    registry = None
+    try:
+        registry = make_registry(data_dir, merkle_batch_seconds=0.2)
+        sealed = threading.Event()
+        lock_free = []
+
+        def try_registry_lock():
+            if registry._registry_lock.acquire(timeout=1):
+                registry._registry_lock.release()
+                lock_free.append(True)
+            else:
+                lock_free.append(False)
+
+        def on_event(event):
+            if event['type'] == 'merkle_root_sealed':
+                # The event must not be delivered while the registry lock is held
+                probe = threading.Thread(target=try_registry_lock)
+                probe.start()
+                probe.join()
+                sealed.set()
+
+        registry.add_listener(on_event)
+        project_id = registry.register_blue_carbon_project("Seagrass", "Gulf of Mannar", 5.0, "seagrass", 50.0,
+                                                           "owner_a", {"survey": 1})
+        assert registry.get_merkle_proof('project', project_id)['status'] == 'pending'
+        assert sealed.wait(5)
+        assert lock_free == [True]
+
+        proof = registry.get_merkle_proof('project', project_id)
+        assert verify_proof(proof['payload_hash'], proof['proof'], proof['root'])
+        print("   ✅ Batch sealed by the background sealer, event sent without the registry lock")
+    finally:
+        if registry is not None:
+            registry.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_proofs_verify()
+    test_zero_age_means_manual_sealing()
+    test_partial_batch_sealed_by_age()
+    print("🎉 Merkle tests passed")
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for the carbon credit order book
+Checks price-time matching, cancellation and repricing, in the book and the registry
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+from blockchain_mrv import BlockchainMRVSystem
+from order_book import OrderBook
+
+
+def make_registry(data_dir, **config):
+    """A registry persisted under data_dir, without a blockchain connection"""
+    config_file = os.path.join(data_dir, "blockchain_config.json")
+    if not os.path.exists(config_file):
+        with open(config_file, 'w') as f:
+            json.dump(dict({"registry_dir": os.path.join(data_dir, "registry"), "wal_fsync": False}, **config), f)
+    return BlockchainMRVSystem(config_file, start=True)
+
+
+def issue(registry, owner, amount, price_per_ton):
+    """Register, verify and approve a project; returns the credit issued to owner"""
+    project_id = registry.register_blue_carbon_project(
+        f"Mangrove {owner}", "Sundarbans", 10.0, "mangrove", amount, owner, {}
+    )
+    verification_id = registry.submit_verification(project_id, amount, "verifier_1", {"amount": amount})
+    registry.approve_verification_and_issue_credits(verification_id)
+    credit = registry.get_active_credits(owner)[-1]
+    registry.list_credit(credit.id, price_per_ton)
+    return credit
+
+
+def test_price_time_order():
+    """Best price first; at one price, earliest listed first; a reprice joins the back"""
+    print("🧪 Testing order book price-time priority...")
+    book = OrderBook()
+    book.add(1, 50.0, 1, "mangrove")
+    book.add(2, 40.0, 1, "mangrove")
+    book.add(3, 50.0, 2, "seagrass")
+    book.add(4, 50.0, 2, "seagrass")
+    assert [key[2] for key in book.iter_listings()] == [2, 1, 3, 4]
+
+    book.add(1, 50.0, 1, "mangrove")  # same price, new time priority
+    assert [key[2] for key in book.iter_listings()] == [2, 3, 4, 1]
+    assert [key[2] for key in book.iter_listings(ecosystem_type="seagrass")] == [3, 4]
+    assert [key[2] for key in book.iter_listings(max_price=45.0)] == [2]
+
+    assert book.cancel(3) and not book.cancel(3)
+    after = book.key_of(4)
+    assert [key[2] for key in book.iter_listings(after=after)] == [1]
+    print("   ✅ Listings ordered by price, then listing time")
+
+
+def test_direct_purchase_takes_listings_only():
+    """A direct purchase fills the seller's listings at their prices and never takes withdrawn credits"""
+    print("🧪 Testing direct purchases from a seller...")
+    data_dir = tempfile.mkdtemp()
+    try:
+        registry = make_registry(data_dir)
+        cheap = issue(registry, "seller_a", 10.0, 20.0)
+        dear = issue(registry, "seller_a", 10.0, 30.0)
+        withdrawn = issue(registry, "seller_a", 10.0, 10.0)
+        registry.cancel_listing(withdrawn.id)
+
+        try:
+            registry.purchase_carbon_credits("buyer_b", "seller_a", 15.0, 25.0)
+            raise AssertionError("bought beyond the listings priced at or below the bid")
+        except ValueError:
+            pass
+        assert registry.get_company_carbon_balance("buyer_b") == 0
+
+        received = []
+        registry.add_listener(lambda event: received.append(event) if event['type'] == 'credits_purchased' else None)
+        registry.purchase_carbon_credits("buyer_b", "seller_a", 15.0, 100.0)
+        fills = received[-1]['data']['fills']
+        assert [(fill['credit_id'], fill['price_per_ton']) for fill in fills] == [(cheap.id, 20.0), (dear.id, 30.0)]
+        assert received[-1]['data']['total_cost'] == 10.0 * 20.0 + 5.0 * 30.0
+        assert withdrawn.is_active and withdrawn.amount == 10.0
+        assert registry.get_company_carbon_balance("buyer_b") == 15.0
+        print("   ✅ Listed credits filled at listed prices; withdrawn credit untouched")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def test_reprice_requeues_after_recovery():
+    """Repricing loses time priority, and the order survives a restart"""
+    print("🧪 Testing repricing and listing recovery...")
+    data_dir = tempfile.mkdtemp()
+    try:
+        registry = make_registry(data_dir)
+        first = issue(registry, "seller_a", 5.0, 40.0)
+        second = issue(registry, "seller_c", 5.0, 40.0)
+        registry.list_credit(first.id, 40.0)
+
+        order = [listing['credit_id'] for listing in registry.get_marketplace_listings()]
+        assert order == [second.id, first.id], order
+
+        registry = make_registry(data_dir)
+        assert [listing['credit_id'] for listing in registry.get_marketplace_listings()] == order
+        result = registry.buy_carbon_credits("buyer_b", 5.0)
+        assert [fill['credit_id'] for fill in result['fills']] == [second.id]
+        print("   ✅ Repriced credit re-queued, and restored in the same place")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_price_time_order()
+    test_direct_purchase_takes_listings_only()
+    test_reprice_requeues_after_recovery()
+    print("🎉 Order book tests passed")
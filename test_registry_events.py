@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for the registry event feed
+Checks topic filtering, dropping events for a slow subscriber, and that
+subscriptions end when their loop closes or the SSE client disconnects
+"""
+
+import asyncio
+import threading
+
+from registry_events import EventBus
+
+
+def event(event_type, companies, version=1):
+    return {'type': event_type, 'companies': companies, 'version': version, 'data': {}}
+
+
+def publish_from_thread(bus, events):
+    """Publish the way the registry does: from a writer thread, not the subscriber's loop"""
+    writer = threading.Thread(target=lambda: [bus.publish(e) for e in events])
+    writer.start()
+    writer.join()
+
+
+async def drain(subscription):
+    """Events already queued for subscription"""
+    await asyncio.sleep(0.05)
+    received = []
+    while True:
+        next_event = await subscription.get(timeout=0.01)
+        if next_event is None:
+            return received
+        received.append(next_event)
+
+
+def test_topic_filtering():
+    """Subscribers only get events for their companies and event types"""
+    print("🧪 Testing event topic filtering...")
+
+    async def run():
+        bus = EventBus(queue_size=16)
+        everything = bus.subscribe()
+        company_a = bus.subscribe(companies=["company_a"])
+        issued_to_b = bus.subscribe(companies=["company_b"], event_types=["credits_issued"])
+        publish_from_thread(bus, [
+            event('credits_issued', ['company_a'], 1),
+            event('credits_purchased', ['company_a', 'company_b'], 2),
+            event('credits_issued', ['company_b'], 3),
+            event('emissions_recorded', ['company_c'], 4),
+        ])
+        assert [e['version'] for e in await drain(everything)] == [1, 2, 3, 4]
+        assert [e['version'] for e in await drain(company_a)] == [1, 2]
+        assert [e['version'] for e in await drain(issued_to_b)] == [3]
+
+    asyncio.run(run())
+    print("   ✅ Company and type filters applied")
+
+
+def test_slow_subscriber_drops_oldest():
+    """A full queue drops its oldest events, counts them, and never blocks the publisher"""
+    print("🧪 Testing backpressure on a slow subscriber...")
+
+    async def run():
+        bus = EventBus(queue_size=3)
+        slow = bus.subscribe()
+        publish_from_thread(bus, [event('emissions_recorded', ['company_a'], v) for v in range(1, 9)])
+        assert [e['version'] for e in await drain(slow)] == [6, 7, 8]
+        assert slow.take_dropped() == 5 and slow.take_dropped() == 0
+
+    asyncio.run(run())
+    print("   ✅ Newest 3 kept, 5 dropped and reported once")
+
+
+def test_subscriptions_end():
+    """Unsubscribed and closed-loop subscribers get nothing more and are removed"""
+    print("🧪 Testing subscription removal...")
+    bus = EventBus(queue_size=4)
+
+    async def subscribe_and_leave():
+        return bus.subscribe()
+
+    # asyncio.run closes the loop the subscription was bound to
+    orphan = asyncio.run(subscribe_and_leave())
+    assert bus.subscriber_count == 1
+    bus.publish(event('credits_issued', ['company_a']))
+    assert bus.subscriber_count == 0 and orphan.queue.empty()
+
+    async def run():
+        subscription = bus.subscribe()
+        bus.unsubscribe(subscription)
+        publish_from_thread(bus, [event('credits_issued', ['company_a'])])
+        assert await drain(subscription) == [] and bus.subscriber_count == 0
+
+    asyncio.run(run())
+    print("   ✅ Closed loop dropped on publish; unsubscribed queue left empty")
+
+
+def test_event_stream_unsubscribes_on_disconnect():
+    """The /api/events stream removes its subscription when the client goes away"""
+    print("🧪 Testing the event stream on client disconnect...")
+    import backend_api
+
+    class Client:
+        """Request stand-in that reports a disconnect after `polls` checks"""
+
+        def __init__(self, polls):
+            self.polls = polls
+
+        async def is_disconnected(self):
+            self.polls -= 1
+            return self.polls < 0
+
+    async def run():
+        before = backend_api.events.subscriber_count
+        # Client leaves between events
+        response = await backend_api.stream_events(Client(polls=0), company=None, types="credits_issued")
+        messages = [message async for message in response.body_iterator]
+        assert len(messages) == 1 and b"event: connected" in messages[0]
+        assert backend_api.events.subscriber_count == before
+
+        # Connection dropped while the stream is waiting: the server closes the generator
+        response = await backend_api.stream_events(Client(polls=10), company=["company_a"], types=None)
+        stream = response.body_iterator
+        await stream.__anext__()
+        assert backend_api.events.subscriber_count == before + 1
+        await stream.aclose()
+        assert backend_api.events.subscriber_count == before
+
+    asyncio.run(run())
+    print("   ✅ Subscription removed in both cases")
+
+
+if __name__ == "__main__":
+    test_topic_filtering()
+    test_slow_subscriber_drops_oldest()
+    test_subscriptions_end()
+    test_event_stream_unsubscribes_on_disconnect()
+    print("🎉 Registry event tests passed")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for the registry locking primitives and concurrent snapshots
+Checks that a queued exclusive request is not starved by new shared holders
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from registry_locks import SharedExclusiveLock
+from test_order_book import issue, make_registry
+
+
+def test_exclusive_not_starved():
+    """New shared holders wait behind a queued exclusive request; nested shared sections do not"""
+    print("🧪 Testing snapshot gate writer priority...")
+    gate = SharedExclusiveLock()
+    order = []
+    reader_in = threading.Event()
+    release_reader = threading.Event()
+
+    def reader():
+        with gate.shared():
+            reader_in.set()
+            release_reader.wait()
+            with gate.shared():  # nested: must not wait behind the queued writer
+                order.append('nested')
+
+    def writer():
+        with gate.exclusive():
+            order.append('exclusive')
+
+    def late_reader():
+        with gate.shared():
+            order.append('late shared')
+
+    first = threading.Thread(target=reader)
+    first.start()
+    reader_in.wait()
+    exclusive = threading.Thread(target=writer)
+    exclusive.start()
+    while not gate._exclusive_waiting:
+        time.sleep(0.001)
+    late = threading.Thread(target=late_reader)
+    late.start()
+    time.sleep(0.05)
+    assert order == [], order  # late reader queued behind the writer
+
+    release_reader.set()
+    for thread in (first, exclusive, late):
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+    assert order == ['nested', 'exclusive', 'late shared'], order
+    print("   ✅ Exclusive request served before later shared ones")
+
+
+def test_snapshot_during_purchases():
+    """A snapshot taken while purchases run loses none of them"""
+    print("🧪 Testing snapshots concurrent with purchases...")
+    data_dir = tempfile.mkdtemp()
+    try:
+        registry = make_registry(data_dir)
+        for i in range(4):
+            issue(registry, f"seller_{i}", 100.0, 10.0)
+
+        def buy(buyer):
+            for _ in range(20):
+                registry.buy_carbon_credits(buyer, 1.0)
+
+        buyers = [threading.Thread(target=buy, args=(f"buyer_{i}",)) for i in range(4)]
+        for thread in buyers:
+            thread.start()
+        for _ in range(5):
+            registry.snapshot()
+        for thread in buyers:
+            thread.join()
+
+        registry.journal.close()
+        restored = make_registry(data_dir)
+        for i in range(4):
+            assert restored.get_company_carbon_balance(f"buyer_{i}") == 20.0
+        assert sum(restored.get_company_carbon_balance(f"seller_{i}") for i in range(4)) == 320.0
+        assert restored.check_balance_consistency() == {}
+        print("   ✅ Every purchase recovered after concurrent snapshots")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_exclusive_not_starved()
+    test_snapshot_during_purchases()
+    print("🎉 Registry lock tests passed")
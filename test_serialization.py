@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for shared JSON serialization
+Checks that the orjson and standard library backends write NaN the same way
+"""
+
+import importlib
+import sys
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+
+import serialization
+
+
+def dumps_with_fallback(obj, pretty=False):
+    """serialization.dumps as it behaves without orjson installed"""
+    saved = sys.modules.get('orjson')
+    sys.modules['orjson'] = None
+    try:
+        fallback = importlib.reload(serialization)
+        assert not fallback.ORJSON_AVAILABLE
+        return fallback.dumps(obj, pretty=pretty)
+    finally:
+        if saved is None:
+            sys.modules.pop('orjson', None)
+        else:
+            sys.modules['orjson'] = saved
+        importlib.reload(serialization)
+
+
+def test_nan_written_as_null():
+    """NaN and infinity become null on both backends, never the non-standard NaN token"""
+    print("🧪 Testing NaN serialization...")
+    record = {'quantity': float('nan'), 'factors': [1.5, float('inf')], 'emissions': np.float64('nan'), 1: 'key'}
+    expected = b'{"quantity":null,"factors":[1.5,null],"emissions":null,"1":"key"}'
+
+    fallback = dumps_with_fallback(record)
+    assert fallback == expected, fallback
+    assert serialization.loads(dumps_with_fallback(record, pretty=True)) == serialization.loads(expected)
+    if serialization.ORJSON_AVAILABLE:
+        assert serialization.dumps(record) == expected
+    print("   ✅ NaN written as null by every backend")
+
+
+@dataclass
+class Reading:
+    day: date
+    values: list
+    factor: float
+
+
+def test_nan_in_dataclass_written_as_null():
+    """NaN inside a dataclass (and one nested in a list) also becomes null"""
+    print("🧪 Testing NaN inside a dataclass...")
+    record = {'reading': Reading(date(2025, 1, 2), [1.0, float('nan')], float('-inf')),
+              'history': [Reading(date(2025, 1, 1), [], float('nan'))]}
+    expected = {'reading': {'day': '2025-01-02', 'values': [1.0, None], 'factor': None},
+                'history': [{'day': '2025-01-01', 'values': [], 'factor': None}]}
+
+    assert serialization.loads(dumps_with_fallback(record)) == expected
+    assert b'NaN' not in dumps_with_fallback(record, pretty=True)
+    assert serialization.loads(serialization.dumps(record)) == expected
+    print("   ✅ Dataclass fields written as null by every backend")
+
+
+if __name__ == "__main__":
+    test_nan_written_as_null()
+    test_nan_in_dataclass_written_as_null()
+    print("🎉 Serialization tests passed")
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Test script for the on-chain transaction pipeline
+Runs the pipeline against InMemoryChain: nonces, batching, retries and the registry mirror
+"""
+
+import shutil
+import tempfile
+import time
+
+from test_order_book import make_registry
+from tx_pipeline import InMemoryChain, TransactionPipeline
+
+
+def make_pipeline(chain, **options):
+    options.setdefault('poll_interval', 0.01)
+    return TransactionPipeline(chain, **options)
+
+
+def test_nonces_and_batches():
+    """Calls go out in order, packed into batches, on consecutive nonces"""
+    print("🧪 Testing transaction batching and nonces...")
+    chain = InMemoryChain()
+    pipeline = make_pipeline(chain, batch_size=4)
+    try:
+        requests = [pipeline.submit('recordEmissionsFor', ('0x' + '1' * 40, i)) for i in range(10)]
+        assert pipeline.flush(timeout=5)
+        assert [args[1] for _, args in chain.executed] == list(range(10))
+        assert [nonce for _, nonce, _ in chain.transactions] == list(range(len(chain.transactions)))
+        assert all(count <= 4 for _, _, count in chain.transactions)
+        assert all(request.status == "confirmed" for request in requests)
+        print(f"   ✅ 10 calls confirmed in {len(chain.transactions)} transactions")
+    finally:
+        pipeline.close()
+
+
+def test_retries_never_double_execute():
+    """Send outages and stuck transactions are retried; every call still runs once"""
+    print("🧪 Testing transaction retries...")
+    chain = InMemoryChain(fail_sends=1)
+    pipeline = make_pipeline(chain)
+    try:
+        request = pipeline.submit('anchorMerkleRoot', (b'\x01' * 32, 1, 3), key="merkle:1")
+        assert pipeline.submit('anchorMerkleRoot', (b'\x01' * 32, 1, 3), key="merkle:1") is request
+        deadline = time.monotonic() + 10
+        while request.status != "confirmed" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert request.status == "confirmed"
+        assert chain.executed == [('anchorMerkleRoot', (b'\x01' * 32, 1, 3))]
+    finally:
+        pipeline.close()
+
+    # Nothing is mined until mine(): the transaction gets replaced at the same nonce
+    chain = InMemoryChain(auto_mine=False)
+    pipeline = make_pipeline(chain, receipt_timeout=0.05)
+    try:
+        request = pipeline.submit('recordEmissionsFor', ('0x' + '2' * 40, 7))
+        deadline = time.monotonic() + 5
+        while request.attempts < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert request.attempts >= 2 and request.nonce == 0
+        chain.mine()
+        assert pipeline.flush(timeout=5)
+        assert request.status == "confirmed"
+        assert chain.executed == [('recordEmissionsFor', ('0x' + '2' * 40, 7))]
+        print("   ✅ Resent and replaced transactions executed once")
+    finally:
+        pipeline.close()
+
+
+class FlakyChain(InMemoryChain):
+    """InMemoryChain whose gas price and signing RPCs fail once each"""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.outages = {'gas_price': 1, 'sign': 1}
+
+    def _outage(self, name):
+        if self.outages[name]:
+            self.outages[name] -= 1
+            raise ConnectionError("node unreachable")
+
+    def gas_price(self) -> int:
+        self._outage('gas_price')
+        return super().gas_price()
+
+    def sign(self, calls, nonce, gas_price):
+        self._outage('sign')
+        return super().sign(calls, nonce, gas_price)
+
+
+def test_unreachable_node_keeps_calls_queued():
+    """Calls taken while the node is down stay queued and are sent once it is back"""
+    print("🧪 Testing an unreachable node while signing...")
+    chain = FlakyChain()
+    pipeline = make_pipeline(chain)
+    try:
+        request = pipeline.submit('recordEmissionsFor', ('0x' + '4' * 40, 1), key="emissions:1")
+        assert pipeline.flush(timeout=5)
+        assert chain.outages == {'gas_price': 0, 'sign': 0}
+        assert request.status == "confirmed", request
+        assert pipeline.submit('recordEmissionsFor', ('0x' + '4' * 40, 1), key="emissions:1") is request
+        assert chain.executed == [('recordEmissionsFor', ('0x' + '4' * 40, 1))]
+        assert pipeline.stats()['in_flight_transactions'] == 0
+        print("   ✅ Call confirmed after the outage, not failed or lost")
+    finally:
+        pipeline.close()
+
+
+def test_reverted_batch_split():
+    """A reverting call fails alone; the calls batched with it are retried and confirmed"""
+    print("🧪 Testing reverted batch splitting...")
+    chain = InMemoryChain(revert_if=lambda function, args: args[1] == 3, auto_mine=False)
+    pipeline = make_pipeline(chain, batch_size=10)
+    try:
+        requests = [pipeline.submit('recordEmissionsFor', ('0x' + '3' * 40, i)) for i in range(6)]
+        time.sleep(0.05)
+        chain.auto_mine = True
+        assert pipeline.flush(timeout=5)
+        assert [request.status for request in requests] == ["confirmed"] * 3 + ["failed"] + ["confirmed"] * 2
+        assert sorted(args[1] for _, args in chain.executed) == [0, 1, 2, 4, 5]
+        print("   ✅ Only the bad call failed")
+    finally:
+        pipeline.close()
+
+
+def test_registry_mirror_calls():
+    """The registry relays changes with the acting addresses and its own ids"""
+    print("🧪 Testing registry chain mirroring...")
+    data_dir = tempfile.mkdtemp()
+    registry = None
+    chain = InMemoryChain()
+    pipeline = make_pipeline(chain)
+    try:
+        registry = make_registry(data_dir)
+        registry.attach_tx_pipeline(pipeline)
+        project_id = registry.register_blue_carbon_project("Salt Marsh", "Kutch", 8.0, "salt_marsh", 40.0,
+                                                           "company_x", {"plot": 1})
+        verification_id = registry.submit_verification(project_id, 35.0, "verifier_1", {"plot": 1})
+        registry.record_company_emissions("company_y", 12.5)
+        assert pipeline.flush(timeout=5)
+
+        calls = dict(chain.executed)
+        assert calls['registerProjectFor'][:2] == (project_id, registry.chain_address("company_x"))
+        assert calls['submitVerificationFor'][:3] == (verification_id, project_id, registry.chain_address("verifier_1"))
+        assert calls['recordEmissionsFor'] == (registry.chain_address("company_y"), registry._to_chain_units(12.5))
+        assert registry.chain_address("company_x") != registry.chain_address("company_y")
+        assert registry.chain_address("0x" + "ab" * 20) == "0x" + "ab" * 20
+        print("   ✅ Company, owner and verifier addresses and registry ids sent")
+    finally:
+        pipeline.close()
+        if registry is not None:
+            registry.close()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_nonces_and_batches()
+    test_retries_never_double_execute()
+    test_unreachable_node_keeps_calls_queued()
+    test_reverted_batch_split()
+    test_registry_mirror_calls()
+    print("🎉 Transaction pipeline tests passed")
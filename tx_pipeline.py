@@ -0,0 +1,444 @@
+"""
+Transaction pipeline for mirroring registry changes on chain.
+
+Contract calls are queued and sent from one background thread:
+    - nonces are allocated locally, so transactions go out back to back
+      without a get_transaction_count round trip each
+    - queued calls are packed into multicall transactions of up to
+      batch_size calls (a single call is sent directly)
+    - at most max_in_flight transactions wait for receipts at a time
+    - receipts are polled in the background; callers never wait on the chain
+
+Retries are idempotent. A signed transaction is resent byte for byte, and a
+stuck one is replaced at the same nonce with a higher gas price, so a call
+can never execute twice. A batch that reverts is split and retried call by
+call, so one bad call does not fail its neighbours. Calls submitted with
+the same key are only queued once.
+
+InMemoryChain is a small in-process stand-in for a node, for running the
+pipeline without a network.
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+try:
+    from web3.exceptions import ContractLogicError
+    REVERT_ERRORS: tuple = (ContractLogicError,)
+except ImportError:
+    REVERT_ERRORS = ()
+
+GAS_BUMP_PERCENT = 125  # replacement gas price, as a percentage of the previous one
+MAX_SEND_BACKOFF = 30.0  # seconds between resends while the node is unreachable
+
+
+@dataclass
+class TxRequest:
+    """One contract call and its on-chain outcome"""
+    key: str
+    function: str
+    args: tuple
+    status: str = "queued"  # queued, submitted, confirmed or failed
+    tx_hash: Optional[str] = None
+    nonce: Optional[int] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+
+@dataclass
+class _Batch:
+    """A signed transaction carrying one or more requests"""
+    requests: List[TxRequest]
+    nonce: int
+    gas_price: int
+    raw: bytes
+    hashes: List[str] = field(default_factory=list)  # every signed version, newest last
+    sent_at: Optional[float] = None
+    next_send: float = 0.0
+    send_failures: int = 0
+
+
+class Web3ChainClient:
+    """Signs and sends registry contract calls with a local account"""
+
+    def __init__(self, web3, contract, account):
+        self.web3 = web3
+        self.contract = contract
+        self.account = account
+        self.chain_id = web3.eth.chain_id
+
+    def pending_nonce(self) -> int:
+        return self.web3.eth.get_transaction_count(self.account.address, 'pending')
+
+    def gas_price(self) -> int:
+        return self.web3.eth.gas_price
+
+    def sign(self, calls: List[Tuple[str, tuple]], nonce: int, gas_price: int) -> Tuple[str, bytes]:
+        """
+        Build and sign a transaction for calls; raises if it would revert.
+
+        Returns:
+            (transaction hash, raw signed transaction)
+        """
+        calls = [(function, self._checksummed(args)) for function, args in calls]
+        if len(calls) == 1:
+            function, args = calls[0]
+            call = self.contract.get_function_by_name(function)(*args)
+        else:
+            data = [self.contract.get_function_by_name(function)(*args)._encode_transaction_data()
+                    for function, args in calls]
+            call = self.contract.functions.multicall(data)
+        tx = call.build_transaction({
+            'from': self.account.address,
+            'nonce': nonce,
+            'gasPrice': gas_price,
+            'chainId': self.chain_id
+        })
+        signed = self.account.sign_transaction(tx)
+        raw = getattr(signed, 'raw_transaction', None) or signed.rawTransaction
+        return self.web3.to_hex(signed.hash), raw
+
+    def _checksummed(self, args: tuple) -> tuple:
+        """Web3 only accepts checksummed address arguments"""
+        return tuple(
+            self.web3.to_checksum_address(arg) if isinstance(arg, str) and self.web3.is_address(arg) else arg
+            for arg in args
+        )
+
+    def send_raw(self, raw: bytes):
+        try:
+            self.web3.eth.send_raw_transaction(raw)
+        except ValueError as e:
+            # Resending a transaction the node already has is not an error here
+            if 'already known' not in str(e):
+                raise
+
+    def receipt_status(self, tx_hash: str) -> Optional[int]:
+        """1 mined ok, 0 reverted, None not mined yet"""
+        try:
+            receipt = self.web3.eth.get_transaction_receipt(tx_hash)
+        except Exception:
+            return None
+        return receipt['status'] if receipt else None
+
+
+class TransactionPipeline:
+    """Queue of contract calls sent in batches from a background thread"""
+
+    def __init__(self,
+                 client,
+                 batch_size: int = 50,
+                 max_in_flight: int = 8,
+                 receipt_timeout: float = 120.0,
+                 poll_interval: float = 2.0):
+        self.client = client
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.receipt_timeout = receipt_timeout
+        self.poll_interval = poll_interval
+
+        self.requests: Dict[str, TxRequest] = {}
+        self._queue: Deque[TxRequest] = deque()
+        self._in_flight: List[_Batch] = []
+        self._signing = 0  # batches taken off the queue and not yet in flight
+        self._next_nonce: Optional[int] = None
+        self._solo = set()  # keys split out of a reverted batch; sent one per transaction
+        self._keys = itertools.count(1)
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="tx-pipeline", daemon=True)
+        self._thread.start()
+
+    def submit(self, function: str, args: tuple, key: Optional[str] = None) -> TxRequest:
+        """
+        Queue a contract call; never blocks on the chain.
+
+        Args:
+            function: Contract function name
+            args: Call arguments
+            key: Idempotency key; a call already queued or done under this key
+                is returned instead of being queued again (failed ones are requeued)
+        """
+        with self._cond:
+            if key is None:
+                key = f"call:{next(self._keys)}"
+            existing = self.requests.get(key)
+            if existing is not None and existing.status != "failed":
+                return existing
+            request = TxRequest(key, function, tuple(args))
+            self.requests[key] = request
+            self._queue.append(request)
+            self._cond.notify()
+            return request
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued call is confirmed or failed; False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._in_flight or self._signing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.notify()
+                self._cond.wait(min(self.poll_interval, remaining) if remaining is not None else self.poll_interval)
+            return True
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop the worker; calls still pending are left as they are"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            counts = {"queued": 0, "submitted": 0, "confirmed": 0, "failed": 0}
+            for request in self.requests.values():
+                counts[request.status] += 1
+            return {
+                **counts,
+                "in_flight_transactions": len(self._in_flight),
+                "next_nonce": self._next_nonce
+            }
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                if not self._queue and not self._in_flight:
+                    self._cond.wait()
+                    continue
+            try:
+                self._poll_receipts()
+                self._send_due()
+                self._fill()
+            except Exception as e:
+                # Node unreachable while polling or pricing; try again next round
+                print(f"❌ Transaction pipeline error: {e}")
+            with self._cond:
+                self._cond.notify_all()
+                if not self._stopping:
+                    self._cond.wait(self.poll_interval)
+
+    def _fill(self):
+        """Sign and send new batches while there is room in flight"""
+        while len(self._in_flight) < self.max_in_flight:
+            with self._cond:
+                if not self._queue:
+                    return
+            # Ask the node first: if it is unreachable, nothing has left the queue
+            if self._next_nonce is None:
+                self._next_nonce = self.client.pending_nonce()
+            gas_price = self.client.gas_price()
+            with self._cond:
+                if not self._queue:
+                    return
+                requests = self._take_batch()
+                self._signing += 1
+            try:
+                batch = self._sign(requests, self._next_nonce, gas_price)
+                if batch is None:
+                    continue
+                self._next_nonce += 1
+                with self._cond:
+                    self._in_flight.append(batch)
+            finally:
+                with self._cond:
+                    self._signing -= 1
+            self._send(batch)
+
+    def _take_batch(self) -> List[TxRequest]:
+        """Pop the next batch off the queue (caller holds the condition)"""
+        first = self._queue.popleft()
+        if first.key in self._solo:
+            self._solo.discard(first.key)
+            return [first]
+        requests = [first]
+        while self._queue and len(requests) < self.batch_size and self._queue[0].key not in self._solo:
+            requests.append(self._queue.popleft())
+        return requests
+
+    def _put_back(self, requests: List[TxRequest]):
+        """Return a taken batch to the front of the queue, as it was taken"""
+        with self._cond:
+            if len(requests) == 1:
+                self._solo.add(requests[0].key)
+            for request in reversed(requests):
+                request.status = "queued"
+                self._queue.appendleft(request)
+
+    def _sign(self, requests: List[TxRequest], nonce: int, gas_price: int) -> Optional[_Batch]:
+        try:
+            tx_hash, raw = self.client.sign([(r.function, r.args) for r in requests], nonce, gas_price)
+        except Exception as e:
+            if not _is_revert(e):
+                # Node unreachable while estimating gas; retried next round
+                self._put_back(requests)
+                raise
+            # Fails before a nonce is used, e.g. gas estimation reverts
+            self._reverted(requests, str(e))
+            return None
+        batch = _Batch(requests, nonce, gas_price, raw, [tx_hash])
+        for request in requests:
+            request.status = "submitted"
+            request.nonce = nonce
+            request.tx_hash = tx_hash
+            request.attempts += 1
+        return batch
+
+    def _send(self, batch: _Batch):
+        try:
+            self.client.send_raw(batch.raw)
+        except Exception as e:
+            # The nonce is taken, so keep resending the same signed transaction
+            batch.send_failures += 1
+            batch.next_send = time.monotonic() + min(MAX_SEND_BACKOFF, 2 ** batch.send_failures)
+            for request in batch.requests:
+                request.error = str(e)
+            return
+        batch.sent_at = time.monotonic()
+
+    def _send_due(self):
+        """Resend failed sends, and replace transactions stuck past receipt_timeout"""
+        now = time.monotonic()
+        for batch in list(self._in_flight):
+            if batch.sent_at is None:
+                if now >= batch.next_send:
+                    self._send(batch)
+            elif now - batch.sent_at >= self.receipt_timeout:
+                gas_price = max(batch.gas_price * GAS_BUMP_PERCENT // 100, self.client.gas_price())
+                try:
+                    tx_hash, raw = self.client.sign([(r.function, r.args) for r in batch.requests], batch.nonce, gas_price)
+                except Exception:
+                    # Keep waiting on the transaction already out
+                    batch.sent_at = now
+                    continue
+                batch.gas_price, batch.raw = gas_price, raw
+                batch.hashes.append(tx_hash)
+                for request in batch.requests:
+                    request.tx_hash = tx_hash
+                    request.attempts += 1
+                self._send(batch)
+
+    def _poll_receipts(self):
+        for batch in list(self._in_flight):
+            for tx_hash in batch.hashes:
+                status = self.client.receipt_status(tx_hash)
+                if status is None:
+                    continue
+                with self._cond:
+                    self._in_flight.remove(batch)
+                for request in batch.requests:
+                    request.tx_hash = tx_hash
+                if status == 1:
+                    for request in batch.requests:
+                        request.status = "confirmed"
+                        request.error = None
+                else:
+                    self._reverted(batch.requests, "Transaction reverted")
+                break
+
+    def _reverted(self, requests: List[TxRequest], error: str):
+        """Fail a lone call; split a batch and retry its calls one by one, in order"""
+        if len(requests) == 1:
+            request = requests[0]
+            request.status = "failed"
+            request.error = error
+            print(f"❌ Chain call {request.function} ({request.key}) failed: {error}")
+            return
+        with self._cond:
+            for request in reversed(requests):
+                request.status = "queued"
+                self._solo.add(request.key)
+                self._queue.appendleft(request)
+
+
+def _is_revert(error: Exception) -> bool:
+    """Whether a signing error means the call itself reverts, rather than a transport failure"""
+    return isinstance(error, REVERT_ERRORS) or 'revert' in str(error).lower()
+
+
+class InMemoryChain:
+    """
+    In-process stand-in for a node, for running the pipeline without a network.
+
+    Transactions are held in a mempool and mined in nonce order when a receipt
+    is asked for (or mine() is called). Calls are recorded in executed.
+
+    Args:
+        revert_if: Predicate on (function, args); a transaction containing a
+            matching call reverts as a whole, like a multicall would
+        fail_sends: Number of upcoming sends that raise, to simulate an outage
+        auto_mine: Mine pending transactions on every receipt lookup
+    """
+
+    def __init__(self,
+                 revert_if: Optional[Callable[[str, tuple], bool]] = None,
+                 fail_sends: int = 0,
+                 auto_mine: bool = True):
+        self.revert_if = revert_if
+        self.fail_sends = fail_sends
+        self.auto_mine = auto_mine
+        self.nonce = 0
+        self.block_number = 0
+        self.executed: List[Tuple[str, tuple]] = []
+        self.transactions: List[Tuple[str, int, int]] = []  # (hash, nonce, call count) as mined
+        self._signed: Dict[str, Tuple[int, int, List[Tuple[str, tuple]]]] = {}
+        self._mempool: Dict[int, str] = {}  # nonce -> hash
+        self._receipts: Dict[str, int] = {}
+        self._hashes = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def pending_nonce(self) -> int:
+        with self._lock:
+            return max([self.nonce] + [n + 1 for n in self._mempool])
+
+    def gas_price(self) -> int:
+        return 1_000_000_000
+
+    def sign(self, calls: List[Tuple[str, tuple]], nonce: int, gas_price: int) -> Tuple[str, bytes]:
+        if len(calls) == 1 and self.revert_if is not None and self.revert_if(*calls[0]):
+            raise ValueError("execution reverted")
+        tx_hash = f"0x{next(self._hashes):064x}"
+        with self._lock:
+            self._signed[tx_hash] = (nonce, gas_price, list(calls))
+        return tx_hash, tx_hash.encode()
+
+    def send_raw(self, raw: bytes):
+        tx_hash = raw.decode()
+        with self._lock:
+            if self.fail_sends:
+                self.fail_sends -= 1
+                raise ConnectionError("node unreachable")
+            nonce, gas_price, _ = self._signed[tx_hash]
+            if nonce < self.nonce:
+                raise ValueError("nonce too low")
+            current = self._mempool.get(nonce)
+            if current is not None and current != tx_hash and self._signed[current][1] >= gas_price:
+                raise ValueError("replacement transaction underpriced")
+            self._mempool[nonce] = tx_hash
+
+    def mine(self):
+        """Mine every pending transaction whose nonce is next in line"""
+        with self._lock:
+            while self.nonce in self._mempool:
+                tx_hash = self._mempool.pop(self.nonce)
+                _, _, calls = self._signed[tx_hash]
+                reverted = self.revert_if is not None and any(self.revert_if(f, a) for f, a in calls)
+                if not reverted:
+                    self.executed.extend(calls)
+                self._receipts[tx_hash] = 0 if reverted else 1
+                self.transactions.append((tx_hash, self.nonce, len(calls)))
+                self.nonce += 1
+                self.block_number += 1
+
+    def receipt_status(self, tx_hash: str) -> Optional[int]:
+        if self.auto_mine:
+            self.mine()
+        with self._lock:
+            return self._receipts.get(tx_hash)